@@ -0,0 +1,79 @@
+"""
+Ausführung blockierender Arbeit außerhalb der Event-Loop.
+
+Die Endpunkte sind async, Parsen/Bereinigen (CPU) und SQLAlchemy-Aufrufe (DB)
+blockieren aber. Beides läuft deshalb in Worker-Threads von anyio, begrenzt
+durch je einen CapacityLimiter: ein großer Upload belegt höchstens einen
+CPU-Platz, /health und andere Requests laufen in der Event-Loop weiter.
+
+NumPy, Dekompression und die DB-Treiber geben den GIL frei; für reines
+Python-Parsen auf mehreren Kernen gibt es zusätzlich ?parallel=true
+(Prozess-Pool in app/logic/parallel.py).
+"""
+import os
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, TypeVar
+
+from anyio import CapacityLimiter, to_thread
+from anyio.lowlevel import RunVar
+
+# Gleichzeitige Parse-/Bereinigungs-Jobs (weitere warten)
+CPU_THREADS = int(os.getenv("CPU_THREADS", str(os.cpu_count() or 1)))
+
+# Gleichzeitige blockierende DB-Aufrufe
+DB_THREADS = int(os.getenv("DB_THREADS", "10"))
+
+T = TypeVar("T")
+
+# Limiter pro Event-Loop (Tests starten mehrere Loops)
+_cpu_limiter: RunVar[CapacityLimiter] = RunVar("cpu_limiter")
+_db_limiter: RunVar[CapacityLimiter] = RunVar("db_limiter")
+
+
+def _limiter(var: RunVar, size: int) -> CapacityLimiter:
+    try:
+        return var.get()
+    except LookupError:
+        limiter = CapacityLimiter(size)
+        var.set(limiter)
+        return limiter
+
+
+def cpu_limiter() -> CapacityLimiter:
+    return _limiter(_cpu_limiter, CPU_THREADS)
+
+
+def db_limiter() -> CapacityLimiter:
+    return _limiter(_db_limiter, DB_THREADS)
+
+
+async def run_cpu(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Führt CPU-lastige Arbeit (Parsen, Bereinigen) in einem Worker-Thread aus."""
+    return await to_thread.run_sync(partial(func, *args, **kwargs), limiter=cpu_limiter())
+
+
+async def run_db(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Führt blockierende DB-Arbeit in einem Worker-Thread aus."""
+    return await to_thread.run_sync(partial(func, *args, **kwargs), limiter=db_limiter())
+
+
+async def iterate_cpu(iterator: Iterator[T]) -> AsyncIterator[T]:
+    """Holt die Elemente eines blockierenden Iterators (z.B. clean_iter) einzeln über run_cpu."""
+    done = object()
+    while True:
+        item = await run_cpu(next, iterator, done)
+        if item is done:
+            return
+        yield item
+
+
+def executor_stats() -> Dict[str, Dict[str, int]]:
+    """Belegung der Limiter (für /health)."""
+    stats = {}
+    for name, limiter in (("cpu", cpu_limiter()), ("db", db_limiter())):
+        stats[name] = {
+            "size": int(limiter.total_tokens),
+            "busy": limiter.borrowed_tokens,
+            "waiting": limiter.statistics().tasks_waiting,
+        }
+    return stats
@@ -0,0 +1,52 @@
+"""
+Formular-Parsing für Datei-Uploads mit eigener Spool-Grenze.
+
+Starlette spoolt Datei-Teile ab MultiPartParser.spool_max_size in eine
+Temp-Datei. Statt die Klasse global zu ändern, nutzen die Upload-Routen
+einen eigenen Parser über SpoolingRoute (route_class des Routers).
+"""
+import os
+from typing import Callable, Coroutine, Union
+
+from fastapi import HTTPException, Request, Response
+from fastapi.routing import APIRoute
+from starlette.datastructures import FormData
+from starlette.formparsers import MultiPartException, MultiPartParser
+
+# Uploads über dieser Größe (Bytes) werden in eine Temp-Datei gespoolt,
+# die Parser lesen sie dann per mmap direkt aus dem Page-Cache
+UPLOAD_SPOOL_MAX_SIZE = int(os.getenv("UPLOAD_SPOOL_MAX_SIZE", str(1024 * 1024)))
+
+
+class SpoolingMultiPartParser(MultiPartParser):
+    """MultiPartParser mit UPLOAD_SPOOL_MAX_SIZE als Spool-Grenze."""
+
+    spool_max_size = UPLOAD_SPOOL_MAX_SIZE
+
+
+class SpoolingRequest(Request):
+    """Request, der multipart/form-data mit SpoolingMultiPartParser liest."""
+
+    async def _get_form(self, *, max_files: Union[int, float] = 1000, max_fields: Union[int, float] = 1000,
+                        max_part_size: int = 1024 * 1024) -> FormData:
+        content_type = self.headers.get("content-type", "").split(";", 1)[0].strip().lower()
+        if self._form is None and content_type == "multipart/form-data":
+            parser = SpoolingMultiPartParser(self.headers, self.stream(), max_files=max_files,
+                                             max_fields=max_fields, max_part_size=max_part_size)
+            try:
+                self._form = await parser.parse()
+            except MultiPartException as e:
+                raise HTTPException(status_code=400, detail=e.message)
+        return await super()._get_form(max_files=max_files, max_fields=max_fields, max_part_size=max_part_size)
+
+
+class SpoolingRoute(APIRoute):
+    """Route, deren Formular-Uploads über SpoolingRequest gelesen werden."""
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[None, None, Response]]:
+        handler = super().get_route_handler()
+
+        async def spooling_handler(request: Request) -> Response:
+            return await handler(SpoolingRequest(request.scope, request.receive))
+
+        return spooling_handler
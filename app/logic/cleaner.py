@@ -1,17 +1,351 @@
-from typing import List, Dict, Any, Tuple, Optional
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Tuple, Optional
 from datetime import datetime
+from functools import lru_cache
+from itertools import islice
 import logging
+import os
+import random
+import re
+
+from app.logic.errors import ERROR_EXAMPLES_LIMIT, CleaningError, ErrorCollector
+from app.logic.profiling import TableProfile
+from app.logic.stats import CleaningStats
 
 logger = logging.getLogger(__name__)
 
-# Bekannte deutsche Bundesländer
-VALID_BUNDESLAENDER = {
-    "baden-württemberg", "bayern", "berlin", "brandenburg", "bremen",
-    "hamburg", "hessen", "mecklenburg-vorpommern", "niedersachsen",
-    "nordrhein-westfalen", "rheinland-pfalz", "saarland", "sachsen",
-    "sachsen-anhalt", "schleswig-holstein", "thüringen", "thueringen", "baden-wuerttemberg"
+# Anzahl Zeilen mit Bereinigungs-Details im Report (über ENV anpassbar)
+CLEANING_DETAILS_LIMIT = int(os.getenv("CLEANING_DETAILS_LIMIT", "10"))
+
+# Zeilen pro Block bei clean_iter (Speicherbedarf beim Streamen)
+CLEAN_BATCH_SIZE = int(os.getenv("CLEAN_BATCH_SIZE", "10000"))
+
+# "first": die ersten N Zeilen, "sample": Reservoir-Stichprobe über die ganze Datei
+DETAILS_MODES = ("first", "sample")
+
+# Doppelte IDs in einer Datei: "first" (erste Zeile gilt), "last" (letzte Zeile gilt),
+# "reject" (weitere Zeilen mit derselben ID sind Fehler). Standard beim Upload über ENV.
+DUPLICATE_POLICIES = ("first", "last", "reject")
+DUPLICATE_POLICY = os.getenv("DUPLICATE_POLICY", "last")
+
+# Datumsspalten: nach so vielen erkannten Werten wird das häufigste Format fest gewählt
+DATE_SAMPLE_SIZE = int(os.getenv("DATE_SAMPLE_SIZE", "20"))
+
+# Datumsspalten: Anzahl zwischengespeicherter Werte pro Spalte (LRU)
+DATE_CACHE_SIZE = int(os.getenv("DATE_CACHE_SIZE", "4096"))
+
+# Genau die Form von "%Y-%m-%d" bzw. "%Y-%m-%d %H:%M:%S" (nur ASCII-Ziffern, mit führenden Nullen)
+_ISO_DATE = re.compile(r"[0-9]{4}-[0-9]{2}-[0-9]{2}(?: [0-9]{2}:[0-9]{2}:[0-9]{2})?")
+
+# Meldungen werden als (Vorlage, *Argumente) gesammelt und nur für Zeilen
+# formatiert, die tatsächlich in cleaning_details landen
+MSG_WHITESPACE = "'{}': Whitespace entfernt"
+MSG_NULL = "'{}': '{}' → NULL"
+MSG_INTEGER = "'{}': String '{}' → Integer {}"
+MSG_COMMA = "'{}': Komma zu Punkt '{}' → '{}'"
+MSG_DATE = "'{}': '{}' → Datum {}"
+
+
+def render_cleanings(row_cleanings: List[Any]) -> List[str]:
+    """Formatiert gesammelte Meldungen (fertige Strings bleiben unverändert)."""
+    return [
+        message if isinstance(message, str) else message[0].format(*message[1:])
+        for message in row_cleanings
+    ]
+
+# Bekannte deutsche Bundesländer (Kleinschreibung inkl. Umschrift → offizieller Name)
+BUNDESLAND_NAMES = {
+    "baden-württemberg": "Baden-Württemberg", "baden-wuerttemberg": "Baden-Württemberg",
+    "bayern": "Bayern", "berlin": "Berlin", "brandenburg": "Brandenburg", "bremen": "Bremen",
+    "hamburg": "Hamburg", "hessen": "Hessen", "mecklenburg-vorpommern": "Mecklenburg-Vorpommern",
+    "niedersachsen": "Niedersachsen", "nordrhein-westfalen": "Nordrhein-Westfalen",
+    "rheinland-pfalz": "Rheinland-Pfalz", "saarland": "Saarland", "sachsen": "Sachsen",
+    "sachsen-anhalt": "Sachsen-Anhalt", "schleswig-holstein": "Schleswig-Holstein",
+    "thüringen": "Thüringen", "thueringen": "Thüringen",
 }
+VALID_BUNDESLAENDER = set(BUNDESLAND_NAMES)
+
+# Offizielle Namen, die ohne lower() als gültig erkannt werden
+CANONICAL_BUNDESLAENDER = set(BUNDESLAND_NAMES.values())
+
+# Max. Anzahl verschiedener Werte pro internierter Spalte (darüber wird nur noch normalisiert)
+INTERN_CACHE_SIZE = int(os.getenv("INTERN_CACHE_SIZE", "10000"))
+
+
+def canonical_bundesland(value: str) -> str:
+    """Offizieller Name eines bekannten Bundeslands, z.B. "thueringen" → "Thüringen"."""
+    return BUNDESLAND_NAMES.get(value.lower(), value)
+
+
+class ValueInterner:
+    """
+    Cache für Spalten mit wenigen verschiedenen Werten.
+
+    Jeder Wert wird einmal normalisiert, danach liefert der Cache dasselbe
+    str-Objekt für alle Zeilen (weniger Speicher für bereinigte Zeilen).
+    """
+
+    def __init__(self, normalize: Optional[Callable[[str], str]] = None, max_size: int = INTERN_CACHE_SIZE):
+        self.normalize = normalize
+        self.max_size = max_size
+        self.values: Dict[str, str] = {}
+
+    def __call__(self, value: str) -> str:
+        try:
+            return self.values[value]
+        except KeyError:
+            pass
+        result = self.normalize(value) if self.normalize is not None else value
+        if len(self.values) < self.max_size:
+            self.values[value] = result
+        return result
+
+# Feld-Funktion: (rohzeile, bereinigte_zeile, bereinigungen_der_zeile, zaehler) → None
+# Wird pro Feld einmal über eine Factory (source_field, target_field, cleaner) erzeugt.
+# bereinigungen_der_zeile nimmt (Vorlage, *Argumente)-Tupel oder fertige Strings auf.
+FieldCleaner = Callable[[Dict[str, Any], Dict[str, Any], List[Any], Dict[str, int]], None]
+
+# Typ-Konverter für field_cleaner: (wert, original_wert, bereinigungen_der_zeile, zaehler) → Wert
+Converter = Callable[[Any, Any, List[Any], Dict[str, int]], Any]
+
+
+def field_cleaner(source_field: str, target_field: str, cleaner: "DataCleaner",
+                  convert: Optional[Converter] = None) -> FieldCleaner:
+    """
+    Feld-Funktion mit Trim und NULL-Erkennung, danach convert (None = str).
+
+    Basis für eigene Typen, z.B.:
+        CONVERTERS = {**DataCleaner.CONVERTERS,
+                      Decimal: lambda s, t, c: field_cleaner(s, t, c, decimal_convert)}
+    """
+    null_values = cleaner.NULL_VALUES
+
+    def clean_field(row, cleaned, row_cleanings, counters):
+        value = original_value = row.get(source_field)
+        
+        # 1. Whitespace entfernen
+        if isinstance(value, str):
+            stripped = value.strip()
+            if stripped != value:
+                row_cleanings.append((MSG_WHITESPACE, source_field))
+                counters["whitespace_trimmed"] += 1
+            value = stripped
+        
+        # 2. Leere/NULL Werte zu None
+        if value is None or value in null_values:
+            if original_value is not None and original_value != "":
+                row_cleanings.append((MSG_NULL, source_field, original_value))
+                counters["null_converted"] += 1
+            cleaned[target_field] = None
+        
+        # 3. Typ konvertieren
+        elif convert is None:
+            cleaned[target_field] = str(value)
+        else:
+            try:
+                cleaned[target_field] = convert(value, original_value, row_cleanings, counters)
+            except CleaningError:
+                raise
+            except ValueError as e:
+                # Fehler eigener Konverter bekommen einen Code pro Feld
+                raise CleaningError(str(e), f"invalid_value:{source_field}")
+
+    return clean_field
+
+
+# Für int und float (die häufigsten Felder) ist die Konvertierung direkt eingebaut,
+# das spart einen Funktionsaufruf pro Zelle. Trim/NULL wie in field_cleaner.
+
+def _int_field(source_field: str, target_field: str, cleaner: "DataCleaner") -> FieldCleaner:
+    null_values = cleaner.NULL_VALUES
+
+    def clean_field(row, cleaned, row_cleanings, counters):
+        value = original_value = row.get(source_field)
+        
+        if isinstance(value, str):
+            stripped = value.strip()
+            if stripped != value:
+                row_cleanings.append((MSG_WHITESPACE, source_field))
+                counters["whitespace_trimmed"] += 1
+            value = stripped
+        
+        if value is None or value in null_values:
+            if original_value is not None and original_value != "":
+                row_cleanings.append((MSG_NULL, source_field, original_value))
+                counters["null_converted"] += 1
+            cleaned[target_field] = None
+            return
+        
+        try:
+            # Ganzzahlen direkt (exakt auch über 2**53, z.B. ALKIS-Kennzeichen), sonst über float ("1.0")
+            result = int(value) if isinstance(value, str) and value.isdigit() else int(float(value))
+        except (ValueError, TypeError):
+            raise CleaningError(f"Feld '{source_field}': '{value}' ist kein gültiger int", f"invalid_int:{source_field}")
+        if isinstance(original_value, str):
+            row_cleanings.append((MSG_INTEGER, source_field, value, result))
+            counters["type_converted"] += 1
+        cleaned[target_field] = result
+
+    return clean_field
+
+
+def _float_field(source_field: str, target_field: str, cleaner: "DataCleaner") -> FieldCleaner:
+    null_values = cleaner.NULL_VALUES
+
+    def clean_field(row, cleaned, row_cleanings, counters):
+        value = original_value = row.get(source_field)
+        
+        if isinstance(value, str):
+            stripped = value.strip()
+            if stripped != value:
+                row_cleanings.append((MSG_WHITESPACE, source_field))
+                counters["whitespace_trimmed"] += 1
+            value = stripped
+        
+        if value is None or value in null_values:
+            if original_value is not None and original_value != "":
+                row_cleanings.append((MSG_NULL, source_field, original_value))
+                counters["null_converted"] += 1
+            cleaned[target_field] = None
+            return
+        
+        # Komma zu Punkt für deutsche Zahlen
+        if isinstance(value, str) and "," in value:
+            value_converted = value.replace(",", ".")
+            row_cleanings.append((MSG_COMMA, source_field, value, value_converted))
+            counters["comma_to_point"] += 1
+            value = value_converted
+        try:
+            result = float(value)
+        except (ValueError, TypeError):
+            raise CleaningError(f"Feld '{source_field}': '{value}' ist kein gültiger float", f"invalid_float:{source_field}")
+        if isinstance(original_value, str):
+            counters["type_converted"] += 1
+        cleaned[target_field] = result
+
+    return clean_field
+
+
+def _interned_field(source_field: str, target_field: str, cleaner: "DataCleaner",
+                    interner: ValueInterner) -> FieldCleaner:
+    """
+    Wie field_cleaner für str, aber Trim, NULL-Erkennung und Normalisierung
+    laufen einmal pro Rohwert; danach kommt das Ergebnis aus dem Cache.
+    """
+    null_values = cleaner.NULL_VALUES
+    clean_other = field_cleaner(source_field, target_field, cleaner, lambda value, *_: interner(str(value)))
+    # Rohwert → (Wert, Whitespace entfernt, NULL)
+    cache: Dict[str, Tuple[Optional[str], bool, bool]] = {}
+
+    def clean_field(row, cleaned, row_cleanings, counters):
+        value = row.get(source_field)
+        
+        try:
+            result, trimmed, is_null = cache[value]
+        except (KeyError, TypeError):
+            if type(value) is not str:
+                return clean_other(row, cleaned, row_cleanings, counters)
+            stripped = value.strip()
+            trimmed = stripped != value
+            is_null = stripped in null_values
+            result = None if is_null else interner(stripped)
+            if len(cache) < interner.max_size:
+                cache[value] = (result, trimmed, is_null)
+        
+        if trimmed:
+            row_cleanings.append((MSG_WHITESPACE, source_field))
+            counters["whitespace_trimmed"] += 1
+        if is_null and value != "":
+            row_cleanings.append((MSG_NULL, source_field, value))
+            counters["null_converted"] += 1
+        cleaned[target_field] = result
+
+    return clean_field
+
+
+class DateFormatInference:
+    """
+    Datumserkennung für eine Spalte, gleiches Ergebnis wie DataCleaner._parse_date.
+
+    - ISO-Werte ("2024-01-15", "2024-01-15 10:30:00") über datetime.fromisoformat
+    - nach sample_size erkannten Werten wird das häufigste Format fest gewählt
+      und zuerst probiert; passt es nicht, wird die ganze Liste durchsucht
+    - wiederholte Werte kommen aus einem LRU-Cache
+
+    Die Formate in DATE_FORMATS schließen sich gegenseitig aus (jeder Wert passt
+    auf höchstens eins), deshalb ändert die Reihenfolge das Ergebnis nicht.
+    """
+
+    def __init__(self, formats: List[str], null_values, sample_size: int = DATE_SAMPLE_SIZE,
+                 cache_size: int = DATE_CACHE_SIZE):
+        self.formats = list(formats)
+        self.null_values = null_values
+        self.sample_size = sample_size
+        self.parse = lru_cache(maxsize=cache_size)(self._parse)
+        self.reset()
+
+    def reset(self) -> None:
+        """Vergisst Format und Cache (neue Datei)."""
+        self.locked: Optional[str] = None
+        self.matches = [0] * len(self.formats)
+        self.parse.cache_clear()
+
+    def _parse(self, value: Any) -> Optional[datetime]:
+        if not value or value in self.null_values:
+            return None
 
+        value = str(value).strip()
+
+        if _ISO_DATE.fullmatch(value):
+            try:
+                return datetime.fromisoformat(value)
+            except ValueError:
+                pass  # z.B. 2024-02-30, die Formate lehnen das ebenfalls ab
+
+        if self.locked is not None:
+            try:
+                return datetime.strptime(value, self.locked)
+            except ValueError:
+                pass
+
+        for index, fmt in enumerate(self.formats):
+            try:
+                result = datetime.strptime(value, fmt)
+            except ValueError:
+                continue
+            if self.locked is None:
+                self._learn(index)
+            return result
+
+        return None
+
+    def _learn(self, index: int) -> None:
+        self.matches[index] += 1
+        if sum(self.matches) >= self.sample_size:
+            self.locked = self.formats[self.matches.index(max(self.matches))]
+
+
+def _datetime_field(source_field: str, target_field: str, cleaner: "DataCleaner") -> FieldCleaner:
+    if type(cleaner)._parse_date is DataCleaner._parse_date:
+        inference = DateFormatInference(cleaner.DATE_FORMATS, cleaner.NULL_VALUES)
+        cleaner._date_inferences.append(inference)
+        parse_date = inference.parse
+    else:
+        # Eigenes _parse_date einer Unterklasse unverändert nutzen
+        parse_date = cleaner._parse_date
+
+    def convert(value, original_value, row_cleanings, counters):
+        try:
+            parsed_date = parse_date(value)
+        except (ValueError, TypeError):
+            parsed_date = None
+        if parsed_date is None:
+            raise CleaningError(f"Feld '{source_field}': '{value}' ist kein gültiger datetime",
+                                f"invalid_datetime:{source_field}")
+        row_cleanings.append((MSG_DATE, source_field, value, parsed_date))
+        counters["date_converted"] += 1
+        return parsed_date
+
+    return field_cleaner(source_field, target_field, cleaner, convert)
 
 
 class DataCleaner:
@@ -53,133 +387,254 @@ class DataCleaner:
 
     # Werte die als NULL behandelt werden
     NULL_VALUES = {"", "null", "NULL", "None", "N/A", "n/a", "-"}
-    
-    def __init__(self):
-        # Zähler für durchgeführte Bereinigungen
-        self.cleanings_performed = {
-            "whitespace_trimmed": 0,
-            "null_converted": 0,
-            "comma_to_point": 0,
-            "type_converted": 0,
-            "date_converted": 0,
-        }
-        # Detaillierte Bereinigungen pro Zeile
-        self.cleaning_details = []
 
+    # Zielfelder mit wenigen verschiedenen Werten → Normalisierung (None = nur internieren)
+    INTERNED_FIELDS = {
+        "gemeinde": None,
+        "bundesland": canonical_bundesland,
+    }
+
+    # Spaltenprofile im Report: ungefähre Anzahl verschiedener Werte bzw. Quantile
+    # (min/max/mean und NULL-Anteil gibt es für alle Zahlen- bzw. alle Spalten)
+    PROFILE_DISTINCT = ("gemeinde", "flurstuecknummer")
+    PROFILE_QUANTILES = ("groesse_ha",)
+
+    # Typ → Factory für die Feld-Funktion (siehe field_cleaner).
+    # Eigene Typen in einer Unterklasse ergänzen; unbekannte Typen werden wie str behandelt.
+    CONVERTERS = {
+        int: _int_field,
+        float: _float_field,
+        datetime: _datetime_field,
+        str: field_cleaner,
+    }
     
-    def clean(self, raw_data: List[Dict[str, Any]]) -> Tuple[List[Dict], List[Dict]]:
+    def __init__(self, details_limit: Optional[int] = CLEANING_DETAILS_LIMIT, details_mode: str = "first",
+                 seed: Optional[int] = None, errors_limit: Optional[int] = ERROR_EXAMPLES_LIMIT,
+                 profile: bool = True, duplicates: Optional[str] = None):
+        """
+        Args:
+            details_limit: max. Zeilen in cleaning_details (None = alle)
+            details_mode: "first" (erste Zeilen) oder "sample" (Reservoir-Stichprobe)
+            seed: Startwert für die Stichprobe (für reproduzierbare Reports)
+            errors_limit: max. vollständig gespeicherte Fehlerzeilen (None = alle)
+            profile: Spaltenprofile für den Report berechnen
+            duplicates: Regel für doppelte IDs ("first", "last", "reject"; None = keine Prüfung)
+        """
+        if details_mode not in DETAILS_MODES:
+            raise ValueError(f"Unbekannter Details-Modus: {details_mode}")
+        if duplicates is not None and duplicates not in DUPLICATE_POLICIES:
+            raise ValueError(f"Unbekannte Duplikat-Regel: {duplicates}")
+        self.details_limit = details_limit
+        self.details_mode = details_mode
+        self.errors_limit = errors_limit
+        self.profile = profile
+        self.duplicates = duplicates
+        self._random = random.Random(seed)
+        # Eigener Zufallsgenerator, damit die Details-Stichprobe unabhängig vom Profil bleibt
+        self._profile_random = random.Random(seed)
+        # Formaterkennung der Datumsspalten (füllt _compile_converters)
+        self._date_inferences: List[DateFormatInference] = []
+        # Interner-Caches der Spalten aus INTERNED_FIELDS (bleiben über clean()-Aufrufe erhalten)
+        self._interners = {target: ValueInterner(normalize) for target, normalize in self.INTERNED_FIELDS.items()}
+        self._converters = self._compile_converters()
+        self.reset()
+
+    def _compile_converters(self) -> Tuple[FieldCleaner, ...]:
+        """
+        Übersetzt FIELD_MAPPING einmalig in eine Folge von Feld-Funktionen.
+
+        Jede Funktion liest ihr Quellfeld, entfernt Whitespace, erkennt NULL-Werte,
+        konvertiert in den Zieltyp und schreibt das Ergebnis in die bereinigte Zeile.
+        """
+        return tuple(
+            self._field_function(source_field, target_field, expected_type)
+            for source_field, (target_field, expected_type) in self.FIELD_MAPPING.items()
+        )
+
+    def _field_function(self, source_field: str, target_field: str, expected_type: type) -> FieldCleaner:
+        interner = self._interners.get(target_field)
+        if interner is not None and expected_type is str and self.CONVERTERS.get(str) is field_cleaner:
+            return _interned_field(source_field, target_field, self, interner)
+        return self.CONVERTERS.get(expected_type, field_cleaner)(source_field, target_field, self)
+
+    def reset(self) -> None:
+        """Beginnt eine neue Statistik (Zähler, Details, Fehler)."""
+        profile = None
+        if self.profile:
+            profile = TableProfile(self.FIELD_MAPPING, self.PROFILE_DISTINCT, self.PROFILE_QUANTILES,
+                                   self._profile_random)
+        self.stats = CleaningStats(self.details_limit, self.details_mode, self.errors_limit, self._random, profile,
+                                   self.duplicates)
+        # ID → Zeile des ersten Auftretens (Hash-Tabelle über die ganze Datei)
+        self.seen_ids: Dict[Any, int] = {}
+        self._collapse_pending = False
+        # Datumsformate werden pro Datei neu erkannt
+        for inference in self._date_inferences:
+            inference.reset()
+
+    # Zugriff auf die Statistik des letzten Laufs
+    @property
+    def cleanings_performed(self) -> Dict[str, int]:
+        return self.stats.cleanings_performed
+
+    @property
+    def cleaning_details(self) -> List[Dict[str, Any]]:
+        return self.stats.cleaning_details
+
+    @property
+    def rows_with_cleanings(self) -> int:
+        return self.stats.rows_with_cleanings
+
+    @property
+    def error_collector(self) -> ErrorCollector:
+        return self.stats.error_collector
+
+    def details_full(self) -> bool:
+        return self.stats.details_full()
+
+    def _details_entry(self, row_num: int) -> Optional[Dict[str, Any]]:
+        return self.stats.details_entry(row_num)
+
+    def merge_details(self, details: List[Dict[str, Any]], rows_with_cleanings: int) -> None:
+        self.stats.merge_details(details, rows_with_cleanings)
+
+    def clean(self, raw_data: List[Dict[str, Any]], log_summary: bool = True) -> Tuple[List[Dict], List[Dict]]:
         """
         Bereinigt die Rohdaten.
         
         Args:
             raw_data: Liste von Dicts aus dem Parser
+            log_summary: eine Warnung pro Fehler-Code loggen
             
         Returns:
             Tuple von (bereinigte_daten, fehlerhafte_zeilen)
+            Fehlerhafte Zeilen sind die ersten errors_limit Beispiele,
+            die vollständige Zählung steht in self.error_collector.
         """
         # Reset counters
-        self.cleanings_performed = {
-            "whitespace_trimmed": 0,
-            "null_converted": 0,
-            "comma_to_point": 0,
-            "type_converted": 0,
-            "date_converted": 0,
-        }
-        self.cleaning_details = []
+        self.reset()
         
         cleaned = []
-        errors = []
+        self._clean_rows(raw_data, cleaned, 1)
+        cleaned = self._collapse_duplicates(cleaned)
+        self.stats.add_batch(raw_data, cleaned)
         
-        for row_index, row in enumerate(raw_data):
-            row_cleanings = []  # Bereinigungen für diese Zeile
-            
-            try:
-                cleaned_row, row_cleanings = self._clean_row(row, row_index + 1)
-                self._validate_row(cleaned_row)
-                self._validate_semantics(cleaned_row)
-                cleaned.append(cleaned_row)
-                
-                # Bereinigungen protokollieren
-                if row_cleanings:
-                    self.cleaning_details.append({
-                        "row": row_index + 1,
-                        "cleanings": row_cleanings
-                    })
-                    
-            except Exception as e:
-                errors.append({
-                    "row": row_index + 1,
-                    "data": row,
-                    "error": str(e)
-                })
-                logger.warning(f"Zeile {row_index + 1} fehlerhaft: {e}")
-        
-        return cleaned, errors
+        if log_summary:
+            self.error_collector.log_summary(logger)
+        return cleaned, self.error_collector.examples
     
-    def _clean_row(self, row: Dict[str, Any], row_num: int) -> Tuple[Dict[str, Any], List[str]]:
+    def clean_iter(self, rows: Iterable[Dict[str, Any]], batch_size: int = CLEAN_BATCH_SIZE,
+                   log_summary: bool = True) -> Iterator[List[Dict]]:
+        """
+        Bereinigt einen Zeilen-Iterator blockweise mit konstantem Speicherbedarf.
+        
+        Liefert pro Block die gültigen Zeilen. Zähler, Details und Fehler
+        stehen fortlaufend in self.stats (vollständig nach dem letzten Block),
+        self.report() erzeugt daraus den Report.
+
+        Bei duplicates="last" gilt die letzte Zeile jeder ID über die ganze Datei:
+        die gültigen Zeilen werden bis zum Ende gehalten (Speicher wächst mit der
+        Zahl der IDs) und erst danach in Blöcken geliefert, jede ID genau einmal
+        an der Position ihres ersten Vorkommens.
+        """
+        self.reset()
+        stats = self.stats
+        iterator = iter(rows)
+        latest = {} if self.duplicates == "last" else None
+        
+        while True:
+            batch = list(islice(iterator, batch_size))
+            if not batch:
+                break
+            cleaned = []
+            self._clean_rows(batch, cleaned, stats.total_rows + 1)
+            if latest is not None:
+                self._collapse_pending = False
+                for row in cleaned:
+                    latest[row["id"]] = row
+                stats.add_batch(batch, [])
+                continue
+            stats.add_batch(batch, cleaned)
+            yield cleaned
+        
+        if latest:
+            collapsed = list(latest.values())
+            latest.clear()
+            for start in range(0, len(collapsed), batch_size):
+                cleaned = collapsed[start:start + batch_size]
+                stats.add_batch([], cleaned)
+                yield cleaned
+        
+        if log_summary:
+            self.error_collector.log_summary(logger)
+    
+    def _clean_rows(self, raw_data: List[Dict[str, Any]], cleaned: List[Dict], first_row: int) -> None:
+        for row_num, row in enumerate(raw_data, first_row):
+            self._clean_one(row, row_num, cleaned)
+    
+    def _clean_one(self, row: Dict[str, Any], row_num: int, cleaned: List[Dict]) -> None:
+        """Bereinigt und validiert eine Zeile, hängt sie an cleaned oder an den ErrorCollector an."""
+        try:
+            cleaned_row, row_cleanings = self._clean_row(row, row_num)
+            self._accept_row(cleaned_row, row_cleanings, row_num, cleaned)
+        except Exception as e:
+            self.error_collector.add(row_num, row, e)
+    
+    def _accept_row(self, cleaned_row: Dict[str, Any], row_cleanings: List[Any], row_num: int,
+                    cleaned: List[Dict]) -> None:
+        """Validiert eine bereinigte Zeile und hängt sie an cleaned an (Fehler als Exception)."""
+        self._validate_row(cleaned_row)
+        self._validate_semantics(cleaned_row)
+        if self.duplicates is not None:
+            row_id = cleaned_row["id"]
+            first_row = self.seen_ids.setdefault(row_id, row_num)
+            if first_row != row_num and not self._accept_duplicate(row_id, row_num, first_row):
+                return
+        cleaned.append(cleaned_row)
+        
+        # Bereinigungen protokollieren (Meldungen nur für gespeicherte Zeilen formatieren)
+        if row_cleanings:
+            entry = self._details_entry(row_num)
+            if entry is not None:
+                entry["cleanings"] = render_cleanings(row_cleanings)
+    
+    def _accept_duplicate(self, row_id: Any, row_num: int, first_row: int) -> bool:
+        """
+        Behandelt eine Zeile mit bereits gesehener ID nach self.duplicates.
+
+        Returns:
+            True wenn die Zeile übernommen wird ("last"), False wenn sie verworfen wird ("first").
+            Bei "reject" wird ein CleaningError ausgelöst.
+        """
+        self.stats.add_duplicate(row_id, row_num, first_row)
+        if self.duplicates == "reject":
+            raise CleaningError(f"ID {row_id} ist doppelt (erstmals in Zeile {first_row})", "duplicate_id")
+        if self.duplicates == "last":
+            self._collapse_pending = True
+            return True
+        return False
+
+    def _collapse_duplicates(self, cleaned: List[Dict]) -> List[Dict]:
+        """Behält bei duplicates="last" nur die letzte Zeile jeder ID (an der Position der ersten)."""
+        if not self._collapse_pending:
+            return cleaned
+        self._collapse_pending = False
+        return list({row["id"]: row for row in cleaned}.values())
+
+    def _clean_row(self, row: Dict[str, Any], row_num: int) -> Tuple[Dict[str, Any], List[Any]]:
         """
         Bereinigt eine einzelne Zeile.
         
         Returns:
             Tuple von (bereinigte_zeile, liste_der_bereinigungen)
+            Die Bereinigungen sind noch nicht formatiert (siehe render_cleanings).
         """
         cleaned = {}
         row_cleanings = []
+        counters = self.stats.cleanings_performed
         
-        for source_field, (target_field, expected_type) in self.FIELD_MAPPING.items():
-            value = row.get(source_field)
-            original_value = value
-            
-            # 1. Whitespace entfernen
-            if isinstance(value, str):
-                stripped = value.strip()
-                if stripped != value:
-                    row_cleanings.append(f"'{source_field}': Whitespace entfernt")
-                    self.cleanings_performed["whitespace_trimmed"] += 1
-                value = stripped
-            
-            # 2. Leere/NULL Werte zu None
-            if value in self.NULL_VALUES or value is None:
-                if original_value not in [None, ""]:
-                    row_cleanings.append(f"'{source_field}': '{original_value}' → NULL")
-                    self.cleanings_performed["null_converted"] += 1
-                cleaned[target_field] = None
-                continue
-            
-            # 3. Typ konvertieren
-            try:
-                if expected_type == int:
-                    cleaned[target_field] = int(float(value))
-                    if isinstance(original_value, str):
-                        row_cleanings.append(f"'{source_field}': String '{value}' → Integer {cleaned[target_field]}")
-                        self.cleanings_performed["type_converted"] += 1
-                        
-                elif expected_type == float:
-                    # Komma zu Punkt für deutsche Zahlen
-                    if isinstance(value, str) and "," in value:
-                        value_converted = value.replace(",", ".")
-                        row_cleanings.append(f"'{source_field}': Komma zu Punkt '{value}' → '{value_converted}'")
-                        self.cleanings_performed["comma_to_point"] += 1
-                        value = value_converted
-                    
-                    cleaned[target_field] = float(value)
-                    if isinstance(original_value, str):
-                        self.cleanings_performed["type_converted"] += 1
-                        
-                elif expected_type == datetime:
-                    # Datum parsen
-                    parsed_date = self._parse_date(value)
-                    if parsed_date is None:
-                        raise ValueError(f"Feld '{source_field}': '{value}' ist kein gültiges Datum")
-                    cleaned[target_field] = parsed_date
-                    row_cleanings.append(f"'{source_field}': '{value}' → Datum {parsed_date}")
-                    self.cleanings_performed["date_converted"] += 1
-                    
-                else:
-                    cleaned[target_field] = str(value)
-                    
-            except (ValueError, TypeError):
-                raise ValueError(f"Feld '{source_field}': '{value}' ist kein gültiger {expected_type.__name__}")
+        for clean_field in self._converters:
+            clean_field(row, cleaned, row_cleanings, counters)
         
         return cleaned, row_cleanings
     
@@ -207,28 +662,33 @@ class DataCleaner:
     def _validate_row(self, row: Dict[str, Any]) -> None:
         """Validiert Wertebereiche und Pflichtfelder."""
         errors = []
+        codes = []
         
         # ID muss vorhanden sein
         if row.get("id") is None:
             errors.append("ID fehlt (Pflichtfeld)")
+            codes.append("missing_id")
         
         # Latitude: -90 bis 90
         lat = row.get("latitude")
         if lat is not None and (lat < -90 or lat > 90):
             errors.append(f"latitude {lat} ungültig (muss zwischen -90 und 90 sein)")
+            codes.append("latitude_out_of_range")
         
         # Longitude: -180 bis 180
         lon = row.get("longitude")
         if lon is not None and (lon < -180 or lon > 180):
             errors.append(f"longitude {lon} ungültig (muss zwischen -180 und 180 sein)")
+            codes.append("longitude_out_of_range")
         
         # Größe: nicht negativ
         groesse = row.get("groesse_ha")
         if groesse is not None and groesse < 0:
             errors.append(f"groesse_ha {groesse} ungültig (darf nicht negativ sein)")
+            codes.append("negative_groesse_ha")
         
         if errors:
-            raise ValueError("; ".join(errors))
+            raise CleaningError("; ".join(errors), *codes)
 
     def _validate_semantics(self, row: Dict[str, Any]) -> None:
         """Validiert semantische Korrektheit der Daten."""
@@ -237,84 +697,36 @@ class DataCleaner:
         # Bundesland prüfen
         bundesland = row.get("bundesland")
         if bundesland is not None:
-            if bundesland.lower() not in VALID_BUNDESLAENDER:
+            # Offizielle Namen (nach Normalisierung der Normalfall) ohne lower()
+            if bundesland not in CANONICAL_BUNDESLAENDER and bundesland.lower() not in VALID_BUNDESLAENDER:
                 errors.append(f"'{bundesland}' ist kein gültiges deutsches Bundesland")
     
         if errors:
-            raise ValueError("; ".join(errors))
+            raise CleaningError("; ".join(errors), "unknown_bundesland")
+
+    def report(self) -> Dict:
+        """Report aus der gesammelten Statistik (nach clean() oder clean_iter())."""
+        return self.stats.report(list(self.FIELD_MAPPING.keys()))
 
-    def generate_report(self, raw_data: List[Dict], cleaned_data: List[Dict], errors: List[Dict]) -> Dict:
+    def generate_report(self, raw_data: List[Dict], cleaned_data: List[Dict], errors: List[Dict],
+                        total_rows: Optional[int] = None, columns_found: Optional[List[str]] = None) -> Dict:
         """
-        Generiert einen detaillierten Datenqualitäts-Report.
+        Generiert einen detaillierten Datenqualitäts-Report (siehe CleaningStats.report).
         
-        Enthält:
-        - Status (OK / FIXABLE / INVALID)
-        - Anzahl Zeilen (gesamt, gültig, fehlerhaft)
-        - Durchgeführte Bereinigungen (aggregiert + Details)
-        - Fehlerliste
+        total_rows/columns_found ersetzen die Werte aus raw_data, wenn die
+        Rohdaten nicht als Liste vorliegen (z.B. beim parallelen Parsen).
+        Fehler werden über self.error_collector gezählt, `errors` sind nur die Beispiele.
         """
-        # Fehler gruppieren
-        error_summary = {}
-        for err in errors:
-            error_msg = err["error"]
-            if error_msg in error_summary:
-                error_summary[error_msg] += 1
-            else:
-                error_summary[error_msg] = 1
-        
-        # Status bestimmen
-        if len(errors) == 0:
-            status = "OK"
-            status_description = "Alle Daten sind konform und können gespeichert werden."
-        elif len(cleaned_data) > 0:
-            status = "FIXABLE"
-            status_description = f"{len(cleaned_data)} von {len(raw_data)} Zeilen sind gültig nach Bereinigung. {len(errors)} Zeilen haben Fehler."
-        else:
-            status = "INVALID"
-            status_description = "Keine gültigen Daten. Datei kann nicht verarbeitet werden."
-        
-        # Bereinigungen die durchgeführt wurden (mit Anzahl)
-        cleanings_applied = []
-        if self.cleanings_performed["whitespace_trimmed"] > 0:
-            cleanings_applied.append(f"Whitespace entfernt ({self.cleanings_performed['whitespace_trimmed']}x)")
-        if self.cleanings_performed["null_converted"] > 0:
-            cleanings_applied.append(f"Leere Werte zu NULL konvertiert ({self.cleanings_performed['null_converted']}x)")
-        if self.cleanings_performed["comma_to_point"] > 0:
-            cleanings_applied.append(f"Komma zu Punkt konvertiert ({self.cleanings_performed['comma_to_point']}x)")
-        if self.cleanings_performed["type_converted"] > 0:
-            cleanings_applied.append(f"Typkonvertierung String → Zahl ({self.cleanings_performed['type_converted']}x)")
-        if self.cleanings_performed["date_converted"] > 0:
-            cleanings_applied.append(f"Datumskonvertierung String → datetime ({self.cleanings_performed['date_converted']}x)")
-        
-        # Immer anzeigen (auch wenn 0x)
-        cleanings_applied.append("Spaltennamen normalisiert (deutsch → snake_case)")
-        cleanings_applied.append("Wertebereiche validiert (lat: -90..90, lon: -180..180, größe: ≥0)")
-        cleanings_applied.append("Bundesland validiert (muss deutsches Bundesland sein)")
-        
-        # Zusammenfassung der Bereinigungen
-        total_cleanings = sum(self.cleanings_performed.values())
-        
-        return {
-            "status": status,
-            "status_description": status_description,
-            "readable": True,  # Datei war lesbar
-            "schema_conform": len(errors) == 0,
-            "total_rows": len(raw_data),
-            "valid_rows": len(cleaned_data),
-            "error_rows": len(errors),
-            "cleanings_summary": {
-                "total_cleanings": total_cleanings,
-                "whitespace_trimmed": self.cleanings_performed["whitespace_trimmed"],
-                "null_converted": self.cleanings_performed["null_converted"],
-                "comma_to_point": self.cleanings_performed["comma_to_point"],
-                "type_converted": self.cleanings_performed["type_converted"],
-                "date_converted": self.cleanings_performed["date_converted"],
-            },
-            "cleanings_applied": cleanings_applied,
-            "cleaning_details": self.cleaning_details[:10],  # Erste 10 Zeilen mit Details
-            "error_summary": error_summary,
-            "errors": errors[:10],
-            "preview": cleaned_data[:5],
-            "columns_found": list(raw_data[0].keys()) if raw_data else [],
-            "columns_mapped": list(self.FIELD_MAPPING.keys())
-        }
\ No newline at end of file
+        if total_rows is None:
+            total_rows = len(raw_data)
+        if columns_found is None:
+            columns_found = list(raw_data[0].keys()) if raw_data else []
+        
+        return self.stats.report(
+            list(self.FIELD_MAPPING.keys()),
+            total_rows=total_rows,
+            valid_rows=len(cleaned_data),
+            preview=cleaned_data[:5],
+            errors=errors,
+            columns_found=columns_found,
+        )
@@ -0,0 +1,113 @@
+"""
+Zeilenzahl der geodata-Tabelle, ohne jedes Mal die ganze Tabelle zu zählen.
+
+Strategien (?count= bei /api/data):
+- exact: SELECT count(*), liest die ganze Tabelle
+- estimate: Schätzung des Planers aus pg_class.reltuples (nur PostgreSQL,
+  veraltet bis zum nächsten VACUUM/ANALYZE), sonst wie counter
+- counter: Zähler in row_counts, angepasst bei Upload und Löschen über die API
+- none: nicht zählen
+
+Standard ist estimate. Der Zähler wird beim ersten Lesen einmal mit count(*)
+angelegt. Zeilen, die an der API vorbei geschrieben werden, zählt er nicht mit;
+dann hilft count=exact.
+"""
+import os
+from typing import Literal, Optional, Tuple
+
+from sqlalchemy import delete, func, select, text, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.geodata import Geodata, RowCount
+
+COUNT_STRATEGIES = ("exact", "estimate", "counter", "none")
+CountStrategy = Literal["exact", "estimate", "counter", "none"]
+
+# Standard für ?count= (estimate liest keine Tabelle, exact nur auf Wunsch)
+COUNT_STRATEGY = os.getenv("COUNT_STRATEGY", "estimate")
+
+TABLE_NAME = Geodata.__tablename__
+
+
+def _is_postgres(db: AsyncSession) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+async def exact_count(db: AsyncSession) -> int:
+    return await db.scalar(select(func.count()).select_from(Geodata))
+
+
+async def estimated_count(db: AsyncSession) -> Optional[int]:
+    """Schätzung aus der Planer-Statistik, None ohne PostgreSQL oder vor dem ersten ANALYZE."""
+    if not _is_postgres(db):
+        return None
+    estimate = await db.scalar(text(f"SELECT reltuples::bigint FROM pg_class WHERE oid = '{TABLE_NAME}'::regclass"))
+    # -1: Tabelle wurde noch nie analysiert
+    return estimate if estimate is not None and estimate >= 0 else None
+
+
+async def counter_value(db: AsyncSession) -> int:
+    """Wert des Zählers, beim ersten Aufruf mit count(*) angelegt."""
+    rows = await db.scalar(select(RowCount.rows).where(RowCount.table_name == TABLE_NAME))
+    if rows is not None:
+        return rows
+    rows = await exact_count(db)
+    try:
+        async with db.begin_nested():
+            db.add(RowCount(table_name=TABLE_NAME, rows=rows))
+    except IntegrityError:
+        # Ein paralleler Request hat den Zähler gerade angelegt
+        return await db.scalar(select(RowCount.rows).where(RowCount.table_name == TABLE_NAME))
+    return rows
+
+
+async def count_rows(db: AsyncSession, strategy: str = COUNT_STRATEGY) -> Tuple[Optional[int], str]:
+    """
+    Zeilenzahl nach der gewählten Strategie.
+
+    Returns:
+        Tuple von (anzahl oder None, tatsächlich genutzte Strategie)
+    """
+    if strategy not in COUNT_STRATEGIES:
+        raise ValueError(f"Unbekannte Zähl-Strategie: {strategy}")
+    if strategy == "none":
+        return None, strategy
+    if strategy == "exact":
+        return await exact_count(db), strategy
+    if strategy == "estimate":
+        estimate = await estimated_count(db)
+        if estimate is not None:
+            return estimate, strategy
+    return await counter_value(db), "counter"
+
+
+async def adjust_counter(db: AsyncSession, delta: int) -> None:
+    """Passt den Zähler an (in der Transaktion der Session, committet nicht)."""
+    if delta:
+        await db.execute(
+            update(RowCount).where(RowCount.table_name == TABLE_NAME).values(rows=RowCount.rows + delta)
+        )
+
+
+async def delete_all_rows(db: AsyncSession) -> int:
+    """
+    Löscht alle Geodaten und liefert die echte Anzahl gelöschter Zeilen. Committet nicht.
+
+    PostgreSQL: TRUNCATE statt zeilenweisem DELETE. Die Tabelle wird vorher exklusiv
+    gesperrt und unter der Sperre gezählt, die Anzahl gilt also genau für den
+    geleerten Stand (auch mit Zeilen, die an der API vorbei geschrieben wurden).
+    Andere Datenbanken: DELETE mit der Anzahl aus rowcount.
+    """
+    if _is_postgres(db):
+        await db.execute(text(f"LOCK TABLE {TABLE_NAME} IN ACCESS EXCLUSIVE MODE"))
+        deleted = await exact_count(db)
+        await db.execute(text(f"TRUNCATE {TABLE_NAME}"))
+        # Zähler ggf. anlegen (danach auf 0 gesetzt)
+        await counter_value(db)
+    else:
+        deleted = (await db.execute(delete(Geodata))).rowcount
+        # Zähler ggf. anlegen, danach auf 0 setzen
+        await counter_value(db)
+    await db.execute(update(RowCount).where(RowCount.table_name == TABLE_NAME).values(rows=0))
+    return deleted
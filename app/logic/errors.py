@@ -0,0 +1,90 @@
+"""
+Fehlerklassen und begrenzte Fehlersammlung für die Datenbereinigung.
+
+Jeder Fehler hat einen oder mehrere Codes (z.B. "invalid_float:longitude",
+"latitude_out_of_range"). Gezählt wird exakt pro Code, gespeichert werden
+nur die ersten N fehlerhaften Zeilen als vollständige Beispiele.
+"""
+import logging
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+# Anzahl fehlerhafter Zeilen die vollständig (inkl. Rohdaten) gespeichert werden
+ERROR_EXAMPLES_LIMIT = int(os.getenv("ERROR_EXAMPLES_LIMIT", "10"))
+
+
+class CleaningError(ValueError):
+    """Fehler beim Bereinigen/Validieren einer Zeile, mit Fehler-Codes."""
+
+    def __init__(self, message: str, *codes: str):
+        super().__init__(message)
+        self.codes = codes
+
+
+def error_codes(error: Exception) -> Tuple[str, ...]:
+    """Codes eines Fehlers; unerwartete Exceptions bekommen "exception:<Typ>"."""
+    return getattr(error, "codes", None) or (f"exception:{type(error).__name__}",)
+
+
+class ErrorCollector:
+    """
+    Sammelt fehlerhafte Zeilen mit konstantem Speicherbedarf.
+
+    - total: Anzahl fehlerhafter Zeilen
+    - counts: Code → Anzahl Zeilen (eine Zeile kann mehrere Codes haben)
+    - first: Code → (Zeile, Meldung) des ersten Auftretens
+    - examples: die ersten `limit` Zeilen als {"row", "data", "error", "codes"}
+    """
+
+    def __init__(self, limit: Optional[int] = ERROR_EXAMPLES_LIMIT):
+        self.limit = limit
+        self.total = 0
+        self.counts: Dict[str, int] = {}
+        self.first: Dict[str, Tuple[int, str]] = {}
+        self.examples: List[Dict[str, Any]] = []
+
+    def add(self, row_num: int, row: Dict[str, Any], error: Exception) -> None:
+        codes = error_codes(error)
+        message = str(error)
+        self.total += 1
+
+        for code in codes:
+            if code in self.counts:
+                self.counts[code] += 1
+            else:
+                self.counts[code] = 1
+                self.first[code] = (row_num, message)
+
+        if self.limit is None or len(self.examples) < self.limit:
+            self.examples.append({"row": row_num, "data": row, "error": message, "codes": list(codes)})
+
+    def merge(self, other: "ErrorCollector", row_offset: int = 0) -> None:
+        """Übernimmt ein Teilergebnis (in Dateireihenfolge), Zeilennummern werden verschoben."""
+        self.total += other.total
+        for code, count in other.counts.items():
+            if code in self.counts:
+                self.counts[code] += count
+            else:
+                self.counts[code] = count
+                row_num, message = other.first[code]
+                self.first[code] = (row_num + row_offset, message)
+
+        for example in other.examples:
+            if self.limit is not None and len(self.examples) >= self.limit:
+                break
+            self.examples.append({**example, "row": example["row"] + row_offset})
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Code → {"count", "first_row", "example"}, häufigste Codes zuerst."""
+        return {
+            code: {"count": count, "first_row": self.first[code][0], "example": self.first[code][1]}
+            for code, count in sorted(self.counts.items(), key=lambda item: -item[1])
+        }
+
+    def log_summary(self, logger: logging.Logger) -> None:
+        """Eine Log-Zeile pro Fehler-Code statt einer pro Zeile."""
+        for code, info in self.summary().items():
+            logger.warning(
+                f"{info['count']} Zeile(n) fehlerhaft [{code}], "
+                f"erstmals Zeile {info['first_row']}: {info['example']}"
+            )
@@ -0,0 +1,290 @@
+"""
+Paralleles Parsen und Bereinigen großer CSV-Dateien.
+
+Der Upload wird auf die Platte gespoolt und nach dem Header in
+zeilenbündige Byte-Bereiche aufgeteilt. Jeder Bereich wird in einem
+eigenen Prozess geparst und bereinigt; die Worker schreiben ihre gültigen
+Zeilen blockweise in eine Spool-Datei und liefern nur die CleaningStats
+zurück. Der Aufrufer liest die Blöcke in Dateireihenfolge wieder ein, der
+Speicherbedarf bleibt damit unabhängig von der Dateigröße. Doppelte IDs über
+Bereichsgrenzen hinweg werden dabei nach der Regel des Cleaners aufgelöst.
+
+Bereichsgrenzen liegen nur an Zeilenumbrüchen außerhalb von Anführungszeichen,
+Werte mit Zeilenumbrüchen ("a\\nb") werden also nicht geteilt.
+"""
+import multiprocessing
+import os
+import pickle
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, wait
+from itertools import islice
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Set, Tuple, Type
+
+from app.logging_config import get_logger
+from app.logic.cleaner import CLEAN_BATCH_SIZE, DataCleaner
+from app.logic.errors import CleaningError
+from app.parsers.csv_parser import CSVParser
+from app.parsers.streams import CHUNK_SIZE
+
+logger = get_logger("parallel")
+
+# Anzahl Worker-Prozesse (Standard: alle Kerne)
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", str(os.cpu_count() or 1)))
+
+# Kleinere Bereiche lohnen den Prozess-Overhead nicht
+MIN_RANGE_BYTES = int(os.getenv("PARSE_MIN_RANGE_BYTES", str(1024 * 1024)))
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """Prozess-Pool, wird beim ersten Aufruf erstellt und danach wiederverwendet."""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=PARSE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+def shutdown_executor() -> None:
+    """Beendet den Prozess-Pool (beim Shutdown der App)."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
+
+
+class _RangeReader:
+    """Liest erst den Header, dann genau den Byte-Bereich [start, end) einer Datei."""
+
+    def __init__(self, file: BinaryIO, header: bytes, start: int, end: int):
+        self._file = file
+        self._header = header
+        self._remaining = end - start
+        file.seek(start)
+
+    def read(self, size: int = -1) -> bytes:
+        if self._header:
+            data, self._header = self._header, b""
+            return data
+        if self._remaining <= 0:
+            return b""
+        if size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._file.read(size)
+        self._remaining -= len(data)
+        return data
+
+
+def _skip_to(f: BinaryIO, position: int) -> int:
+    """Liest bis position weiter und zählt die Anführungszeichen dazwischen."""
+    quotes = 0
+    while f.tell() < position:
+        chunk = f.read(min(CHUNK_SIZE, position - f.tell()))
+        if not chunk:
+            break
+        quotes += chunk.count(b'"')
+    return quotes
+
+
+def split_ranges(path: str, parts: int, min_range_bytes: int = MIN_RANGE_BYTES) -> Tuple[bytes, List[Tuple[int, int]]]:
+    """
+    Teilt eine CSV-Datei hinter dem Header in zeilenbündige Byte-Bereiche.
+
+    Die Datei wird dafür einmal gelesen: eine Grenze liegt nur hinter einem
+    Zeilenumbruch, vor dem eine gerade Anzahl Anführungszeichen steht (sonst
+    gehört der Umbruch zu einem Wert in Anführungszeichen).
+
+    Returns:
+        Tuple von (header_bytes, [(start, end), ...])
+    """
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        header = f.readline()
+        data_start = f.tell()
+        data_size = size - data_start
+
+        parts = max(1, min(parts, data_size // max(min_range_bytes, 1)))
+        boundaries = [data_start]
+        quotes = 0  # Anführungszeichen seit data_start
+        for i in range(1, parts):
+            quotes += _skip_to(f, data_start + data_size * i // parts)
+            # Bis zum nächsten Zeilenende außerhalb von Anführungszeichen weiterlesen
+            while True:
+                line = f.readline()
+                quotes += line.count(b'"')
+                if not line or quotes % 2 == 0:
+                    break
+            position = f.tell()
+            if boundaries[-1] < position < size:
+                boundaries.append(position)
+        boundaries.append(size)
+
+    return header, list(zip(boundaries, boundaries[1:]))
+
+
+def _parse_and_clean_range(path: str, header: bytes, start: int, end: int, spool_path: str,
+                           details_limit: Optional[int], details_mode: str, errors_limit: Optional[int],
+                           profile: bool, duplicates: Optional[str] = None,
+                           cleaner_class: Type[DataCleaner] = DataCleaner,
+                           batch_size: int = CLEAN_BATCH_SIZE) -> Dict[str, Any]:
+    """
+    Worker: parst und bereinigt einen Bereich (Zeilennummern beginnen bei 1).
+
+    Die gültigen Zeilen landen blockweise (pickle) in spool_path, zurück
+    kommen nur Statistik und IDs.
+    """
+    cleaner = cleaner_class(details_limit=details_limit, details_mode=details_mode, errors_limit=errors_limit,
+                            profile=profile, duplicates=duplicates)
+    with open(path, "rb") as f, open(spool_path, "wb") as spool:
+        rows = CSVParser().iter_rows(_RangeReader(f, header, start, end))
+        # Fehler werden erst nach dem Zusammenführen geloggt
+        for batch in cleaner.clean_iter(rows, batch_size, log_summary=False):
+            if batch:
+                pickle.dump(batch, spool, pickle.HIGHEST_PROTOCOL)
+    return {"spool": spool_path, "stats": cleaner.stats, "seen_ids": cleaner.seen_ids}
+
+
+def _read_spool(path: str) -> Iterator[List[Dict]]:
+    """Liest die Blöcke eines Workers in der geschriebenen Reihenfolge."""
+    with open(path, "rb") as spool:
+        while True:
+            try:
+                yield pickle.load(spool)
+            except EOFError:
+                return
+
+
+def _register_ids(cleaner: DataCleaner, seen_ids: Dict[Any, int], offset: int) -> Set[Any]:
+    """
+    Übernimmt die IDs eines Bereichs in cleaner.seen_ids.
+
+    seen_ids enthält die IDs des Bereichs mit Zeilennummer ab 1, cleaner.seen_ids
+    die der vorherigen Bereiche. Liefert die IDs, die schon vorher vorkamen.
+    """
+    known = cleaner.seen_ids
+    repeated = seen_ids.keys() & known.keys()
+    for row_id, row_num in seen_ids.items():
+        if row_id not in known:
+            known[row_id] = row_num + offset
+    return repeated
+
+
+def _merge_duplicates(cleaner: DataCleaner, rows: List[Dict], seen_ids: Dict[Any, int], offset: int,
+                      repeated: Set[Any]) -> List[Dict]:
+    """
+    Löst doppelte IDs zwischen einem Block eines Bereichs und den vorherigen Bereichen auf.
+
+    Innerhalb eines Bereichs hat der Worker schon aufgelöst. Liefert die Zeilen
+    des Blocks, die übernommen werden. Vorschau und Spaltenprofile der Worker
+    enthalten verworfene Zeilen weiterhin.
+    """
+    stats = cleaner.stats
+    kept = []
+    for row in rows:
+        row_id = row["id"]
+        if row_id not in repeated:
+            kept.append(row)
+            continue
+        row_num, first_row = seen_ids[row_id] + offset, cleaner.seen_ids[row_id]
+        stats.add_duplicate(row_id, row_num, first_row)
+        if cleaner.duplicates == "last":
+            kept.append(row)
+        elif cleaner.duplicates == "reject":
+            stats.error_collector.add(row_num, row, CleaningError(
+                f"ID {row_id} ist doppelt (erstmals in Zeile {first_row})", "duplicate_id"))
+    stats.valid_rows -= len(rows) - len(kept)
+    return kept
+
+
+def iter_clean_parallel(stream: BinaryIO, cleaner: DataCleaner, workers: Optional[int] = None,
+                        min_range_bytes: int = MIN_RANGE_BYTES, batch_size: int = CLEAN_BATCH_SIZE,
+                        log_summary: bool = True) -> Iterator[List[Dict]]:
+    """
+    Parst und bereinigt einen CSV-Stream parallel und liefert die gültigen Zeilen blockweise.
+
+    Die Blöcke eines Bereichs werden geliefert, sobald sein Worker fertig ist
+    und alle vorherigen Bereiche geliefert sind. Die Statistik der Worker wird
+    in cleaner.stats zusammengeführt (vollständig nach dem letzten Block),
+    damit cleaner.report() wie im seriellen Fall funktioniert.
+
+    Bei duplicates="last" kann erst nach dem letzten Bereich feststehen, welche
+    Zeile einer ID gilt; die Zeilen werden dann bis zum Ende gesammelt.
+    """
+    workers = workers or PARSE_WORKERS
+    # Jeder Worker sammelt höchstens so viele Details und Fehler-Beispiele wie der Report braucht
+    # Die Worker nutzen dieselbe Engine wie der Aufrufer
+    details = (cleaner.details_limit, cleaner.details_mode, cleaner.errors_limit, cleaner.profile,
+               cleaner.duplicates, type(cleaner), batch_size)
+    cleaner.reset()
+    stats = cleaner.stats
+    last_wins = cleaner.duplicates == "last"
+    latest: Dict[Any, Dict] = {}  # duplicates="last": ID → letzte Zeile (an der Position der ersten)
+    accepted = 0
+
+    with tempfile.TemporaryDirectory(prefix="parallel-") as spool_dir:
+        path = os.path.join(spool_dir, "upload.csv")
+        with open(path, "wb") as spool:
+            shutil.copyfileobj(stream, spool, CHUNK_SIZE)
+        header, ranges = split_ranges(path, workers, min_range_bytes)
+        logger.info(f"Parse {len(ranges)} Bereiche mit bis zu {workers} Prozessen")
+        spools = [os.path.join(spool_dir, f"range-{i}.pickle") for i in range(len(ranges))]
+
+        futures = []
+        if len(ranges) == 1:
+            results = iter([_parse_and_clean_range(path, header, *ranges[0], spools[0], *details)])
+        else:
+            executor = get_executor()
+            futures = [executor.submit(_parse_and_clean_range, path, header, start, end, spool_path, *details)
+                       for (start, end), spool_path in zip(ranges, spools)]
+            results = (future.result() for future in futures)
+
+        try:
+            # Ergebnisse in Dateireihenfolge zusammenführen
+            for result in results:
+                offset = stats.total_rows
+                stats.merge(result["stats"])
+                repeated = _register_ids(cleaner, result["seen_ids"], offset) if cleaner.duplicates else set()
+                for rows in _read_spool(result["spool"]):
+                    if repeated:
+                        rows = _merge_duplicates(cleaner, rows, result["seen_ids"], offset, repeated)
+                    if last_wins:
+                        accepted += len(rows)
+                        latest.update((row["id"], row) for row in rows)
+                    elif rows:
+                        yield rows
+                os.unlink(result["spool"])
+        finally:
+            # Abbruch (Fehler, Client weg): keine Worker mehr im Spool-Verzeichnis, bevor es gelöscht wird
+            for future in futures:
+                future.cancel()
+            wait(futures)
+
+    if last_wins:
+        # Letzte Zeile jeder ID gilt, auch über Bereichsgrenzen
+        stats.valid_rows -= accepted - len(latest)
+        rows = iter(latest.values())
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            yield batch
+
+    if log_summary:
+        cleaner.error_collector.log_summary(logger)
+
+
+def parse_and_clean_parallel(stream: BinaryIO, cleaner: DataCleaner, workers: Optional[int] = None,
+                             min_range_bytes: int = MIN_RANGE_BYTES) -> Tuple[List[Dict], List[Dict], int, List[str]]:
+    """
+    Wie iter_clean_parallel, sammelt aber alle gültigen Zeilen in einer Liste.
+
+    Returns:
+        Tuple von (bereinigte_daten, fehlerhafte_zeilen, anzahl_zeilen, gefundene_spalten)
+    """
+    cleaned = [row for rows in iter_clean_parallel(stream, cleaner, workers, min_range_bytes) for row in rows]
+    stats = cleaner.stats
+    return cleaned, stats.error_collector.examples, stats.total_rows, stats.columns_found
@@ -0,0 +1,317 @@
+"""
+Spaltenprofile für den Datenqualitäts-Report.
+
+Die Profile werden blockweise im selben Durchlauf wie die Bereinigung
+aktualisiert (CleaningStats.add_batch) und haben eine feste Größe,
+unabhängig von der Dateigröße:
+
+- Anzahl Werte und NULL-Anteil für jede Spalte
+- min/max/mean für Zahlenspalten (inf/nan werden nicht mitgezählt)
+- HyperLogLog für die ungefähre Anzahl verschiedener Werte (4 KB, ca. 1,6% Fehler)
+- Reservoir-Stichprobe für ungefähre Quantile
+
+Alle Profile lassen sich zusammenführen (Blöcke, Worker-Prozesse).
+"""
+import math
+import os
+import random
+from operator import itemgetter
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - NumPy ist optional
+    np = None
+
+# Werte in der Stichprobe für Quantile (bis zu dieser Anzahl sind die Quantile exakt)
+QUANTILE_SAMPLE_SIZE = int(os.getenv("QUANTILE_SAMPLE_SIZE", "1024"))
+
+# HyperLogLog: 2^12 Register
+HLL_PRECISION = 12
+
+# Längere Werte hasht hash64_many einzeln in Python statt spaltenweise
+HASH_VECTOR_MAX_LENGTH = 256
+
+# Quantile im Report
+QUANTILES = {"p05": 0.05, "p25": 0.25, "p50": 0.5, "p75": 0.75, "p95": 0.95}
+
+
+# FNV-1a über die Unicode-Codepoints, danach splitmix64 zum Durchmischen der Bits.
+# Stabil über Prozesse hinweg (hash() ist pro Prozess verschieden), damit
+# HyperLogLogs aus Worker-Prozessen zusammengeführt werden können.
+_FNV_OFFSET = 0xCBF29CE484222325
+_FNV_PRIME = 0x100000001B3
+_MASK64 = (1 << 64) - 1
+
+
+def _mix64(h: int) -> int:
+    h = ((h ^ (h >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    h = ((h ^ (h >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return h ^ (h >> 31)
+
+
+def hash64(value: str) -> int:
+    """Stabiler 64-Bit-Hash eines Strings (gleiches Ergebnis wie hash64_many)."""
+    h = _FNV_OFFSET
+    for char in value:
+        h = ((h ^ ord(char)) * _FNV_PRIME) & _MASK64
+    return _mix64(h)
+
+
+def _hash64_width(texts: List[str], width: int):
+    """hash64 für Strings gleicher Länge, spaltenweise über die Zeichen."""
+    h = np.full(len(texts), _FNV_OFFSET, dtype=np.uint64)
+    if width:
+        # Genau width Zeichen pro Wert, kein Auffüllen auf den längsten Wert der Spalte
+        codes = np.array(texts, dtype=f"<U{width}").view(np.uint32).reshape(len(texts), width)
+        prime = np.uint64(_FNV_PRIME)
+        for i in range(width):
+            h = (h ^ codes[:, i].astype(np.uint64)) * prime
+    h ^= h >> np.uint64(30)
+    h *= np.uint64(0xBF58476D1CE4E5B9)
+    h ^= h >> np.uint64(27)
+    h *= np.uint64(0x94D049BB133111EB)
+    h ^= h >> np.uint64(31)
+    return h
+
+
+def hash64_many(values: List[Any]):
+    """
+    hash64 für eine Liste von Werten (andere Typen über str()).
+
+    Mit NumPy pro Länge gruppiert über die verschiedenen Werte; Werte über
+    HASH_VECTOR_MAX_LENGTH Zeichen einzeln in Python. Der Speicher hängt so
+    von der Gesamtlänge der Werte ab, nicht von Anzahl × längster Wert.
+    """
+    if np is None:
+        return [hash64(str(value)) for value in values]
+
+    texts = list(map(str, values))
+    by_length: Dict[int, List[str]] = {}
+    hashes: Dict[str, int] = {}
+    for text in dict.fromkeys(texts):
+        if len(text) > HASH_VECTOR_MAX_LENGTH:
+            hashes[text] = hash64(text)
+        else:
+            by_length.setdefault(len(text), []).append(text)
+    for width, group in by_length.items():
+        hashes.update(zip(group, _hash64_width(group, width).tolist()))
+    return np.fromiter(map(hashes.__getitem__, texts), dtype=np.uint64, count=len(texts))
+
+
+class HyperLogLog:
+    """Ungefähre Anzahl verschiedener Werte mit 2^precision Registern."""
+
+    def __init__(self, precision: int = HLL_PRECISION):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add_many(self, values: List[Any]) -> None:
+        if not values:
+            return
+        shift = 64 - self.precision
+        mask = (1 << shift) - 1
+
+        if np is not None:
+            h = hash64_many(values)
+            index = (h >> np.uint64(shift)).astype(np.intp)
+            # Position der ersten 1 in den restlichen Bits (bis 52 Bit exakt als float64)
+            bit_length = np.frexp((h & np.uint64(mask)).astype(np.float64))[1]
+            rank = (shift - bit_length + 1).astype(np.uint8)
+            np.maximum.at(np.frombuffer(self.registers, dtype=np.uint8), index, rank)
+            return
+
+        registers = self.registers
+        for value in set(values):
+            h = hash64(str(value))
+            index = h >> shift
+            rank = shift - (h & mask).bit_length() + 1
+            if rank > registers[index]:
+                registers[index] = rank
+
+    def merge(self, other: "HyperLogLog") -> None:
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def estimate(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            # Wenige Werte: Linear Counting ist genauer
+            return round(m * math.log(m / zeros))
+        return round(raw)
+
+
+class ReservoirSample:
+    """
+    Gleichverteilte Stichprobe fester Größe (Algorithmus L: Zufallszahlen
+    nur für übernommene Werte, nicht für jeden Wert).
+    """
+
+    def __init__(self, size: int = QUANTILE_SAMPLE_SIZE, rng: Optional[random.Random] = None):
+        self.size = size
+        self.seen = 0
+        self.values: List[float] = []
+        self._random = rng or random.Random()
+        self._weight = 0.0
+        self._next = 0
+
+    def _uniform(self) -> float:
+        return self._random.random() or 1e-300
+
+    def _skip(self) -> None:
+        """Bestimmt die Position des nächsten übernommenen Werts."""
+        self._weight *= math.exp(math.log(self._uniform()) / self.size)
+        self._next += math.floor(math.log(self._uniform()) / math.log(1.0 - self._weight or 1e-300)) + 1
+
+    def add_many(self, values: List[float]) -> None:
+        if self.size <= 0:
+            return
+        start = self.seen
+        self.seen += len(values)
+
+        free = self.size - len(self.values)
+        if free > 0:
+            self.values.extend(values[:free])
+            if len(self.values) < self.size:
+                return
+            # Stichprobe gerade voll geworden, ab hier mit Sprüngen
+            self._next = start + free
+            self._weight = 1.0
+            self._skip()
+
+        while self._next <= self.seen:
+            self.values[self._random.randrange(self.size)] = values[self._next - start - 1]
+            self._skip()
+
+    def merge(self, other: "ReservoirSample") -> None:
+        """Gewichtete Zusammenführung beider Stichproben."""
+        if not other.seen:
+            return
+        if not self.seen:
+            self.values = list(other.values)
+            self.seen = other.seen
+        else:
+            own, theirs = list(self.values), list(other.values)
+            self._random.shuffle(own)
+            self._random.shuffle(theirs)
+            own_weight, other_weight = self.seen, other.seen
+            merged = []
+            while len(merged) < self.size and (own or theirs):
+                if own and (not theirs or self._random.randrange(own_weight + other_weight) < own_weight):
+                    merged.append(own.pop())
+                    own_weight -= 1
+                else:
+                    merged.append(theirs.pop())
+                    other_weight -= 1
+            self.values = merged
+            self.seen += other.seen
+
+        if len(self.values) >= self.size:
+            self._next = self.seen
+            self._weight = 1.0
+            self._skip()
+
+    def quantiles(self) -> Dict[str, float]:
+        ordered = sorted(self.values)
+        if not ordered:
+            return {}
+        return {name: ordered[min(len(ordered) - 1, int(q * len(ordered)))] for name, q in QUANTILES.items()}
+
+
+class ColumnProfile:
+    """Profil einer Spalte der bereinigten Daten."""
+
+    def __init__(self, numeric: bool = False, distinct: bool = False, quantiles: bool = False,
+                 rng: Optional[random.Random] = None):
+        self.count = 0
+        self.nulls = 0
+        self.numeric = numeric
+        self.finite = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self.distinct = HyperLogLog() if distinct else None
+        self.sample = ReservoirSample(rng=rng) if quantiles else None
+
+    def add_many(self, values: List[Any]) -> None:
+        self.count += len(values)
+        nulls = values.count(None)
+        self.nulls += nulls
+        present = [value for value in values if value is not None] if nulls else values
+
+        if self.distinct is not None:
+            self.distinct.add_many(present)
+
+        if self.numeric and present:
+            finite = list(filter(math.isfinite, present))
+            if finite:
+                self.finite += len(finite)
+                self.total += math.fsum(finite)
+                low, high = min(finite), max(finite)
+                self.min = low if self.min is None else min(self.min, low)
+                self.max = high if self.max is None else max(self.max, high)
+                if self.sample is not None:
+                    self.sample.add_many(finite)
+
+    def merge(self, other: "ColumnProfile") -> None:
+        self.count += other.count
+        self.nulls += other.nulls
+        self.finite += other.finite
+        self.total += other.total
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        if self.distinct is not None and other.distinct is not None:
+            self.distinct.merge(other.distinct)
+        if self.sample is not None and other.sample is not None:
+            self.sample.merge(other.sample)
+
+    def report(self) -> Dict[str, Any]:
+        result: Dict[str, Any] = {
+            "count": self.count,
+            "nulls": self.nulls,
+            "null_ratio": round(self.nulls / self.count, 4) if self.count else 0.0,
+        }
+        if self.numeric:
+            result["min"] = self.min
+            result["max"] = self.max
+            # gerundet: die Summe hängt sonst in den letzten Stellen von der Blockaufteilung ab
+            result["mean"] = round(self.total / self.finite, 6) if self.finite else None
+        if self.distinct is not None:
+            result["distinct_approx"] = self.distinct.estimate()
+        if self.sample is not None:
+            result["quantiles_approx"] = self.sample.quantiles()
+        return result
+
+
+class TableProfile:
+    """Profile aller Zielfelder, aktualisiert pro Block bereinigter Zeilen."""
+
+    def __init__(self, field_mapping: Dict[str, Any], distinct: Iterable[str] = (), quantiles: Iterable[str] = (),
+                 rng: Optional[random.Random] = None):
+        distinct, quantiles = set(distinct), set(quantiles)
+        self.columns = {
+            target: ColumnProfile(
+                numeric=expected_type in (int, float),
+                distinct=target in distinct,
+                quantiles=target in quantiles,
+                rng=rng,
+            )
+            for target, expected_type in field_mapping.values()
+        }
+
+    def add_many(self, cleaned: List[Dict[str, Any]]) -> None:
+        if not cleaned:
+            return
+        for target, column in self.columns.items():
+            column.add_many(list(map(itemgetter(target), cleaned)))
+
+    def merge(self, other: "TableProfile") -> None:
+        for target, column in self.columns.items():
+            if target in other.columns:
+                column.merge(other.columns[target])
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        return {target: column.report() for target, column in self.columns.items()}
@@ -0,0 +1,257 @@
+"""
+Zusammenführbare Statistik einer Bereinigung.
+
+CleaningStats enthält alles, was der Report braucht (Zeilen, Zähler,
+Bereinigungs-Details, Fehler, Vorschau), mit konstantem Speicherbedarf.
+Teilergebnisse (Blöcke beim Streamen, Worker-Prozesse) werden in
+Dateireihenfolge mit merge() zusammengeführt; report() erzeugt daraus
+denselben Report wie DataCleaner.generate_report().
+"""
+import random
+from typing import Any, Dict, List, Optional
+
+from app.logic.errors import ERROR_EXAMPLES_LIMIT, ErrorCollector
+from app.logic.profiling import TableProfile
+
+# Zeilen in der Vorschau des Reports
+PREVIEW_ROWS = 5
+
+# Fehler-Beispiele im Report
+REPORT_ERRORS = 10
+
+# Beispiele doppelter IDs im Report
+DUPLICATE_EXAMPLES = 10
+
+
+class CleaningStats:
+    """
+    Statistik einer Bereinigung.
+
+    - total_rows / valid_rows: gelesene bzw. gültige Zeilen
+    - columns_found: Spalten der ersten Zeile
+    - preview: die ersten PREVIEW_ROWS gültigen Zeilen
+    - cleanings_performed: Zähler pro Bereinigungsart
+    - cleaning_details / rows_with_cleanings: Meldungen (höchstens details_limit Zeilen)
+    - error_collector: Fehler pro Code und die ersten Beispiele
+    - profile: Spaltenprofile der gültigen Zeilen (optional)
+    - duplicate_rows / duplicate_examples: Zeilen mit bereits gesehener ID
+      (Zeile, erste Zeile der ID) und die Regel, nach der sie behandelt wurden
+    """
+
+    def __init__(self, details_limit: Optional[int] = None, details_mode: str = "first",
+                 errors_limit: Optional[int] = ERROR_EXAMPLES_LIMIT, rng: Optional[random.Random] = None,
+                 profile: Optional[TableProfile] = None, duplicate_policy: Optional[str] = None):
+        self.details_limit = details_limit
+        self.details_mode = details_mode
+        self._random = rng or random.Random()
+        self.total_rows = 0
+        self.valid_rows = 0
+        self.columns_found: List[str] = []
+        self.preview: List[Dict[str, Any]] = []
+        self.cleanings_performed = {
+            "whitespace_trimmed": 0,
+            "null_converted": 0,
+            "comma_to_point": 0,
+            "type_converted": 0,
+            "date_converted": 0,
+        }
+        self.cleaning_details: List[Dict[str, Any]] = []
+        self.rows_with_cleanings = 0
+        self.error_collector = ErrorCollector(errors_limit)
+        self.profile = profile
+        self.duplicate_policy = duplicate_policy
+        self.duplicate_rows = 0
+        self.duplicate_examples: List[Dict[str, Any]] = []
+
+    def add_batch(self, rows: List[Dict[str, Any]], cleaned: List[Dict[str, Any]]) -> None:
+        """Zählt einen bereinigten Block (Rohzeilen und gültige Zeilen)."""
+        if not self.columns_found and rows:
+            self.columns_found = list(rows[0].keys())
+        self.total_rows += len(rows)
+        self.valid_rows += len(cleaned)
+        if len(self.preview) < PREVIEW_ROWS:
+            self.preview.extend(cleaned[:PREVIEW_ROWS - len(self.preview)])
+        if self.profile is not None:
+            self.profile.add_many(cleaned)
+
+    def add_duplicate(self, row_id: Any, row_num: int, first_row: int) -> None:
+        """Zählt eine Zeile, deren ID schon in first_row vorkam."""
+        self.duplicate_rows += 1
+        if len(self.duplicate_examples) < DUPLICATE_EXAMPLES:
+            self.duplicate_examples.append({"id": row_id, "row": row_num, "first_row": first_row})
+
+    def details_full(self) -> bool:
+        """True wenn im Modus "first" keine weiteren Details mehr gesammelt werden."""
+        return (self.details_mode == "first" and self.details_limit is not None
+                and len(self.cleaning_details) >= self.details_limit)
+
+    def details_entry(self, row_num: int) -> Optional[Dict[str, Any]]:
+        """
+        Zählt eine Zeile mit Bereinigungen und entscheidet, ob ihre Meldungen
+        gespeichert werden. Liefert dann den (noch leeren) Eintrag in cleaning_details.
+        """
+        self.rows_with_cleanings += 1
+        limit = self.details_limit
+
+        if limit is None or len(self.cleaning_details) < limit:
+            entry = {"row": row_num, "cleanings": []}
+            self.cleaning_details.append(entry)
+            return entry
+
+        if self.details_mode == "sample":
+            # Reservoir-Sampling: jede Zeile landet mit Wahrscheinlichkeit limit/n im Report
+            slot = self._random.randrange(self.rows_with_cleanings)
+            if slot < limit:
+                entry = {"row": row_num, "cleanings": []}
+                self.cleaning_details[slot] = entry
+                return entry
+
+        return None
+
+    def merge_details(self, details: List[Dict[str, Any]], rows_with_cleanings: int) -> None:
+        """
+        Übernimmt die Details eines Teilergebnisses (z.B. eines Worker-Prozesses).
+
+        Die Teilergebnisse müssen in Dateireihenfolge übergeben werden.
+        Stichproben werden gewichtet nach ihrer Zeilenanzahl zusammengeführt.
+        """
+        limit = self.details_limit
+        if self.details_mode == "sample" and limit is not None and self.rows_with_cleanings and details:
+            own, other = list(self.cleaning_details), list(details)
+            self._random.shuffle(own)
+            self._random.shuffle(other)
+            own_weight, other_weight = self.rows_with_cleanings, rows_with_cleanings
+            merged = []
+            while len(merged) < limit and (own or other):
+                if own and (not other or self._random.randrange(own_weight + other_weight) < own_weight):
+                    merged.append(own.pop())
+                    own_weight -= 1
+                else:
+                    merged.append(other.pop())
+                    other_weight -= 1
+            self.cleaning_details = merged
+        else:
+            self.cleaning_details.extend(details)
+            if limit is not None:
+                del self.cleaning_details[limit:]
+
+        self.rows_with_cleanings += rows_with_cleanings
+
+    def merge(self, other: "CleaningStats") -> None:
+        """Hängt die Statistik des folgenden Dateiabschnitts an (Zeilennummern werden verschoben)."""
+        offset = self.total_rows
+        self.error_collector.merge(other.error_collector, offset)
+        self.merge_details([{**detail, "row": detail["row"] + offset} for detail in other.cleaning_details],
+                           other.rows_with_cleanings)
+        for key, count in other.cleanings_performed.items():
+            self.cleanings_performed[key] += count
+        if not self.columns_found:
+            self.columns_found = list(other.columns_found)
+        if len(self.preview) < PREVIEW_ROWS:
+            self.preview.extend(other.preview[:PREVIEW_ROWS - len(self.preview)])
+        if self.profile is not None and other.profile is not None:
+            self.profile.merge(other.profile)
+        self.duplicate_rows += other.duplicate_rows
+        for example in other.duplicate_examples[:DUPLICATE_EXAMPLES - len(self.duplicate_examples)]:
+            self.duplicate_examples.append({**example, "row": example["row"] + offset,
+                                            "first_row": example["first_row"] + offset})
+        self.total_rows += other.total_rows
+        self.valid_rows += other.valid_rows
+
+    def report(self, columns_mapped: List[str], total_rows: Optional[int] = None, valid_rows: Optional[int] = None,
+               preview: Optional[List[Dict]] = None, errors: Optional[List[Dict]] = None,
+               columns_found: Optional[List[str]] = None) -> Dict:
+        """
+        Erzeugt den Datenqualitäts-Report.
+
+        Enthält:
+        - Status (OK / FIXABLE / INVALID)
+        - Anzahl Zeilen (gesamt, gültig, fehlerhaft)
+        - Durchgeführte Bereinigungen (aggregiert + Details)
+        - Fehlerliste
+        - Doppelte IDs
+
+        Die optionalen Argumente ersetzen die gesammelten Werte
+        (für DataCleaner.generate_report mit vorhandenen Listen).
+        """
+        if total_rows is None:
+            total_rows = self.total_rows
+        if valid_rows is None:
+            valid_rows = self.valid_rows
+        if preview is None:
+            preview = self.preview
+        if errors is None:
+            errors = self.error_collector.examples
+        if columns_found is None:
+            columns_found = self.columns_found
+        counters = self.cleanings_performed
+
+        # Fehler gruppiert nach Code (exakt, auch wenn nur wenige Beispiele gespeichert sind)
+        error_rows = self.error_collector.total
+        error_summary = self.error_collector.summary()
+
+        # Status bestimmen
+        if error_rows == 0:
+            status = "OK"
+            status_description = "Alle Daten sind konform und können gespeichert werden."
+        elif valid_rows > 0:
+            status = "FIXABLE"
+            status_description = f"{valid_rows} von {total_rows} Zeilen sind gültig nach Bereinigung. {error_rows} Zeilen haben Fehler."
+        else:
+            status = "INVALID"
+            status_description = "Keine gültigen Daten. Datei kann nicht verarbeitet werden."
+
+        # Bereinigungen die durchgeführt wurden (mit Anzahl)
+        cleanings_applied = []
+        if counters["whitespace_trimmed"] > 0:
+            cleanings_applied.append(f"Whitespace entfernt ({counters['whitespace_trimmed']}x)")
+        if counters["null_converted"] > 0:
+            cleanings_applied.append(f"Leere Werte zu NULL konvertiert ({counters['null_converted']}x)")
+        if counters["comma_to_point"] > 0:
+            cleanings_applied.append(f"Komma zu Punkt konvertiert ({counters['comma_to_point']}x)")
+        if counters["type_converted"] > 0:
+            cleanings_applied.append(f"Typkonvertierung String → Zahl ({counters['type_converted']}x)")
+        if counters["date_converted"] > 0:
+            cleanings_applied.append(f"Datumskonvertierung String → datetime ({counters['date_converted']}x)")
+
+        # Immer anzeigen (auch wenn 0x)
+        cleanings_applied.append("Spaltennamen normalisiert (deutsch → snake_case)")
+        cleanings_applied.append("Wertebereiche validiert (lat: -90..90, lon: -180..180, größe: ≥0)")
+        cleanings_applied.append("Bundesland validiert (muss deutsches Bundesland sein)")
+
+        # Stichprobe in Zeilenreihenfolge anzeigen
+        cleaning_details = self.cleaning_details
+        if self.details_mode == "sample":
+            cleaning_details = sorted(cleaning_details, key=lambda detail: detail["row"])
+
+        return {
+            "status": status,
+            "status_description": status_description,
+            "readable": True,  # Datei war lesbar
+            "schema_conform": error_rows == 0,
+            "total_rows": total_rows,
+            "valid_rows": valid_rows,
+            "error_rows": error_rows,
+            "cleanings_summary": {
+                "total_cleanings": sum(counters.values()),
+                "whitespace_trimmed": counters["whitespace_trimmed"],
+                "null_converted": counters["null_converted"],
+                "comma_to_point": counters["comma_to_point"],
+                "type_converted": counters["type_converted"],
+                "date_converted": counters["date_converted"],
+            },
+            "cleanings_applied": cleanings_applied,
+            "rows_with_cleanings": self.rows_with_cleanings,
+            "cleaning_details": cleaning_details,  # höchstens details_limit Zeilen
+            "error_summary": error_summary,
+            "errors": errors[:REPORT_ERRORS],
+            "preview": preview[:PREVIEW_ROWS],
+            "columns_found": columns_found,
+            "columns_mapped": columns_mapped,
+            "column_profiles": self.profile.report() if self.profile is not None else {},
+            "duplicates": {
+                "policy": self.duplicate_policy,
+                "rows": self.duplicate_rows,
+                "examples": self.duplicate_examples,
+            },
+        }
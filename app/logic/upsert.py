@@ -0,0 +1,383 @@
+"""
+Mengenbasiertes Speichern (Upsert) der bereinigten Geodaten.
+
+PostgreSQL: INSERT ... ON CONFLICT (id) DO UPDATE pro Batch, die Anzahl
+neuer/aktualisierter Zeilen kommt über RETURNING (xmax = 0) zurück.
+Andere Datenbanken (z.B. SQLite in Tests): ein SELECT pro Batch für die
+vorhandenen IDs, danach Bulk-INSERT bzw. Bulk-UPDATE.
+
+Für sehr große Uploads gibt es zusätzlich den COPY-Modus (nur PostgreSQL):
+COPY ... FROM STDIN in eine temporäre Staging-Tabelle, danach ein einziges
+INSERT ... SELECT ... ON CONFLICT in die geodata-Tabelle.
+
+Für die async Endpunkte gibt es ingest_batches_async (AsyncSession): die
+Statements laufen über den Async-Treiber, die Event-Loop bleibt frei,
+während auf die Datenbank gewartet wird.
+
+Jedes Statement schreibt jede ID höchstens einmal (sonst bricht ON CONFLICT
+mit "command cannot affect row a second time" ab): bei doppelten IDs gilt
+die letzte Zeile, im COPY-Modus über die Reihenfolge in der Staging-Tabelle.
+Kommt eine ID in einem späteren Batch wieder, überschreibt der spätere
+Upsert die Zeile; gezählt wird jede ID nur einmal (eingefügt oder aktualisiert).
+"""
+import os
+from itertools import chain
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import insert, literal_column, select, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.logging_config import get_logger
+from app.models.geodata import Geodata
+
+logger = get_logger("upsert")
+
+# Ab dieser Zeilenzahl wählt der Modus "auto" COPY statt Batch-INSERTs
+COPY_THRESHOLD_ROWS = int(os.getenv("COPY_THRESHOLD_ROWS", "50000"))
+
+# Gültige Werte für den Ingest-Modus
+INGEST_MODES = ("auto", "batch", "copy")
+
+# Temporäre Tabelle für den COPY-Modus (wird beim Commit verworfen)
+STAGING_TABLE = "geodata_staging"
+
+# Alle Spalten der Zieltabelle (Reihenfolge für COPY)
+COLUMNS = [c.name for c in Geodata.__table__.columns]
+
+# Spalten die bei einem Konflikt überschrieben werden (alles außer der ID)
+UPDATE_COLUMNS = [c.name for c in Geodata.__table__.columns if c.name != "id"]
+
+# Höchstzahl an Bind-Parametern pro Statement (PostgreSQL-Protokoll)
+MAX_BIND_PARAMETERS = 65535
+
+# Größter Batch, dessen INSERT ... VALUES unter MAX_BIND_PARAMETERS bleibt
+MAX_UPSERT_BATCH_SIZE = MAX_BIND_PARAMETERS // len(COLUMNS)
+
+
+def _clamp_batch_size(batch_size: int) -> int:
+    """Begrenzt die Zeilen pro Statement auf 1..MAX_UPSERT_BATCH_SIZE."""
+    return max(1, min(batch_size, MAX_UPSERT_BATCH_SIZE))
+
+
+# Anzahl Zeilen pro Statement (über ENV anpassbar, wird auf MAX_UPSERT_BATCH_SIZE begrenzt)
+UPSERT_BATCH_SIZE = _clamp_batch_size(int(os.getenv("UPSERT_BATCH_SIZE", "1000")))
+
+
+def _batches(rows: Iterable[Dict[str, Any]], batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Teilt die Zeilen in Listen der Größe batch_size auf."""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _unique_ids(batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Letzte Zeile pro ID (an der Position der ersten), unverändert wenn alle IDs eindeutig sind."""
+    unique = {row["id"]: row for row in batch}
+    return batch if len(unique) == len(batch) else list(unique.values())
+
+
+def _count_repeated(batch: List[Dict[str, Any]], written: set) -> int:
+    """Anzahl IDs des Batches, die ein früherer Batch desselben Aufrufs schon geschrieben hat."""
+    ids = [row["id"] for row in batch]
+    repeated = sum(1 for row_id in ids if row_id in written)
+    written.update(ids)
+    return repeated
+
+
+def build_pg_upsert(batch: List[Dict[str, Any]]):
+    """
+    Erstellt das INSERT ... ON CONFLICT Statement für PostgreSQL.
+
+    RETURNING (xmax = 0) liefert pro Zeile True bei einem Insert
+    und False bei einem Update.
+    """
+    table = Geodata.__table__
+    stmt = pg_insert(table).values(batch)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.id],
+        set_={name: stmt.excluded[name] for name in UPDATE_COLUMNS},
+    )
+    return stmt.returning(literal_column("(xmax = 0)").label("inserted"))
+
+
+def _upsert_batch_postgres(db: Session, batch: List[Dict[str, Any]]) -> Tuple[int, int]:
+    flags = db.execute(build_pg_upsert(batch)).scalars().all()
+    inserted = sum(1 for flag in flags if flag)
+    return inserted, len(flags) - inserted
+
+
+def _upsert_batch_portable(db: Session, batch: List[Dict[str, Any]]) -> Tuple[int, int]:
+    ids = [row["id"] for row in batch]
+    existing = set(db.scalars(select(Geodata.id).where(Geodata.id.in_(ids))))
+
+    new_rows = [row for row in batch if row["id"] not in existing]
+    changed_rows = [row for row in batch if row["id"] in existing]
+
+    if new_rows:
+        db.execute(insert(Geodata), new_rows)
+    if changed_rows:
+        # ORM Bulk-UPDATE über den Primärschlüssel
+        db.execute(update(Geodata), changed_rows)
+
+    return len(new_rows), len(changed_rows)
+
+
+def _batch_upserter(db: Session) -> Callable[[Session, List[Dict[str, Any]]], Tuple[int, int]]:
+    """Upsert-Funktion für einen Batch, passend zur Datenbank."""
+    if db.get_bind().dialect.name == "postgresql":
+        return _upsert_batch_postgres
+    return _upsert_batch_portable
+
+
+def bulk_upsert(db: Session, rows: Iterable[Dict[str, Any]], batch_size: Optional[int] = None) -> Tuple[int, int]:
+    """
+    Speichert bereinigte Zeilen batchweise (Insert oder Update nach ID).
+
+    Committet nicht - das übernimmt der Aufrufer.
+
+    Args:
+        db: offene DB-Session
+        rows: bereinigte Zeilen aus dem DataCleaner
+        batch_size: Zeilen pro Statement (Standard: UPSERT_BATCH_SIZE,
+            höchstens MAX_UPSERT_BATCH_SIZE)
+
+    Returns:
+        Tuple von (eingefuegt, aktualisiert)
+    """
+    batch_size = _clamp_batch_size(batch_size or UPSERT_BATCH_SIZE)
+    upsert_batch = _batch_upserter(db)
+
+    inserted_count = 0
+    updated_count = 0
+    written = set()
+    for batch in _batches(rows, batch_size):
+        batch = _unique_ids(batch)
+        # Erneut geschriebene IDs zählen nicht noch einmal als Update
+        repeated = _count_repeated(batch, written)
+        inserted, updated = upsert_batch(db, batch)
+        inserted_count += inserted
+        updated_count += updated - repeated
+
+    logger.info(f"Upsert abgeschlossen: {inserted_count} eingefügt, {updated_count} aktualisiert")
+    return inserted_count, updated_count
+
+
+async def bulk_upsert_async(db: AsyncSession, batches: AsyncIterator[List[Dict[str, Any]]],
+                            batch_size: Optional[int] = None) -> Tuple[int, int]:
+    """
+    Wie bulk_upsert, für blockweise gelieferte Zeilen und eine AsyncSession.
+
+    Die Batch-Funktionen laufen über AsyncSession.run_sync, jedes Statement
+    wartet auf den Async-Treiber. Committet nicht.
+
+    Returns:
+        Tuple von (eingefuegt, aktualisiert)
+    """
+    batch_size = _clamp_batch_size(batch_size or UPSERT_BATCH_SIZE)
+    upsert_batch = _batch_upserter(db)
+
+    inserted_count = 0
+    updated_count = 0
+    written = set()
+    async for block in batches:
+        for batch in _batches(block, batch_size):
+            batch = _unique_ids(batch)
+            repeated = _count_repeated(batch, written)
+            inserted, updated = await db.run_sync(upsert_batch, batch)
+            inserted_count += inserted
+            updated_count += updated - repeated
+
+    logger.info(f"Upsert abgeschlossen: {inserted_count} eingefügt, {updated_count} aktualisiert")
+    return inserted_count, updated_count
+
+
+def build_copy_merge_sql() -> str:
+    """
+    SQL für das Zusammenführen der Staging-Tabelle in geodata.
+
+    Liefert eine Zeile mit (eingefuegt, aktualisiert). Pro ID wird nur die
+    zuletzt kopierte Zeile übernommen (DISTINCT ON über die Spalte seq).
+    """
+    columns = ", ".join(COLUMNS)
+    assignments = ", ".join(f"{name} = EXCLUDED.{name}" for name in UPDATE_COLUMNS)
+    return (
+        f"WITH merged AS ("
+        f" INSERT INTO {Geodata.__tablename__} ({columns})"
+        f" SELECT {columns} FROM ("
+        f"SELECT DISTINCT ON (id) * FROM {STAGING_TABLE} ORDER BY id, seq DESC"
+        f") AS latest"
+        f" ON CONFLICT (id) DO UPDATE SET {assignments}"
+        f" RETURNING (xmax = 0) AS inserted"
+        f") SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted) FROM merged"
+    )
+
+
+def copy_upsert(db: Session, rows: Iterable[Dict[str, Any]]) -> Tuple[int, int]:
+    """
+    Speichert Zeilen über COPY in eine Staging-Tabelle und einen einzigen Merge.
+
+    Nur für PostgreSQL (psycopg 3). Läuft in der Transaktion der Session,
+    committet nicht.
+
+    Returns:
+        Tuple von (eingefuegt, aktualisiert)
+    """
+    connection = db.connection()
+    driver_connection = connection.connection.driver_connection
+
+    with driver_connection.cursor() as cursor:
+        cursor.execute(_staging_sql())
+        cursor.execute(f"TRUNCATE {STAGING_TABLE}")
+
+        copied = 0
+        with cursor.copy(f"COPY {STAGING_TABLE} ({', '.join(COLUMNS)}) FROM STDIN") as copy:
+            for row in rows:
+                copy.write_row([row.get(name) for name in COLUMNS])
+                copied += 1
+
+    inserted_count, updated_count = connection.execute(text(build_copy_merge_sql())).one()
+
+    logger.info(
+        f"COPY-Upsert abgeschlossen: {copied} Zeilen kopiert, "
+        f"{inserted_count} eingefügt, {updated_count} aktualisiert"
+    )
+    return inserted_count, updated_count
+
+
+def _staging_sql() -> str:
+    return (
+        f"CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} "
+        f"(LIKE {Geodata.__tablename__} INCLUDING DEFAULTS, seq bigserial) ON COMMIT DROP"
+    )
+
+
+async def copy_upsert_async(db: AsyncSession, batches: AsyncIterator[List[Dict[str, Any]]]) -> Tuple[int, int]:
+    """
+    Wie copy_upsert, über die async Verbindung von psycopg 3 (nur PostgreSQL).
+
+    Returns:
+        Tuple von (eingefuegt, aktualisiert)
+    """
+    connection = await db.connection()
+    raw_connection = await connection.get_raw_connection()
+    driver_connection = raw_connection.driver_connection
+
+    async with driver_connection.cursor() as cursor:
+        await cursor.execute(_staging_sql())
+        await cursor.execute(f"TRUNCATE {STAGING_TABLE}")
+
+        copied = 0
+        async with cursor.copy(f"COPY {STAGING_TABLE} ({', '.join(COLUMNS)}) FROM STDIN") as copy:
+            async for block in batches:
+                for row in block:
+                    await copy.write_row([row.get(name) for name in COLUMNS])
+                copied += len(block)
+
+    inserted_count, updated_count = (await connection.execute(text(build_copy_merge_sql()))).one()
+
+    logger.info(
+        f"COPY-Upsert abgeschlossen: {copied} Zeilen kopiert, "
+        f"{inserted_count} eingefügt, {updated_count} aktualisiert"
+    )
+    return inserted_count, updated_count
+
+
+def choose_ingest_mode(db: Session, mode: str, row_count: int) -> str:
+    """
+    Bestimmt den tatsächlichen Ingest-Modus ("batch" oder "copy").
+
+    "auto" wählt COPY ab COPY_THRESHOLD_ROWS Zeilen. COPY ist nur mit
+    PostgreSQL möglich, sonst wird auf "batch" zurückgefallen.
+    """
+    if mode not in INGEST_MODES:
+        raise ValueError(f"Unbekannter Ingest-Modus: {mode}")
+
+    is_postgres = db.get_bind().dialect.name == "postgresql"
+
+    if mode == "auto":
+        return "copy" if is_postgres and row_count >= COPY_THRESHOLD_ROWS else "batch"
+
+    if mode == "copy" and not is_postgres:
+        logger.info("COPY-Modus nur mit PostgreSQL verfügbar, nutze Batch-Upsert")
+        return "batch"
+
+    return mode
+
+
+def ingest_rows(db: Session, rows: Iterable[Dict[str, Any]], mode: str = "auto",
+                row_count: int = 0) -> Tuple[str, int, int]:
+    """
+    Speichert Zeilen im passenden Modus.
+
+    Returns:
+        Tuple von (genutzter_modus, eingefuegt, aktualisiert)
+    """
+    used_mode = choose_ingest_mode(db, mode, row_count)
+    if used_mode == "copy":
+        inserted, updated = copy_upsert(db, rows)
+    else:
+        inserted, updated = bulk_upsert(db, rows)
+    return used_mode, inserted, updated
+
+
+def ingest_batches(db: Session, batches: Iterable[List[Dict[str, Any]]], mode: str = "auto") -> Tuple[str, int, int]:
+    """
+    Speichert blockweise gelieferte Zeilen (z.B. aus DataCleaner.clean_iter).
+
+    Für "auto" werden höchstens COPY_THRESHOLD_ROWS Zeilen vorgehalten, um den
+    Modus zu bestimmen; danach laufen die Blöcke ohne Zwischenspeicher durch.
+
+    Returns:
+        Tuple von (genutzter_modus, eingefuegt, aktualisiert)
+    """
+    batches = iter(batches)
+    buffered = []
+    row_count = 0
+    if mode == "auto":
+        for batch in batches:
+            buffered.append(batch)
+            row_count += len(batch)
+            if row_count >= COPY_THRESHOLD_ROWS:
+                break
+
+    rows = chain(chain.from_iterable(buffered), chain.from_iterable(batches))
+    return ingest_rows(db, rows, mode, row_count)
+
+
+async def ingest_batches_async(db: AsyncSession, batches: AsyncIterator[List[Dict[str, Any]]],
+                               mode: str = "auto") -> Tuple[str, int, int]:
+    """
+    Wie ingest_batches, für eine AsyncSession und async gelieferte Blöcke
+    (z.B. clean_iter über app.executor.iterate_cpu).
+
+    Returns:
+        Tuple von (genutzter_modus, eingefuegt, aktualisiert)
+    """
+    buffered = []
+    row_count = 0
+    if mode == "auto":
+        async for batch in batches:
+            buffered.append(batch)
+            row_count += len(batch)
+            if row_count >= COPY_THRESHOLD_ROWS:
+                break
+
+    async def all_batches() -> AsyncIterator[List[Dict[str, Any]]]:
+        for batch in buffered:
+            yield batch
+        async for batch in batches:
+            yield batch
+
+    used_mode = choose_ingest_mode(db, mode, row_count)
+    if used_mode == "copy":
+        inserted, updated = await copy_upsert_async(db, all_batches())
+    else:
+        inserted, updated = await bulk_upsert_async(db, all_batches())
+    return used_mode, inserted, updated
@@ -5,15 +5,17 @@ from contextlib import asynccontextmanager
 import os
 
 from app.logging_config import setup_logging, get_logger
-from app.database import engine, Base
+from app.database import engine, Base, database_pool_stats, dispose_async_engine
 from app.models.geodata import Geodata 
-from app.routers import upload
+from app.routers import export, upload
+from app.middleware import GzipRequestMiddleware
+from app.logic.parallel import shutdown_executor
+from app.executor import executor_stats, run_db
 
 # Logging initialisieren
 setup_logging()
 logger = get_logger("main")
 
-
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifecycle-Management für Start und Shutdown"""
@@ -25,6 +27,8 @@ async def lifespan(app: FastAPI):
     yield
     
     # Shutdown
+    shutdown_executor()
+    await dispose_async_engine()
     logger.info("=== Geodata File Upload API beendet ===")
 
 
@@ -44,8 +48,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Router einbinden - fügt /api/test und /api/upload hinzu
+# Komprimierte Request-Bodies (Content-Encoding: gzip) beim Empfang entpacken
+app.add_middleware(GzipRequestMiddleware)
+
+# Router einbinden - fügt /api/test, /api/upload, /api/data und /api/export hinzu
 app.include_router(upload.router)
+app.include_router(export.router)
 
 
 # Kommunikation mit Frontend (GUI) (Root Pfad"/")
@@ -69,17 +77,23 @@ def root():
 
 
 #Check ob API und DB laufen
-@app.get("/health")
-def health_check():
-    """Prüft ob API und DB laufen"""
+def _check_database() -> None:
+    from app.database import SessionLocal
+    from sqlalchemy import text 
+    db = SessionLocal()
     try:
-        from app.database import SessionLocal
-        from sqlalchemy import text 
-        db = SessionLocal()
         db.execute(text("SELECT 1"))
+    finally:
         db.close()
+
+
+@app.get("/health")
+async def health_check():
+    """Prüft ob API und DB laufen (antwortet auch während großer Uploads)"""
+    try:
+        await run_db(_check_database)
         db_status = "connected"
     except Exception as e:
         db_status = f"error: {str(e)}"
     
-    return {"api": "ok", "database": db_status}
\ No newline at end of file
+    return {"api": "ok", "database": db_status, "executor": executor_stats(), "pool": database_pool_stats()}
\ No newline at end of file
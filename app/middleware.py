@@ -0,0 +1,76 @@
+"""
+Middleware für komprimierte Request-Bodies (Content-Encoding: gzip).
+"""
+import os
+import zlib
+
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Obergrenze für den entpackten Body (Schutz vor gzip-Bomben), darüber HTTP 413
+MAX_DECOMPRESSED_BODY_SIZE = int(os.getenv("MAX_DECOMPRESSED_BODY_SIZE", str(1024 ** 3)))
+
+# Höchstens so viele entpackte Bytes pro weitergereichtem Stück
+DECOMPRESS_CHUNK_SIZE = 64 * 1024
+
+
+class GzipRequestMiddleware:
+    """
+    Entpackt gzip-komprimierte Request-Bodies während sie empfangen werden.
+
+    Der Body wird nie komplett entpackt im Speicher gehalten - jedes
+    empfangene Stück wird in Teilen von höchstens DECOMPRESS_CHUNK_SIZE an
+    den Multipart-Parser weitergereicht. Übersteigt der entpackte Body
+    MAX_DECOMPRESSED_BODY_SIZE, wird mit 413 abgebrochen.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = Headers(scope=scope).get("content-encoding", "").strip().lower()
+        if encoding not in ("gzip", "x-gzip"):
+            await self.app(scope, receive, send)
+            return
+
+        # Header anpassen: Body ist für die App nicht mehr komprimiert
+        scope = dict(scope)
+        scope["headers"] = [
+            (key, value) for key, value in scope["headers"]
+            if key not in (b"content-encoding", b"content-length")
+        ]
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        limit = MAX_DECOMPRESSED_BODY_SIZE
+        pending = b""          # noch nicht entpackte Eingabe (unconsumed_tail)
+        more_input = True      # Client sendet noch weitere Stücke
+        output_full = False    # letzter Aufruf hat DECOMPRESS_CHUNK_SIZE geliefert, es kann mehr kommen
+        total = 0
+
+        async def receive_decompressed() -> Message:
+            nonlocal pending, more_input, output_full, total
+            if not pending and not output_full:
+                message = await receive()
+                if message["type"] != "http.request":
+                    return message
+                pending = message.get("body", b"")
+                more_input = message.get("more_body", False)
+            try:
+                body = decompressor.decompress(pending, DECOMPRESS_CHUNK_SIZE)
+                pending = decompressor.unconsumed_tail
+                output_full = len(body) == DECOMPRESS_CHUNK_SIZE
+                more_body = more_input or bool(pending) or output_full
+                if not more_body:
+                    body += decompressor.flush()
+            except zlib.error as e:
+                raise HTTPException(status_code=400, detail=f"Ungültiger gzip-Body: {e}")
+            total += len(body)
+            if total > limit:
+                raise HTTPException(status_code=413, detail=f"Entpackter Body größer als {limit} Bytes")
+            return {"type": "http.request", "body": body, "more_body": more_body}
+
+        await self.app(scope, receive_decompressed, send)
@@ -1,6 +1,6 @@
 # db-structure - defineis how data is stored in the database
 
-from sqlalchemy import Column, Integer, String, Float
+from sqlalchemy import BigInteger, Column, Integer, String, Float
 from app.database import Base
 
 
@@ -12,7 +12,8 @@ class Geodata(Base):
     __tablename__ = "geodata"
 
     # Spalten (basierend auf geodata_example_1.csv)
-    id = Column(Integer, primary_key=True, index=True)
+    # BIGINT für ALKIS-Kennzeichen als ID (SQLite: INTEGER, damit die ID die rowid bleibt)
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, index=True)
     flurstuecknummer = Column(String, nullable=True)
     longitude = Column(Float, nullable=True)
     latitude = Column(Float, nullable=True)  # In DB richtig geschrieben
@@ -21,4 +22,18 @@ class Geodata(Base):
     groesse_ha = Column(Float, nullable=True)
 
     def __repr__(self):
-        return f"<Geodata(id={self.id}, gemeinde={self.gemeinde})>"
\ No newline at end of file
+        return f"<Geodata(id={self.id}, gemeinde={self.gemeinde})>"
+
+
+class RowCount(Base):
+    """
+    Zeilenzahl pro Tabelle, damit /api/data nicht jedes Mal count(*) ausführt.
+    Wird bei Upload und Löschen in derselben Transaktion angepasst.
+    """
+    __tablename__ = "row_counts"
+
+    table_name = Column(String, primary_key=True)
+    rows = Column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<RowCount(table_name={self.table_name}, rows={self.rows})>"
@@ -1,20 +1,28 @@
+from typing import List, Optional
+
 from app.parsers.base import FileParser
 from app.parsers.csv_parser import CSVParser
 from app.parsers.nas_parser import NASParser
+from app.parsers.registry import ParserRegistry
+
+# Standard-Registry: CSV ist beim Sniffing am großzügigsten und wird deshalb
+# als Fallback nach allen anderen Formaten probiert (auch nach register_parser)
+registry = ParserRegistry()
+registry.register(NASParser())
+registry.register(CSVParser(), fallback=True)
 
 
-def get_parser(filename: str) -> FileParser:
+def get_parser(filename: str, prefix: Optional[bytes] = None) -> FileParser:
     
-    # Überprüfe Dateiendung und gebe passenden Parser zurück
-    filename_lower = filename.lower()
+    # Parser über Dateiendung, sonst über den Dateianfang (prefix) bestimmen
+    return registry.get_parser(filename, prefix)
+
+
+def register_parser(parser: FileParser, extensions: Optional[List[str]] = None) -> None:
     
-    if filename_lower.endswith(".csv"):
-        return CSVParser()
-    elif filename_lower.endswith(".nas"):
-        return NASParser()
-    else:
-        raise ValueError(f"Nicht unterstütztes Dateiformat: {filename}")
+    # Neues Format hinzufügen (z.B. register_parser(GeoJSONParser(), [".geojson"]))
+    registry.register(parser, extensions)
 
 
 # Exports für einfachen Import
-__all__ = ["FileParser", "CSVParser", "NASParser", "get_parser"]
\ No newline at end of file
+__all__ = ["FileParser", "CSVParser", "NASParser", "ParserRegistry", "get_parser", "register_parser", "registry"]
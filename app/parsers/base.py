@@ -1,15 +1,36 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from typing import List, Dict, Any, BinaryIO, Iterator, Union
 
 # Parser erben später von Vaterklasse
 class FileParser(ABC):
     
+    # Kurzname des Formats (z.B. "csv"), Schlüssel in der Parser-Registry
+    format_name = "unknown"
+    
+    # file_content: Bytes, Stream oder mmap-Objekt
     @abstractmethod
-    def parse(self, file_content: bytes) -> List[Dict[str, Any]]:
+    def parse(self, file_content: Union[bytes, BinaryIO]) -> List[Dict[str, Any]]:
       
         pass
     
+    def iter_rows(self, stream: BinaryIO) -> Iterator[Dict[str, Any]]:
+        """
+        Liefert die Zeilen einzeln aus einem Byte-Stream (z.B. UploadFile.file oder mmap).
+
+        Standard: ganze Datei lesen und parse() nutzen. Parser die echtes
+        Streaming unterstützen überschreiben diese Methode.
+        """
+        yield from self.parse(stream.read())
+    
+    def sniff(self, prefix: bytes) -> bool:
+        """
+        Prüft anhand der ersten Bytes einer Datei ob der Parser zuständig ist.
+
+        Wird genutzt wenn die Dateiendung unbekannt ist. Standard: nein.
+        """
+        return False
+    
     @abstractmethod
     def get_supported_extension(self) -> str:
 
-        pass
\ No newline at end of file
+        pass
@@ -1,26 +1,29 @@
 import csv
-import io
-from typing import List, Dict, Any
+from typing import List, Dict, Any, BinaryIO, Iterator, Union
 from app.parsers.base import FileParser
+from app.parsers.streams import as_stream, iter_text_lines
 
 
 class CSVParser(FileParser):
 
-    # erstellt Liste mit Elementen aus CSV-Datei
-    def parse(self, file_content: bytes) -> List[Dict[str, Any]]:
-        
-        # Bytes zu String konvertieren
-        text = file_content.decode("utf-8")
+    format_name = "csv"
+
+    # erstellt Liste mit Elementen aus CSV-Datei (Kompatibilität, nutzt iter_rows)
+    def parse(self, file_content: Union[bytes, BinaryIO]) -> List[Dict[str, Any]]:
+        return list(self.iter_rows(as_stream(file_content)))
+
+    # liefert die Zeilen einzeln, ohne die ganze Datei im Speicher zu halten
+    def iter_rows(self, stream: BinaryIO) -> Iterator[Dict[str, Any]]:
         
+        # Bytes blockweise lesen und inkrementell zu Zeilen dekodieren
         # Initialisiere CSV-Reader
         reader = csv.DictReader(
-            io.StringIO(text),
+            iter_text_lines(stream),
             delimiter=",",
             skipinitialspace=True
         )
         
         # Jeden Block in ein Python Object (Dict) umwandeln
-        results = []
         for row in reader:
             # Whitespace von Keys und Values entfernen
             cleaned_row = {}
@@ -30,9 +33,14 @@ class CSVParser(FileParser):
                 clean_key = key.strip() if key else key
                 clean_value = value.strip() if value else value
                 cleaned_row[clean_key] = clean_value
-            results.append(cleaned_row)
-        
-        return results
+            yield cleaned_row
+    
+    # Header-Zeile mit Kommas und keine Binärdaten → CSV
+    def sniff(self, prefix: bytes) -> bool:
+        if b"\x00" in prefix:
+            return False
+        header = prefix.decode("utf-8", errors="ignore").split("\n", 1)[0].strip()
+        return "," in header and not header.startswith("<")
     
     def get_supported_extension(self) -> str:
-        return ".csv"
\ No newline at end of file
+        return ".csv"
@@ -1,6 +1,187 @@
 import re
-from typing import List, Dict, Any
+import xml.etree.ElementTree as ET
+from decimal import Decimal, InvalidOperation
+from typing import List, Dict, Any, BinaryIO, Iterable, Iterator, Optional, Tuple, Union
 from app.parsers.base import FileParser
+from app.parsers.streams import as_stream, iter_text_lines, read_prefix
+
+# Elementnamen (ohne Namespace) die einem Flurstück entsprechen
+FLURSTUECK_TAGS = {"Flurstueck", "AX_Flurstueck"}
+
+# Werte-Muster für das Text-Format (einmal kompiliert)
+_DIGITS = re.compile(r'\d+')
+_COORDINATES = re.compile(r'([\d.]+)\s+([\d.]+)')
+_GROESSE = re.compile(r'[\d.,]+')
+_TEXT_ID_LINE = re.compile(r'^ID:\s*\d+', re.MULTILINE)
+
+# Regex-Fallback für nicht wohlgeformtes XML (z.B. <Größe in ha>)
+_FLURSTUECK_START = "<Flurstueck>"
+_FLURSTUECK_BLOCK = re.compile(r'<Flurstueck>(.*?)</Flurstueck>', re.DOTALL)
+_XML_VALUE = re.compile(r'<([^>]+)>([^<]*)</\1>')
+
+
+def _set_id(row: Dict[str, Any], value: str) -> None:
+    match = _DIGITS.match(value)
+    if match:
+        row["ID"] = match.group()
+
+
+def _set_coordinates(row: Dict[str, Any], value: str) -> None:
+    # Format: "lat lon"
+    match = _COORDINATES.match(value)
+    if match:
+        lat, lon = match.groups()
+        # Heuristik: Wert > 90 ist Longitude
+        if float(lat) > 90:
+            lat, lon = lon, lat
+        row["latidude"] = lat
+        row["longitude"] = lon
+
+
+def _set_groesse(row: Dict[str, Any], value: str) -> None:
+    # Mit oder ohne "ha"
+    match = _GROESSE.match(value)
+    if match:
+        row["Größe in ha"] = match.group()
+
+
+def _text_setter(target: str):
+    def _set(row: Dict[str, Any], value: str) -> None:
+        if value:
+            row[target] = value
+    return _set
+
+
+# Schlüssel im Text-Format → (Zielspalte, Setter)
+# Die Zielspalte dient als "schon gesetzt"-Prüfung: der erste Treffer pro Block gewinnt
+TEXT_KEYS = {
+    "ID": ("ID", _set_id),
+    "Flurstuecknummer": ("Flurstücknummer", _text_setter("Flurstücknummer")),
+    "Koordinaten": ("latidude", _set_coordinates),
+    "Gemeinde": ("Gemeinde", _text_setter("Gemeinde")),
+    "Bundesland": ("Bundesland", _text_setter("Bundesland")),
+    "Groesse": ("Größe in ha", _set_groesse),
+}
+
+# Spaltenreihenfolge der Ausgabe (unabhängig von der Reihenfolge in der Datei)
+TEXT_COLUMNS = ["ID", "Flurstücknummer", "latidude", "longitude", "Gemeinde", "Bundesland", "Größe in ha"]
+
+
+def _local_name(tag: str) -> str:
+    """Entfernt den Namespace: '{http://www.adv-online.de/namespaces/adv/gid/6.0}AX_Flurstueck' → 'AX_Flurstueck'"""
+    return tag.rsplit("}", 1)[-1]
+
+
+def _leaf_values(elem: ET.Element) -> Dict[str, Optional[str]]:
+    """
+    Blatt-Elemente unter elem, Schlüssel = Pfad der lokalen Namen relativ zu elem
+    (direkte Kinder: "Gemeinde", verschachtelt: "gemeindezugehoerigkeit/AX_Gemeindekennzeichen/land").
+    Kommt ein Pfad mehrfach vor, gewinnt der erste Wert.
+    """
+    values: Dict[str, Optional[str]] = {}
+    pending = [(elem, "")]
+    while pending:
+        node, prefix = pending.pop()
+        # Rückwärts auf den Stapel, damit die Dokumentreihenfolge erhalten bleibt
+        for child in reversed(node):
+            path = prefix + _local_name(child.tag)
+            if len(child):
+                pending.append((child, path + "/"))
+            else:
+                value = child.text.strip() if child.text else None
+                values.setdefault(path, value or None)
+    return values
+
+
+# ALKIS (GeoInfoDok 6.0): AX_Flurstueck hat keine Spalten im Format der
+# Beispieldateien. Zuordnung Elementpfad → Spalte:
+#   flurstueckskennzeichen                        → ID (Stellen 1-18: Land, Gemarkung, Flur,
+#                                                   Zähler, Nenner; "_" als 0, passt in BIGINT)
+#   flurstuecksnummer/AX_Flurstuecksnummer/...     → Flurstücknummer ("zaehler/nenner")
+#   gemeindezugehoerigkeit/AX_Gemeindekennzeichen → Gemeinde (Gemeindeschlüssel, 8-stellig)
+#                                                   und Bundesland (über den Länderschlüssel)
+#   amtlicheFlaeche (m²)                          → Größe in ha
+#   position (posList/pos)                        → latidude/longitude (Mittel der Stützpunkte),
+#                                                   nur bei geographischem Bezugssystem; UTM
+#                                                   (z.B. urn:adv:crs:ETRS89_UTM32) bleibt leer
+ALKIS_FLURSTUECK_TAG = "AX_Flurstueck"
+ALKIS_KENNZEICHEN = "flurstueckskennzeichen"
+ALKIS_ZAEHLER = "flurstuecksnummer/AX_Flurstuecksnummer/zaehler"
+ALKIS_NENNER = "flurstuecksnummer/AX_Flurstuecksnummer/nenner"
+ALKIS_GEMEINDE = "gemeindezugehoerigkeit/AX_Gemeindekennzeichen/"
+ALKIS_GEMARKUNG_LAND = "gemarkung/AX_Gemarkung_Schluessel/land"
+ALKIS_FLAECHE = "amtlicheFlaeche"
+
+# Länderschlüssel (erste zwei Stellen des Gemeindeschlüssels) → Bundesland
+LAND_NAMES = {
+    "01": "Schleswig-Holstein", "02": "Hamburg", "03": "Niedersachsen", "04": "Bremen",
+    "05": "Nordrhein-Westfalen", "06": "Hessen", "07": "Rheinland-Pfalz", "08": "Baden-Württemberg",
+    "09": "Bayern", "10": "Saarland", "11": "Berlin", "12": "Brandenburg",
+    "13": "Mecklenburg-Vorpommern", "14": "Sachsen", "15": "Sachsen-Anhalt", "16": "Thüringen",
+}
+
+# EPSG-Codes mit Achsreihenfolge Breite, Länge (ETRS89 und WGS84 geographisch)
+GEOGRAPHIC_EPSG = {"4258", "4326"}
+
+
+def _alkis_position(elem: ET.Element) -> Optional[Tuple[float, float]]:
+    """(lat, lon) als Mittel der Stützpunkte von position, None ohne geographisches Bezugssystem."""
+    srs_name = None
+    coordinates = None
+    dimension = 2
+    for child in elem:
+        if _local_name(child.tag) != "position":
+            continue
+        for node in child.iter():
+            srs_name = node.get("srsName", srs_name)
+            if _local_name(node.tag) in ("posList", "pos") and node.text:
+                coordinates = node.text.split()
+                dimension = int(node.get("srsDimension", dimension))
+                break
+        break
+    if not coordinates or srs_name is None or srs_name.rsplit(":", 1)[-1] not in GEOGRAPHIC_EPSG:
+        return None
+    try:
+        values = [float(value) for value in coordinates]
+    except ValueError:
+        return None
+    points = list(zip(values[0::dimension], values[1::dimension]))
+    # Geschlossener Ring: der letzte Punkt wiederholt den ersten
+    if len(points) > 1 and points[0] == points[-1]:
+        points.pop()
+    if not points:
+        return None
+    return sum(p[0] for p in points) / len(points), sum(p[1] for p in points) / len(points)
+
+
+def _alkis_columns(elem: ET.Element, values: Dict[str, Optional[str]]) -> Dict[str, Any]:
+    """Spalten eines AX_Flurstueck nach der ALKIS-Zuordnung (fehlende Angaben bleiben weg)."""
+    row: Dict[str, Any] = {}
+    kennzeichen = values.get(ALKIS_KENNZEICHEN)
+    if kennzeichen:
+        # Feste Stellen, leere Teile (Flur, Nenner) sind mit "_" aufgefüllt
+        row["ID"] = kennzeichen[:18].replace("_", "0")
+    zaehler = values.get(ALKIS_ZAEHLER)
+    if zaehler:
+        nenner = values.get(ALKIS_NENNER)
+        row["Flurstücknummer"] = f"{zaehler}/{nenner}" if nenner else zaehler
+    position = _alkis_position(elem)
+    if position is not None:
+        row["latidude"], row["longitude"] = (str(round(value, 7)) for value in position)
+    gemeinde = [values.get(ALKIS_GEMEINDE + key) for key in ("land", "regierungsbezirk", "kreis", "gemeinde")]
+    if all(gemeinde):
+        row["Gemeinde"] = "".join(gemeinde)
+    land = gemeinde[0] or values.get(ALKIS_GEMARKUNG_LAND) or (kennzeichen or "")[:2]
+    if land in LAND_NAMES:
+        row["Bundesland"] = LAND_NAMES[land]
+    flaeche = values.get(ALKIS_FLAECHE)
+    if flaeche:
+        try:
+            row["Größe in ha"] = str(Decimal(flaeche) / 10000)
+        except InvalidOperation:
+            # Ungültiger Wert: der Cleaner meldet ihn als Fehler
+            row["Größe in ha"] = flaeche
+    return row
 
 
 class NASParser(FileParser):
@@ -11,127 +192,213 @@ class NASParser(FileParser):
     - Text-basiert: EINHEIT-Blöcke mit Key-Value-Paaren
     """
 
+    format_name = "nas"
+
     def _is_xml_format(self, text: str) -> bool:
-        """Prüft ob der Inhalt XML-Format hat."""
-        text_stripped = text.strip()
-        
-        xml_indicators = [
-            text_stripped.startswith('<?xml'),
-            text_stripped.startswith('<NasExport'),
-            text_stripped.startswith('<Flurstueck'),
-            '<NasExport>' in text,
-            '<Flurstueck>' in text,
-            '<?xml' in text,
-        ]
+        """Prüft ob der Inhalt XML-Format hat (wird nur auf den Dateianfang angewendet)."""
+        text_stripped = text.lstrip()
         
-        return any(xml_indicators)
+        return (
+            text_stripped.startswith(('<?xml', '<NasExport', '<Flurstueck'))
+            or '<?xml' in text
+            or '<NasExport>' in text
+            or '<Flurstueck>' in text
+        )
 
     def _is_text_format(self, text: str) -> bool:
-        """Prüft ob der Inhalt Text-basiertes NAS-Format hat."""
-        text_stripped = text.strip()
+        """Prüft ob der Inhalt Text-basiertes NAS-Format hat (wird nur auf den Dateianfang angewendet)."""
+        text_indicators = (
+            text.lstrip().startswith('BEGINN')
+            or 'EINHEIT:' in text or 'EINHEIT :' in text
+            or ('ENDE' in text and 'BEGINN' in text)
+            or _TEXT_ID_LINE.search(text) is not None
+        )
         
-        text_indicators = [
-            text_stripped.startswith('BEGINN'),
-            'EINHEIT:' in text or 'EINHEIT :' in text,
-            'ENDE' in text and 'BEGINN' in text,
-            re.search(r'^ID:\s*\d+', text, re.MULTILINE) is not None,
-        ]
-        
-        return any(text_indicators) and not self._is_xml_format(text)
+        return text_indicators and not self._is_xml_format(text)
 
-    def _parse_xml(self, text: str) -> List[Dict[str, Any]]:
-        """Parst XML-basiertes NAS-Format."""
-        results = []
-        
-        flurstueck_pattern = r'<Flurstueck>(.*?)</Flurstueck>'
-        flurstuecke = re.findall(flurstueck_pattern, text, re.DOTALL)
+    def detect_format(self, prefix: bytes) -> Optional[str]:
+        """Erkennt anhand des Dateianfangs "xml", "text" oder None."""
+        text = prefix.decode("utf-8", errors="ignore")
+        if self._is_xml_format(text):
+            return "xml"
+        if self._is_text_format(text):
+            return "text"
+        return None
+
+    def sniff(self, prefix: bytes) -> bool:
+        return self.detect_format(prefix) is not None
+
+    def _iter_xml(self, stream: BinaryIO) -> Iterator[Dict[str, Any]]:
+        """
+        Parst XML-basiertes NAS-Format inkrementell mit iterparse.
 
-        if not flurstuecke:
+        Jedes <Flurstueck> (auch mit Namespace, z.B. ALKIS AX_Flurstueck) wird
+        nach dem Auslesen verworfen, der Speicherbedarf bleibt konstant.
+        Ist das Dokument kein wohlgeformtes XML (z.B. <Größe in ha> in den
+        Beispieldateien), wird auf den Regex-Parser zurückgefallen, der
+        ebenfalls zeilenweise liest.
+        """
+        start = stream.tell()
+        stack = []        # offene Elemente (für das Entfernen aus dem Elternelement)
+        inside = 0        # Anzahl offener Flurstueck-Elemente
+        found = 0
+
+        try:
+            for event, elem in ET.iterparse(stream, events=("start", "end")):
+                if event == "start":
+                    stack.append(elem)
+                    if _local_name(elem.tag) in FLURSTUECK_TAGS:
+                        inside += 1
+                    continue
+
+                stack.pop()
+                is_flurstueck = _local_name(elem.tag) in FLURSTUECK_TAGS
+                if is_flurstueck:
+                    inside -= 1
+                    found += 1
+                    yield self._element_to_row(elem)
+
+                # Fertige Elemente außerhalb von Flurstücken sofort freigeben
+                if is_flurstueck or inside == 0:
+                    elem.clear()
+                    if stack:
+                        stack[-1].remove(elem)
+
+        except ET.ParseError as e:
+            if found:
+                raise ValueError(f"Ungültiges XML nach {found} <Flurstueck>-Elementen: {e}")
+            # Nicht wohlgeformt: Fallback auf den toleranten Regex-Parser
+            stream.seek(start)
+            yield from self._iter_xml_regex(iter_text_lines(stream))
+            return
+
+        if not found:
             raise ValueError(
                 "Keine <Flurstueck>-Elemente in der NAS-Datei gefunden. "
                 "Stellen Sie sicher, dass die Datei das erwartete XML-Format hat."
             )
+
+    def _element_to_row(self, elem: ET.Element) -> Dict[str, Any]:
+        """
+        Wandelt ein <Flurstueck>-Element in ein Dict um (Blatt-Elemente nach Pfad, ohne Namespace).
+
+        Bei ALKIS AX_Flurstueck kommen die Spalten des Cleaners über die
+        ALKIS-Zuordnung dazu; direkt angegebene Spalten haben Vorrang.
+        """
+        row = _leaf_values(elem)
+        if _local_name(elem.tag) == ALKIS_FLURSTUECK_TAG:
+            for column, value in _alkis_columns(elem, row).items():
+                if row.get(column) is None:
+                    row[column] = value
+        return row
+
+    def _parse_xml(self, text: str) -> List[Dict[str, Any]]:
+        """Parst XML-basiertes NAS-Format per Regex (Fallback für nicht wohlgeformtes XML)."""
+        return list(self._iter_xml_regex([text]))
+
+    def _iter_xml_regex(self, lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+        """
+        Regex-Parser über die Zeilen: jedes vollständige <Flurstueck>...</Flurstueck>
+        wird sofort geliefert. Im Puffer steht höchstens ein unvollständiger Block.
+        """
+        found = 0
+        buffer = ""
         
-        for block in flurstuecke:
-            row = {}
-            tag_pattern = r'<([^>]+)>([^<]*)</\1>'
-            matches = re.findall(tag_pattern, block)
-            
-            for tag_name, value in matches:
-                key = tag_name.strip()
-                val = value.strip() if value else None
-                row[key] = val
+        for line in lines:
+            buffer += line
+            position = 0
+            for match in _FLURSTUECK_BLOCK.finditer(buffer):
+                found += 1
+                yield self._block_to_row(match.group(1))
+                position = match.end()
             
-            results.append(row)
+            # Text vor dem nächsten <Flurstueck> wird nicht mehr gebraucht
+            start = buffer.find(_FLURSTUECK_START, position)
+            if start >= 0:
+                buffer = buffer[start:]
+            else:
+                # Ende behalten, falls das Start-Tag über die Zeilengrenze geht
+                buffer = buffer[max(position, len(buffer) - len(_FLURSTUECK_START) + 1):]
         
-        return results
+        if not found:
+            raise ValueError(
+                "Keine <Flurstueck>-Elemente in der NAS-Datei gefunden. "
+                "Stellen Sie sicher, dass die Datei das erwartete XML-Format hat."
+            )
+
+    def _block_to_row(self, block: str) -> Dict[str, Any]:
+        """Wandelt den Inhalt eines <Flurstueck>-Blocks in ein Dict um (Regex, ein Tag pro Wert)."""
+        row = {}
+        for tag_name, value in _XML_VALUE.findall(block):
+            row[tag_name.strip()] = value.strip() if value else None
+        return row
 
     def _parse_text(self, text: str) -> List[Dict[str, Any]]:
         """Parst Text-basiertes NAS-Format (EINHEIT-Blöcke)."""
-        results = []
-        
-        # Finde alle EINHEIT-Blöcke
-        einheit_pattern = r'EINHEIT:\s*Flurstueck(.*?)(?=EINHEIT:|ENDE|$)'
-        einheiten = re.findall(einheit_pattern, text, re.DOTALL | re.IGNORECASE)
-        
-        if not einheiten:
-            raise ValueError(
-                "Keine EINHEIT-Blöcke in der NAS-Datei gefunden. "
-                "Stellen Sie sicher, dass die Datei das erwartete Text-Format hat."
-            )
+        return list(self._iter_text(text.splitlines()))
+
+    def _iter_text(self, lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+        """
+        Tokenizer für das Text-Format: läuft genau einmal über die Zeilen.
+
+        "EINHEIT: Flurstueck" öffnet einen Block, die nächste EINHEIT- oder
+        ENDE-Zeile schließt ihn. "Key: Wert"-Zeilen werden über TEXT_KEYS
+        zugeordnet, jede Zeile wird fertig geliefert sobald ihr Block endet.
+        """
+        blocks = 0
+        row = None  # aktueller Flurstueck-Block (None = außerhalb)
         
-        for block in einheiten:
-            row = {}
-            
-            # ID
-            id_match = re.search(r'ID:\s*(\d+)', block)
-            if id_match:
-                row["ID"] = id_match.group(1)
-            
-            # Flurstücknummer
-            flst_match = re.search(r'Flurstuecknummer:\s*([^\n]+)', block)
-            if flst_match:
-                row["Flurstücknummer"] = flst_match.group(1).strip()
-            
-            # Koordinaten (Format: "lat lon")
-            coord_match = re.search(r'Koordinaten:\s*([\d.]+)\s+([\d.]+)', block)
-            if coord_match:
-                lat = coord_match.group(1)
-                lon = coord_match.group(2)
-                # Heuristik: Wert > 90 ist Longitude
-                if float(lat) > 90:
-                    lat, lon = lon, lat
-                row["latidude"] = lat
-                row["longitude"] = lon
+        for line in lines:
+            key, sep, value = line.partition(":")
+            key = key.strip()
             
-            # Gemeinde
-            gemeinde_match = re.search(r'Gemeinde:\s*([^\n]+)', block)
-            if gemeinde_match:
-                row["Gemeinde"] = gemeinde_match.group(1).strip()
+            if key.upper() == "EINHEIT" and sep:
+                if row:
+                    yield self._order_text_row(row)
+                if value.strip().lower().startswith("flurstueck"):
+                    blocks += 1
+                    row = {}
+                else:
+                    row = None
+                continue
             
-            # Bundesland
-            bundesland_match = re.search(r'Bundesland:\s*([^\n]+)', block)
-            if bundesland_match:
-                row["Bundesland"] = bundesland_match.group(1).strip()
+            if key.upper().split(" ", 1)[0] == "ENDE":
+                if row:
+                    yield self._order_text_row(row)
+                row = None
+                continue
             
-            # Größe (mit oder ohne "ha")
-            groesse_match = re.search(r'Groesse:\s*([\d.,]+)\s*(?:ha)?', block)
-            if groesse_match:
-                row["Größe in ha"] = groesse_match.group(1).strip()
+            if row is None or not sep:
+                continue
             
-            if row:
-                results.append(row)
+            entry = TEXT_KEYS.get(key)
+            if entry is not None and entry[0] not in row:
+                entry[1](row, value.strip())
         
-        return results
+        if row:
+            yield self._order_text_row(row)
+        
+        if not blocks:
+            raise ValueError(
+                "Keine EINHEIT-Blöcke in der NAS-Datei gefunden. "
+                "Stellen Sie sicher, dass die Datei das erwartete Text-Format hat."
+            )
+
+    def _order_text_row(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: row[key] for key in TEXT_COLUMNS if key in row}
 
-    def parse(self, file_content: bytes) -> List[Dict[str, Any]]:
+    def parse(self, file_content: Union[bytes, BinaryIO]) -> List[Dict[str, Any]]:
         """Parst NAS-Datei. Erkennt automatisch ob XML oder Text-Format."""
-        text = file_content.decode("utf-8")
+        return list(self.iter_rows(as_stream(file_content)))
+
+    def iter_rows(self, stream: BinaryIO) -> Iterator[Dict[str, Any]]:
+        """Liefert die Zeilen einzeln. XML wird gestreamt, das Format am Dateianfang erkannt."""
+        nas_format = self.detect_format(read_prefix(stream))
         
-        if self._is_xml_format(text):
-            return self._parse_xml(text)
-        elif self._is_text_format(text):
-            return self._parse_text(text)
+        if nas_format == "xml":
+            yield from self._iter_xml(stream)
+        elif nas_format == "text":
+            yield from self._iter_text(iter_text_lines(stream))
         else:
             raise ValueError(
                 "Nicht unterstütztes NAS-Format. "
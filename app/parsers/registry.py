@@ -0,0 +1,71 @@
+"""
+Parser-Registry: ordnet Dateien einem Parser zu.
+
+Zuerst über die Dateiendung, bei unbekannter Endung über die ersten Bytes
+der Datei (Sniffing). Großzügige Formate wie CSV werden als Fallback
+registriert und erst nach allen anderen (auch später registrierten)
+probiert. Die Parser sind zustandslos und werden als Singletons
+wiederverwendet.
+"""
+from typing import Dict, List, Optional, Set
+
+from app.parsers.base import FileParser
+from app.parsers.streams import split_compression_suffix
+
+
+class ParserRegistry:
+    """Registrierte Formate mit ihren Dateiendungen."""
+
+    def __init__(self):
+        self._parsers: Dict[str, FileParser] = {}
+        self._extensions: Dict[str, str] = {}
+        # Formate, die beim Sniffing erst zum Schluss probiert werden
+        self._fallbacks: Set[str] = set()
+
+    def register(self, parser: FileParser, extensions: Optional[List[str]] = None, fallback: bool = False) -> None:
+        """
+        Registriert einen Parser für seine Endung(en).
+
+        Beim Sniffing gilt die Reihenfolge der Registrierung, Parser mit
+        fallback=True kommen zuletzt (für Formate, deren sniff() fast alles akzeptiert).
+        """
+        self._parsers[parser.format_name] = parser
+        if fallback:
+            self._fallbacks.add(parser.format_name)
+        else:
+            self._fallbacks.discard(parser.format_name)
+        for extension in extensions or [parser.get_supported_extension()]:
+            self._extensions[extension.lower()] = parser.format_name
+
+    def for_filename(self, filename: str) -> Optional[FileParser]:
+        """Parser passend zur Dateiendung oder None (auch "daten.csv.gz")."""
+        filename_lower = split_compression_suffix(filename)[0].lower()
+        # Längste Endung zuerst, damit z.B. ".nas.xml" vor ".xml" greift
+        for extension in sorted(self._extensions, key=len, reverse=True):
+            if filename_lower.endswith(extension):
+                return self._parsers[self._extensions[extension]]
+        return None
+
+    def sniff(self, prefix: bytes) -> Optional[FileParser]:
+        """Parser anhand der ersten Bytes (Dateianfang) oder None."""
+        if not prefix:
+            return None
+        parsers = sorted(self._parsers.values(), key=lambda parser: parser.format_name in self._fallbacks)
+        for parser in parsers:
+            if parser.sniff(prefix):
+                return parser
+        return None
+
+    def get_parser(self, filename: str, prefix: Optional[bytes] = None) -> FileParser:
+        """
+        Parser für eine Datei.
+
+        Raises:
+            ValueError: wenn weder Endung noch Inhalt zu einem Format passen
+        """
+        parser = self.for_filename(filename)
+        if parser is None and prefix is not None:
+            parser = self.sniff(prefix)
+        if parser is None:
+            raise ValueError(f"Nicht unterstütztes Dateiformat: {filename}")
+        return parser
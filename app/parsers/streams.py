@@ -0,0 +1,225 @@
+"""
+Hilfsfunktionen zum stückweisen Lesen von Upload-Streams.
+"""
+import bz2
+import codecs
+import gzip
+import io
+import mmap
+import os
+import zlib
+from contextlib import contextmanager
+from tempfile import SpooledTemporaryFile
+from typing import BinaryIO, Iterator, Optional, Tuple, Union
+
+try:
+    import zstandard
+except ImportError:  # optional, nur für .zst-Uploads
+    zstandard = None
+
+# Fehler beim Lesen kaputter komprimierter Daten (gzip: BadGzipFile ist ein OSError)
+DECOMPRESSION_ERRORS: Tuple[type, ...] = (OSError, EOFError, zlib.error)
+if zstandard is not None:
+    DECOMPRESSION_ERRORS += (zstandard.ZstdError,)
+
+# Bytes pro Lesevorgang - begrenzt den Speicherbedarf beim Parsen
+CHUNK_SIZE = 64 * 1024
+
+# So viele Bytes vom Dateianfang reichen zur Formaterkennung
+SNIFF_SIZE = 8 * 1024
+
+# Dateiendung → Kompressionsverfahren (z.B. "daten.csv.gz")
+COMPRESSION_SUFFIXES = {
+    ".gz": "gzip",
+    ".gzip": "gzip",
+    ".bz2": "bz2",
+    ".zst": "zstd",
+    ".zstd": "zstd",
+}
+
+# Magic Bytes am Dateianfang → Kompressionsverfahren
+COMPRESSION_MAGIC = {
+    b"\x1f\x8b": "gzip",
+    b"BZh": "bz2",
+    b"\x28\xb5\x2f\xfd": "zstd",
+}
+
+# Werte des Content-Encoding-Headers → Kompressionsverfahren
+CONTENT_ENCODINGS = {
+    "gzip": "gzip",
+    "x-gzip": "gzip",
+    "bzip2": "bz2",
+    "zstd": "zstd",
+}
+
+
+def as_stream(content: Union[bytes, bytearray, memoryview, BinaryIO]) -> BinaryIO:
+    """Bytes werden in einen BytesIO verpackt, Streams und mmap-Objekte direkt genutzt."""
+    if hasattr(content, "read"):
+        return content
+    return io.BytesIO(content)
+
+
+@contextmanager
+def open_upload_stream(file: BinaryIO) -> Iterator[BinaryIO]:
+    """
+    Öffnet einen Upload zum Lesen ohne Kopie der ganzen Datei auf dem Heap.
+
+    Liegt der (Starlette-)Spool bereits auf der Platte, wird die Temp-Datei
+    per mmap eingeblendet und direkt aus dem Page-Cache gelesen. Uploads
+    unterhalb der Spool-Grenze liegen ohnehin im Speicher und werden
+    unverändert zurückgegeben.
+    """
+    if isinstance(file, SpooledTemporaryFile) and not file._rolled:
+        yield file
+        return
+
+    try:
+        fileno = file.fileno()
+        size = os.fstat(fileno).st_size
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        yield file
+        return
+
+    # Leere Dateien lassen sich nicht mappen
+    if size == 0:
+        yield file
+        return
+
+    mapped = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+    try:
+        mapped.seek(file.tell())
+        yield mapped
+    finally:
+        mapped.close()
+
+
+def read_prefix(stream: BinaryIO, size: int = SNIFF_SIZE) -> bytes:
+    """Liest die ersten Bytes eines Streams und springt danach zurück."""
+    start = stream.tell()
+    prefix = stream.read(size)
+    stream.seek(start)
+    return prefix
+
+
+def iter_text_lines(stream: BinaryIO, encoding: str = "utf-8", chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """
+    Liest einen Byte-Stream blockweise, dekodiert inkrementell und liefert Zeilen.
+
+    Zeilen werden nur an '\\n' getrennt und behalten ihr Zeilenende, damit
+    csv.reader Zeilenumbrüche in Werten mit Anführungszeichen korrekt erkennt.
+    Der Speicherbedarf ist durch chunk_size (bzw. die längste Zeile) begrenzt.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    pending = ""
+
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        lines = (pending + decoder.decode(chunk)).split("\n")
+        # Letztes Stück ist (noch) keine vollständige Zeile
+        pending = lines.pop()
+        for line in lines:
+            yield line + "\n"
+
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+def split_compression_suffix(filename: str) -> Tuple[str, Optional[str]]:
+    """
+    Trennt eine Kompressions-Endung ab.
+
+    "daten.csv.gz" → ("daten.csv", "gzip"), "daten.csv" → ("daten.csv", None)
+    """
+    filename_lower = filename.lower()
+    for suffix, codec in COMPRESSION_SUFFIXES.items():
+        if filename_lower.endswith(suffix):
+            return filename[:-len(suffix)], codec
+    return filename, None
+
+
+def detect_compression(prefix: bytes) -> Optional[str]:
+    """Erkennt das Kompressionsverfahren an den Magic Bytes."""
+    for magic, codec in COMPRESSION_MAGIC.items():
+        if prefix.startswith(magic):
+            return codec
+    return None
+
+
+class _ZstdReader(io.RawIOBase):
+    """
+    Streamender zstd-Reader mit Rücksprung.
+
+    Der zstandard-Reader kann nur vorwärts springen; für seek() nach hinten
+    (Formaterkennung, Fallback-Parser) wird wie bei gzip neu dekomprimiert.
+    """
+
+    def __init__(self, stream: BinaryIO):
+        self._stream = stream
+        self._start = stream.tell()
+        self._open()
+
+    def _open(self) -> None:
+        self._stream.seek(self._start)
+        self._reader = zstandard.ZstdDecompressor().stream_reader(
+            self._stream, read_across_frames=True, closefd=False
+        )
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        count = self._reader.readinto(buffer)
+        self._position += count
+        return count
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence != io.SEEK_SET:
+            raise io.UnsupportedOperation("zstd-Streams unterstützen kein seek vom Ende")
+        if offset < self._position:
+            self._open()
+        while self._position < offset:
+            if not self.read(min(CHUNK_SIZE, offset - self._position)):
+                break
+        return self._position
+
+
+@contextmanager
+def open_decompressed(stream: BinaryIO, codec: Optional[str]) -> Iterator[BinaryIO]:
+    """
+    Entpackt einen Stream während des Lesens (ohne die Datei komplett zu entpacken).
+
+    Raises:
+        ValueError: bei unbekanntem Verfahren oder fehlendem zstandard-Paket
+    """
+    if codec is None:
+        yield stream
+        return
+
+    if codec == "gzip":
+        decompressed = gzip.GzipFile(fileobj=stream, mode="rb")
+    elif codec == "bz2":
+        decompressed = bz2.BZ2File(stream, mode="rb")
+    elif codec == "zstd":
+        if zstandard is None:
+            raise ValueError("zstd-komprimierte Dateien benötigen das Paket 'zstandard'")
+        decompressed = io.BufferedReader(_ZstdReader(stream), buffer_size=CHUNK_SIZE)
+    else:
+        raise ValueError(f"Nicht unterstützte Komprimierung: {codec}")
+
+    try:
+        yield decompressed
+    finally:
+        decompressed.close()
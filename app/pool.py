@@ -0,0 +1,72 @@
+"""
+Verbindungspool mit Kennzahlen für /health.
+
+QueuePool bzw. AsyncAdaptedQueuePool, die zusätzlich zählen, wie oft und
+wie lange Requests auf eine freie Verbindung gewartet haben (inkl. Aufbau
+neuer Verbindungen) und wie oft dabei DB_POOL_TIMEOUT überschritten wurde
+("QueuePool limit reached").
+"""
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+
+class _PoolMetrics:
+    """Zähler für Checkouts aus dem Pool (Mixin vor der Pool-Klasse)."""
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._metrics_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            with self._metrics_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with self._metrics_lock:
+                self.checkouts += 1
+                self.wait_seconds += waited
+                self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+
+class InstrumentedQueuePool(_PoolMetrics, QueuePool):
+    """QueuePool mit Kennzahlen (sync Engine)."""
+
+
+class InstrumentedAsyncQueuePool(_PoolMetrics, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool mit Kennzahlen (async Engine)."""
+
+
+def pool_stats(pool: Pool) -> Dict[str, Any]:
+    """Aktuelle Belegung und Wartezeiten eines Pools."""
+    stats: Dict[str, Any] = {"class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            # Negativ, solange noch nicht alle pool_size Verbindungen geöffnet sind
+            "overflow": pool.overflow(),
+            "max_overflow": pool._max_overflow,
+        })
+    if isinstance(pool, _PoolMetrics):
+        with pool._metrics_lock:
+            stats.update({
+                "checkouts": pool.checkouts,
+                "timeouts": pool.timeouts,
+                "wait_ms_total": round(pool.wait_seconds * 1000, 1),
+                "wait_ms_max": round(pool.max_wait_seconds * 1000, 1),
+            })
+    return stats
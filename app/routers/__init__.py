@@ -1 +1 @@
-from app.routers import upload
\ No newline at end of file
+from app.routers import export, upload
\ No newline at end of file
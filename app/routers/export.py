@@ -0,0 +1,115 @@
+"""
+API-Endpunkt für den Export der gespeicherten Geodaten.
+GET /api/export → ganze Tabelle (oder gefilterte Teilmenge) als NDJSON oder CSV
+"""
+
+import csv
+import io
+import json
+import math
+import os
+from typing import Any, AsyncIterator, Literal, Optional, Sequence
+
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select, select
+
+from app.database import new_async_session
+from app.logging_config import get_logger
+from app.models.geodata import Geodata
+
+logger = get_logger("export")
+
+# Zeilen pro Abruf aus dem serverseitigen Cursor (= pro geschriebenem Block)
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+# Spalten in Tabellenreihenfolge
+COLUMNS = [c.name for c in Geodata.__table__.columns]
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+router = APIRouter(prefix="/api", tags=["export"])
+
+
+def build_export_query(gemeinde: Optional[str] = None, bundesland: Optional[str] = None,
+                       min_id: Optional[int] = None, max_id: Optional[int] = None) -> Select:
+    """SELECT über alle Spalten, nach ID sortiert, mit optionalen Filtern."""
+    table = Geodata.__table__
+    query = select(*table.columns).order_by(table.c.id)
+    if gemeinde is not None:
+        query = query.where(table.c.gemeinde == gemeinde)
+    if bundesland is not None:
+        query = query.where(table.c.bundesland == bundesland)
+    if min_id is not None:
+        query = query.where(table.c.id >= min_id)
+    if max_id is not None:
+        query = query.where(table.c.id <= max_id)
+    return query
+
+
+def _finite(row: Sequence[Any]) -> Sequence[Any]:
+    """Ersetzt NaN/Infinity (z.B. aus SQLite) durch None."""
+    if any(isinstance(value, float) and not math.isfinite(value) for value in row):
+        return [None if isinstance(value, float) and not math.isfinite(value) else value for value in row]
+    return row
+
+
+def ndjson_block(rows: Sequence[Sequence[Any]]) -> bytes:
+    """Ein JSON-Objekt pro Zeile (NaN/Infinity als null, sonst wäre das NDJSON ungültig)."""
+    return "".join(
+        json.dumps(dict(zip(COLUMNS, _finite(row))), ensure_ascii=False, allow_nan=False) + "\n" for row in rows
+    ).encode("utf-8")
+
+
+def csv_block(rows: Sequence[Sequence[Any]]) -> bytes:
+    """CSV-Zeilen (NULL, NaN und Infinity als leeres Feld)."""
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows(_finite(row) for row in rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+async def stream_export(query: Select, format: str, batch_size: Optional[int] = None) -> AsyncIterator[bytes]:
+    """
+    Liefert den Export blockweise aus einem serverseitigen Cursor.
+    
+    Die Session wird im Generator geöffnet, weil die Antwort erst nach dem
+    Handler gestreamt wird. Speicherbedarf: ein Block, unabhängig von der Tabellengröße.
+    """
+    encode = ndjson_block if format == "ndjson" else csv_block
+    if format == "csv":
+        # Kopfzeile sofort, noch vor der ersten Abfrage
+        yield csv_block([COLUMNS])
+
+    exported = 0
+    async with new_async_session() as db:
+        result = await db.stream(query.execution_options(yield_per=batch_size or EXPORT_BATCH_SIZE))
+        async for rows in result.partitions():
+            exported += len(rows)
+            yield encode(rows)
+    logger.info(f"Export abgeschlossen: {exported} Zeilen als {format}")
+
+
+@router.get("/export")
+async def export_data(
+    format: Literal["ndjson", "csv"] = Query("ndjson", description="Ausgabeformat: ndjson (eine JSON-Zeile pro Datensatz) oder csv"),
+    gemeinde: Optional[str] = Query(None, description="Nur diese Gemeinde"),
+    bundesland: Optional[str] = Query(None, description="Nur dieses Bundesland"),
+    min_id: Optional[int] = Query(None, description="Kleinste ID"),
+    max_id: Optional[int] = Query(None, description="Größte ID"),
+):
+    """
+    Exportiert die Geodaten als Stream (nach ID sortiert).
+    
+    Die Zeilen kommen über einen serverseitigen Cursor in Blöcken von
+    EXPORT_BATCH_SIZE, der Speicherbedarf bleibt konstant.
+    """
+    logger.info(f"Export-Request erhalten: format={format}")
+    query = build_export_query(gemeinde, bundesland, min_id, max_id)
+    return StreamingResponse(
+        stream_export(query, format),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="geodata.{format}"'},
+    )
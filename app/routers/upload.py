@@ -4,30 +4,165 @@ POST /api/test   → Datei prüfen, Report zurückgeben (nichts speichern)
 POST /api/upload → Datei prüfen und in DB speichern
 """
 
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
-from sqlalchemy.orm import Session
+import base64
+import json
+from contextlib import ExitStack, closing, contextmanager
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Literal, Optional, Tuple
+
+from anyio import CancelScope
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.logging_config import get_logger
-from app.database import get_db
-from app.parsers import get_parser
-from app.logic.cleaner import DataCleaner
+from app.database import get_async_db
+from app.forms import SpoolingRoute
+from app.executor import iterate_cpu, run_cpu
+from app.parsers import get_parser, registry
+from app.parsers.streams import (
+    CONTENT_ENCODINGS,
+    DECOMPRESSION_ERRORS,
+    detect_compression,
+    open_decompressed,
+    open_upload_stream,
+    read_prefix,
+    split_compression_suffix,
+)
+from app.logic.counts import COUNT_STRATEGY, CountStrategy, adjust_counter, count_rows, delete_all_rows
+from app.logic.cleaner import CLEANING_DETAILS_LIMIT, DUPLICATE_POLICY, DataCleaner
+from app.logic.parallel import iter_clean_parallel
+from app.logic.upsert import ingest_batches_async
 from app.models.geodata import Geodata
 
 logger = get_logger("upload")
 
+# Obergrenze für ?details= (Speicher bleibt unabhängig von der Dateigröße)
+MAX_DETAILS_LIMIT = 1000
+
+# Obergrenze für ?limit= bei /api/data
+MAX_PAGE_LIMIT = 1000
+
+# Zählweise für total bei /api/data (?count=)
+COUNT_DESCRIPTION = "total: estimate (Planer-Schätzung, sonst Zähler; Standard), exact (count(*)), counter (Zähler) oder none"
+
+# Regel für doppelte IDs in einer Datei (?duplicates=)
+DuplicatePolicy = Literal["first", "last", "reject"]
+DUPLICATES_DESCRIPTION = "Doppelte IDs: first (erste Zeile gilt), last (letzte Zeile gilt) oder reject (als Fehler)"
+
 # Router erstellen (wird in main.py eingebunden)
-router = APIRouter(prefix="/api", tags=["upload"])
+# Uploads über UPLOAD_SPOOL_MAX_SIZE landen in einer Temp-Datei (siehe app/forms.py)
+router = APIRouter(prefix="/api", tags=["upload"], route_class=SpoolingRoute)
 
 def get_file_type(filename: str) -> str:
-    """Erkennt Dateityp anhand der Endung"""
-    if filename.lower().endswith(".csv"):
-        return "csv"
-    elif filename.lower().endswith(".nas"):
-        return "nas"
-    return "unknown"
+    """Erkennt Dateityp anhand der Endung (auch "daten.csv.gz" → "csv")"""
+    parser = registry.for_filename(filename)
+    return parser.format_name if parser else "unknown"
+
+
+def get_compression(file: UploadFile, prefix: bytes) -> Optional[str]:
+    """
+    Erkennt ob ein Upload komprimiert ist.
+    
+    Reihenfolge: Dateiendung (.gz/.bz2/.zst), Content-Encoding des Datei-Teils,
+    Magic Bytes am Dateianfang.
+    """
+    codec = split_compression_suffix(file.filename)[1]
+    if codec is None:
+        encoding = (file.headers.get("content-encoding") or "").strip().lower()
+        codec = CONTENT_ENCODINGS.get(encoding)
+    return codec or detect_compression(prefix)
+
+
+def _parsed_rows(stream: BinaryIO, parser) -> Iterator[Dict[str, Any]]:
+    """Zeilen aus dem Parser, Fehler werden zu HTTP 400."""
+    try:
+        yield from parser.iter_rows(stream)
+    except DECOMPRESSION_ERRORS as e:
+        # Kaputte komprimierte Daten hinter den ersten KB
+        raise HTTPException(status_code=400, detail=f"Dekomprimierung fehlgeschlagen: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Parsing-Fehler: {str(e)}")
+
+
+def _clean_stream(stream: BinaryIO, parser, parallel: bool, cleaner: DataCleaner) -> Iterator[List[Dict]]:
+    """
+    Parst und bereinigt den Upload-Stream, liefert die gültigen Zeilen blockweise.
+    
+    Seriell läuft parse → clean als Pipeline mit konstantem Speicherbedarf
+    (Blöcke aus cleaner.clean_iter). CSV-Dateien können mit parallel=True auf
+    mehrere Prozesse verteilt werden, die Blöcke kommen dann bereichsweise.
+    Zähler, Details und Fehler stehen danach in cleaner.stats.
+    """
+    if parallel and parser.format_name == "csv":
+        try:
+            yield from iter_clean_parallel(stream, cleaner)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Parsing-Fehler: {str(e)}")
+        return
+    
+    # Stream wird blockweise gelesen, kein file.read() der ganzen Datei
+    yield from cleaner.clean_iter(_parsed_rows(stream, parser))
+
+
+def _discard(batches: Iterator[List[Dict]]) -> None:
+    """Verbraucht die Blöcke ohne sie zu behalten (nur die Statistik wird gebraucht)."""
+    for _ in batches:
+        pass
+
+
+@contextmanager
+def open_cleaned_batches(file: UploadFile, parallel: bool,
+                         cleaner: DataCleaner) -> Iterator[Tuple[str, Optional[str], Iterator[List[Dict]]]]:
+    """
+    Öffnet den Upload, erkennt das Format und liefert die bereinigten Blöcke.
+    
+    Öffnen, Lesen der Blöcke (Parsen, Bereinigen) und Schließen blockieren und
+    laufen deshalb über run_cpu bzw. iterate_cpu. Beim Schließen wird auch der
+    Block-Generator beendet (bei parallel=True inkl. Prozess-Pool).
+    
+    Yields:
+        Tuple von (dateityp, kompression, blöcke)
+    """
+    # Auf der Platte gespoolte Uploads per mmap lesen statt in den Speicher zu kopieren
+    with open_upload_stream(file.file) as raw_stream, ExitStack() as stack:
+        compression = get_compression(file, read_prefix(raw_stream))
+        try:
+            # Komprimierte Dateien werden beim Lesen entpackt (gzip, bz2, zstd)
+            stream = stack.enter_context(open_decompressed(raw_stream, compression))
+            prefix = read_prefix(stream)
+        except DECOMPRESSION_ERRORS + (ValueError,) as e:
+            # Kaputte oder nicht unterstützte Komprimierung
+            raise HTTPException(status_code=400, detail=f"Dekomprimierung fehlgeschlagen: {str(e)}")
+        
+        # Dateiformat prüfen (Endung, sonst die ersten KB der Datei)
+        try:
+            parser = get_parser(file.filename, prefix)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        batches = stack.enter_context(closing(_clean_stream(stream, parser, parallel, cleaner)))
+        yield parser.format_name, compression, batches
+
+
+def _process_file(file: UploadFile, parallel: bool, cleaner: DataCleaner,
+                  consume: Callable[[Iterator[List[Dict]]], Any]) -> Tuple[str, Optional[str], Any]:
+    """
+    Übergibt die bereinigten Blöcke des Uploads an consume (blockiert, über run_cpu).
+    
+    Returns:
+        Tuple von (dateityp, kompression, ergebnis_von_consume)
+    """
+    with open_cleaned_batches(file, parallel, cleaner) as (file_type, compression, batches):
+        return file_type, compression, consume(batches)
+
 
 @router.post("/test")
-async def test_file(file: UploadFile = File(...)):
+async def test_file(
+    file: UploadFile = File(...),
+    parallel: bool = Query(False, description="CSV auf mehrere Prozesse verteilt parsen und bereinigen"),
+    details: int = Query(CLEANING_DETAILS_LIMIT, ge=0, le=MAX_DETAILS_LIMIT, description="Max. Zeilen mit Bereinigungs-Details im Report"),
+    details_mode: Literal["first", "sample"] = Query("first", description="Details der ersten Zeilen oder einer Stichprobe über die ganze Datei"),
+    duplicates: DuplicatePolicy = Query(DUPLICATE_POLICY, description=DUPLICATES_DESCRIPTION),
+):
     """
     Testet eine Datei ohne sie zu speichern.
     """
@@ -37,39 +172,35 @@ async def test_file(file: UploadFile = File(...)):
     if not file.filename:
         raise HTTPException(status_code=400, detail="Kein Dateiname angegeben")
     
-    file_type = get_file_type(file.filename) 
-
-    # 1. Dateiformat prüfen
-    try:
-        parser = get_parser(file.filename)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    
-    # 2. Datei lesen und parsen
-    content = await file.read()
-    try:
-        raw_data = parser.parse(content)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Parsing-Fehler: {str(e)}")
-    
-    # 3. Daten bereinigen
-    cleaner = DataCleaner()
-    cleaned_data, errors = cleaner.clean(raw_data)
+    # 1. - 3. Format erkennen, parsen und bereinigen in einem Worker-Thread (Event-Loop bleibt frei)
+    # Der Report braucht nur die Statistik, die Zeilen werden verworfen.
+    cleaner = DataCleaner(details_limit=details, details_mode=details_mode, duplicates=duplicates)
+    file_type, compression, _ = await run_cpu(_process_file, file, parallel, cleaner, _discard)
     
     # 4. Report erstellen
-    report = cleaner.generate_report(raw_data, cleaned_data, errors)
+    report = cleaner.report()
     report["filename"] = file.filename
-    report["status"] = "valid" if not errors else "has_errors"
+    report["status"] = "valid" if not report["error_rows"] else "has_errors"
     report["file_type"] = file_type 
+    report["compression"] = compression
     
-    logger.info(f"Test abgeschlossen: {file.filename} - {len(cleaned_data)}/{len(raw_data)} gültig")
+    logger.info(f"Test abgeschlossen: {file.filename} - {report['valid_rows']}/{report['total_rows']} gültig")
     return report
 
 
 @router.post("/upload")
-async def upload_file(file: UploadFile = File(...), db: Session = Depends(get_db)):
+async def upload_file(
+    file: UploadFile = File(...),
+    db: AsyncSession = Depends(get_async_db),
+    mode: Literal["auto", "batch", "copy"] = Query("auto", description="Ingest-Modus: batch (INSERT ... ON CONFLICT), copy (COPY + Merge) oder auto"),
+    parallel: bool = Query(False, description="CSV auf mehrere Prozesse verteilt parsen und bereinigen"),
+    duplicates: DuplicatePolicy = Query(DUPLICATE_POLICY, description=DUPLICATES_DESCRIPTION),
+):
     """
     Lädt eine Datei hoch und speichert sie in der Datenbank.
+    
+    Doppelte IDs werden vor dem Speichern nach `duplicates` aufgelöst,
+    jede ID wird nur einmal geschrieben.
     """
     logger.info(f"Upload-Request erhalten: {file.filename}")
     
@@ -77,74 +208,94 @@ async def upload_file(file: UploadFile = File(...), db: Session = Depends(get_db
     if not file.filename:
         raise HTTPException(status_code=400, detail="Kein Dateiname angegeben")
     
-    file_type = get_file_type(file.filename)
-    
-    # 1. Dateiformat prüfen
+    # 1. - 4. Parsen, bereinigen (in Worker-Threads) und speichern als Pipeline (Batch-Upsert oder COPY)
+    # Die Antwort enthält keine Bereinigungs-Details und Profile, also nichts davon berechnen
+    cleaner = DataCleaner(details_limit=0, profile=False, duplicates=duplicates)
+    # Die Statements gehen über den Async-Treiber, beim Warten auf die DB bleibt die Event-Loop frei
+    # Öffnen und Schließen laufen beide im Worker-Thread (Prefix lesen, Generator und Streams beenden)
+    stack = ExitStack()
     try:
-        parser = get_parser(file.filename)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
+        file_type, compression, batches = await run_cpu(
+            stack.enter_context, open_cleaned_batches(file, parallel, cleaner)
+        )
+        ingest_mode, inserted_count, updated_count = await ingest_batches_async(db, iterate_cpu(batches), mode)
+    finally:
+        # Auch bei abgebrochenem Request schließen
+        with CancelScope(shield=True):
+            await run_cpu(stack.close)
     
-    # 2. Datei lesen und parsen
-    content = await file.read()
-    try:
-        raw_data = parser.parse(content)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Parsing-Fehler: {str(e)}")
-    
-    # 3. Daten bereinigen
-    cleaner = DataCleaner()
-    cleaned_data, errors = cleaner.clean(raw_data)
-    
-    if not cleaned_data:
+    stats = cleaner.stats
+    if not stats.valid_rows:
+        await db.rollback()
         raise HTTPException(status_code=400, detail="Keine gültigen Daten zum Speichern")
     
-    # 4. In Datenbank speichern
-    saved_count = 0
-    inserted_count = 0
-    updated_count = 0
-
-    for row in cleaned_data:
-        # Prüfen ob ID bereits existiert (Update statt Insert)
-        existing = db.query(Geodata).filter(Geodata.id == row.get("id")).first()
-        
-        if existing:
-            # Update: vorhandenen Eintrag aktualisieren
-            for key, value in row.items():
-                setattr(existing, key, value)
-            updated_count += 1
-        else:
-            # Insert: neuen Eintrag erstellen
-            geodata = Geodata(**row)
-            db.add(geodata)
-            inserted_count += 1
-        
-        saved_count += 1
-    
-    # Änderungen speichern
-    db.commit()
+    # Änderungen speichern (Zähler für ?count=counter in derselben Transaktion)
+    await adjust_counter(db, inserted_count)
+    await db.commit()
 
     
     return {
         "status": "success",
         "filename": file.filename,
         "file_type": file_type, 
-        "total_rows": len(raw_data),
+        "compression": compression,
+        "ingest_mode": ingest_mode,
+        "total_rows": stats.total_rows,
         "saved_rows": inserted_count + updated_count,
         "inserted": inserted_count,  
         "updated": updated_count,    
-        "error_rows": len(errors),
-        "errors": errors[:10]
+        "error_rows": stats.error_collector.total,
+        "duplicate_rows": stats.duplicate_rows,
+        "error_summary": stats.error_collector.summary(),
+        "errors": stats.error_collector.examples[:10]
     }
 
 
+def encode_cursor(after_id: int) -> str:
+    """Opaker Cursor für die nächste Seite (Base64 über JSON)."""
+    return base64.urlsafe_b64encode(json.dumps({"after_id": after_id}).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """Liest after_id aus einem Cursor von encode_cursor, sonst HTTP 400."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        after_id = data["after_id"]
+        if type(after_id) is not int:
+            raise TypeError(after_id)
+    except (ValueError, TypeError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=f"Ungültiger Cursor: {cursor}") from e
+    return after_id
+
+
 @router.get("/data")
-async def get_all_data(db: Session = Depends(get_db), skip: int = 0, limit: int = 100):
+async def get_all_data(
+    db: AsyncSession = Depends(get_async_db),
+    skip: int = Query(0, ge=0, description="Zeilen überspringen (Offset, langsam bei tiefen Seiten)"),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_LIMIT, description="Max. Zeilen pro Seite"),
+    after_id: Optional[int] = Query(None, description="Nur Zeilen mit größerer ID (Keyset-Pagination)"),
+    cursor: Optional[str] = Query(None, description="next_cursor der vorherigen Seite"),
+    count: CountStrategy = Query(COUNT_STRATEGY, description=COUNT_DESCRIPTION),
+):
     """
-    Alle Geodaten abrufen (mit Pagination).
+    Alle Geodaten abrufen (mit Pagination, sortiert nach ID).
+    
+    Für große Tabellen nach ID blättern: `next_cursor` der Antwort als `?cursor=`
+    übergeben (oder `?after_id=`), bis `next_cursor` null ist. Jede Seite ist
+    dann ein Index-Zugriff, unabhängig davon, wie weit hinten sie liegt.
+    `total` kommt aus der Strategie `count` (Standard: COUNT_STRATEGY, sonst estimate);
+    ein exakter count(*) nur mit `?count=exact`.
     """
-    data = db.query(Geodata).offset(skip).limit(limit).all()
-    total = db.query(Geodata).count()
+    if cursor is not None:
+        after_id = decode_cursor(cursor)
+    
+    query = select(Geodata).order_by(Geodata.id).limit(limit)
+    if after_id is not None:
+        query = query.where(Geodata.id > after_id)
+    elif skip:
+        query = query.offset(skip)
+    data = (await db.scalars(query)).all()
+    total, count = await count_rows(db, count)
     
     # Konvertiere SQLAlchemy-Objekte zu Dicts (ohne _sa_instance_state)
     result = []
@@ -152,47 +303,55 @@ async def get_all_data(db: Session = Depends(get_db), skip: int = 0, limit: int
         row_dict = {c.name: getattr(row, c.name) for c in row.__table__.columns}
         result.append(row_dict)
     
+    # Volle Seite: es kann weitere Zeilen geben
+    next_cursor = encode_cursor(data[-1].id) if len(data) == limit else None
+    
     return {
         "total": total,
+        "count": count,
         "skip": skip,
         "limit": limit,
+        "after_id": after_id,
+        "next_cursor": next_cursor,
         "data": result
     }
 
 
 @router.delete("/data")
-async def delete_all_data(db: Session = Depends(get_db)):
+async def delete_all_data(db: AsyncSession = Depends(get_async_db)):
     """
     ALLE Geodaten löschen (Vorsicht!).
+    
+    `deleted_count` ist die echte Anzahl (PostgreSQL: count(*) unter Sperre, dann TRUNCATE).
     """
-    count = db.query(Geodata).count()
-    db.query(Geodata).delete()
-    db.commit()
+    deleted_count = await delete_all_rows(db)
+    await db.commit()
     
-    return {"status": "deleted", "deleted_count": count}
+    return {"status": "deleted", "deleted_count": deleted_count}
 
 
 @router.get("/data/{id}")
-async def get_data_by_id(id: int, db: Session = Depends(get_db)):
+async def get_data_by_id(id: int, db: AsyncSession = Depends(get_async_db)):
     """
     Einzelnen Datensatz nach ID abrufen.
     """
-    data = db.query(Geodata).filter(Geodata.id == id).first()
+    data = await db.get(Geodata, id)
     if not data:
         raise HTTPException(status_code=404, detail=f"Datensatz mit ID {id} nicht gefunden")
     return data
 
 
 @router.delete("/data/{id}")
-async def delete_data_by_id(id: int, db: Session = Depends(get_db)):
+async def delete_data_by_id(id: int, db: AsyncSession = Depends(get_async_db)):
     """
     Einzelnen Datensatz löschen.
     """
-    data = db.query(Geodata).filter(Geodata.id == id).first()
+    data = await db.get(Geodata, id)
     if not data:
         raise HTTPException(status_code=404, detail=f"Datensatz mit ID {id} nicht gefunden")
     
-    db.delete(data)
-    db.commit()
+    await db.delete(data)
+    await adjust_counter(db, -1)
+    await db.commit()
     
     return {"status": "deleted", "id": id}
\ No newline at end of file
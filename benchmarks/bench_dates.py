@@ -0,0 +1,59 @@
+"""
+Benchmark: Datumserkennung mit _parse_date gegen DateFormatInference.
+
+Aufruf (aus dem Projektverzeichnis):
+    python -m benchmarks.bench_dates [anzahl_werte]
+"""
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from app.logic.cleaner import DataCleaner, DateFormatInference
+
+# Spalten mit typischen Formaten (letzte Formate der Liste sind die teuersten)
+COLUMNS = {
+    "iso": "%Y-%m-%d",
+    "deutsch": "%d.%m.%Y",
+    "deutsch_mit_zeit": "%d.%m.%Y %H:%M",
+}
+
+
+def make_values(count: int, fmt: str, seed: int = 42):
+    """Datumswerte eines Formats, ca. 1000 verschiedene Tage."""
+    rng = random.Random(seed)
+    start = datetime(2020, 1, 1)
+    return [
+        (start + timedelta(days=rng.randrange(1000), minutes=rng.randrange(1440))).strftime(fmt)
+        for _ in range(count)
+    ]
+
+
+def measure(parse, values):
+    start = time.perf_counter()
+    result = list(map(parse, values))
+    return time.perf_counter() - start, result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    cleaner = DataCleaner()
+
+    print(f"{count} Werte pro Spalte")
+    for name, fmt in COLUMNS.items():
+        values = make_values(count, fmt)
+        inference = DateFormatInference(cleaner.DATE_FORMATS, cleaner.NULL_VALUES)
+        no_cache = DateFormatInference(cleaner.DATE_FORMATS, cleaner.NULL_VALUES, cache_size=0)
+
+        plain_time, plain_result = measure(cleaner._parse_date, values)
+        no_cache_time, no_cache_result = measure(no_cache.parse, values)
+        inference_time, inference_result = measure(inference.parse, values)
+
+        assert plain_result == no_cache_result == inference_result
+
+        print(f"{name:18s} Liste: {plain_time:6.2f}s  Format-Lock: {no_cache_time:6.2f}s  "
+              f"mit Cache: {inference_time:6.2f}s  ({plain_time / inference_time:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
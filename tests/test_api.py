@@ -1,8 +1,18 @@
 
 
+import bz2
+import gzip
+import statistics
+import threading
+import time
+
 import pytest
 from fastapi.testclient import TestClient
+from starlette.formparsers import MultiPartParser
+from app.forms import SpoolingMultiPartParser
+from app import middleware
 from app.main import app
+from app.routers import upload
 
 
 @pytest.fixture
@@ -21,6 +31,45 @@ class TestHealthEndpoint:
         assert response.status_code == 200
         assert response.json()["api"] == "ok"
 
+    def test_health_responsive_during_large_upload(self):
+        """/health antwortet, während ein großer Upload bereinigt und gespeichert wird"""
+        lines = ["ID,Flurstücknummer,longitude,latidude,Gemeinde,Bundesland,Größe in ha"]
+        lines += [f"{i},045-{i:06d},8.{i % 9999:04d},50.1,Gemeinde {i % 500},Hessen,1.5" for i in range(200_001, 260_001)]
+        content = "\n".join(lines).encode()
+        responses = []
+
+        def timed_health(client):
+            start = time.perf_counter()
+            response = client.get("/health")
+            assert response.status_code == 200
+            return time.perf_counter() - start, response
+
+        with TestClient(app) as client:
+            # Vergleichswert ohne Last
+            baseline = statistics.median(timed_health(client)[0] for _ in range(20))
+            # Upload läuft in einem eigenen Thread über dieselbe Event-Loop
+            upload = threading.Thread(target=lambda: responses.append(
+                client.post("/api/upload", files={"file": ("gross.csv", content, "text/csv")})))
+            upload.start()
+            latencies, busy = [], 0
+            while upload.is_alive():
+                latency, response = timed_health(client)
+                # Zählt nur, wenn der Upload nach der Antwort noch läuft
+                if upload.is_alive():
+                    latencies.append(latency)
+                    busy += response.json()["executor"]["cpu"]["busy"]
+                time.sleep(0.02)
+            upload.join()
+
+        assert responses[0].status_code == 200
+        assert responses[0].json()["saved_rows"] == 60_000
+        # /health wurde mehrfach beantwortet, während die Bereinigung lief
+        assert len(latencies) >= 3
+        assert busy >= 1
+        # Die Bereinigung teilt sich den GIL mit der Event-Loop, blockiert sie aber nicht
+        assert statistics.median(latencies) < baseline * 10 + 0.05
+        assert max(latencies) < baseline * 20 + 0.25
+
 
 class TestRootEndpoint:
     """Tests für / (GUI)"""
@@ -48,6 +97,7 @@ class TestTestEndpoint:
         data = response.json()
         assert data["total_rows"] == 3
         assert data["valid_rows"] == 3
+        assert data["column_profiles"]["id"]["count"] == 3
     
     def test_test_nas_file(self, client):
         """NAS-Datei wird getestet"""
@@ -72,11 +122,204 @@ class TestTestEndpoint:
         assert response.status_code == 400
         assert "nicht unterstützt" in response.json()["detail"].lower()
     
+    def test_test_unknown_extension_sniffed(self, client):
+        """Unbekannte Endung wird über den Dateiinhalt erkannt"""
+        with open("examples/geodata_example_1.csv", "rb") as f:
+            response = client.post(
+                "/api/test",
+                files={"file": ("export.txt", f, "text/plain")}
+            )
+        
+        assert response.status_code == 200
+        assert response.json()["file_type"] == "csv"
+        assert response.json()["valid_rows"] == 3
+    
+    def test_test_csv_file_parallel(self, client):
+        """Paralleler Modus liefert denselben Report"""
+        with open("examples/geodata_example_2.csv", "rb") as f:
+            serial = client.post("/api/test", files={"file": ("test.csv", f, "text/csv")}).json()
+        with open("examples/geodata_example_2.csv", "rb") as f:
+            parallel = client.post("/api/test?parallel=true", files={"file": ("test.csv", f, "text/csv")}).json()
+        
+        assert parallel["total_rows"] == serial["total_rows"]
+        assert parallel["valid_rows"] == serial["valid_rows"]
+        assert parallel["errors"] == serial["errors"]
+    
+    def test_test_spooled_to_disk(self, client, monkeypatch):
+        """Auf die Platte gespoolte Uploads werden per mmap gelesen"""
+        monkeypatch.setattr(SpoolingMultiPartParser, "spool_max_size", 16)
+        rolled = []
+        open_upload_stream = upload.open_upload_stream
+        
+        def spy(file):
+            rolled.append(file._rolled)
+            return open_upload_stream(file)
+        
+        monkeypatch.setattr(upload, "open_upload_stream", spy)
+        with open("examples/geodata_example_1.nas", "rb") as f:
+            response = client.post(
+                "/api/test",
+                files={"file": ("test.nas", f, "application/xml")}
+            )
+        
+        assert response.status_code == 200
+        assert response.json()["valid_rows"] == 2
+        assert rolled == [True]
+        # Die Starlette-Klasse selbst bleibt unverändert
+        assert MultiPartParser.spool_max_size == 1024 * 1024
+    
+    def test_test_gzip_file(self, client):
+        """.csv.gz wird beim Lesen entpackt"""
+        with open("examples/geodata_example_1.csv", "rb") as f:
+            content = gzip.compress(f.read())
+        
+        response = client.post(
+            "/api/test",
+            files={"file": ("test.csv.gz", content, "application/gzip")}
+        )
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["file_type"] == "csv"
+        assert data["compression"] == "gzip"
+        assert data["valid_rows"] == 3
+    
+    def test_test_bz2_nas_file(self, client):
+        """.nas.bz2 wird beim Lesen entpackt"""
+        with open("examples/geodata_example_1.nas", "rb") as f:
+            content = bz2.compress(f.read())
+        
+        response = client.post(
+            "/api/test",
+            files={"file": ("test.nas.bz2", content, "application/x-bzip2")}
+        )
+        
+        assert response.status_code == 200
+        assert response.json()["valid_rows"] == 2
+    
+    def test_test_gzip_request_body(self, client):
+        """Request mit Content-Encoding: gzip wird entpackt"""
+        with open("examples/geodata_example_1.csv", "rb") as f:
+            csv_content = f.read()
+        body = (
+            b'--grenze\r\nContent-Disposition: form-data; name="file"; filename="test.csv"\r\n'
+            b"Content-Type: text/csv\r\n\r\n" + csv_content + b"\r\n--grenze--\r\n"
+        )
+        
+        response = client.post(
+            "/api/test",
+            content=gzip.compress(body),
+            headers={
+                "Content-Type": "multipart/form-data; boundary=grenze",
+                "Content-Encoding": "gzip",
+            }
+        )
+        
+        assert response.status_code == 200
+        assert response.json()["valid_rows"] == 3
+    
+    def test_gzip_request_body_limit(self, client, monkeypatch):
+        """gzip-Bombe: über MAX_DECOMPRESSED_BODY_SIZE bricht der Request mit 413 ab"""
+        monkeypatch.setattr(middleware, "MAX_DECOMPRESSED_BODY_SIZE", 1024 * 1024)
+        received = []
+        decompress = middleware.zlib.decompressobj
+        
+        class Spy:
+            def __init__(self, *args):
+                self._inner = decompress(*args)
+            
+            def decompress(self, data, max_length=0):
+                result = self._inner.decompress(data, max_length)
+                received.append(len(result))
+                return result
+            
+            def __getattr__(self, name):
+                return getattr(self._inner, name)
+        
+        monkeypatch.setattr(middleware.zlib, "decompressobj", Spy)
+        body = (
+            b'--grenze\r\nContent-Disposition: form-data; name="file"; filename="test.csv"\r\n'
+            b"Content-Type: text/csv\r\n\r\n" + b"0" * (50 * 1024 * 1024) + b"\r\n--grenze--\r\n"
+        )
+        
+        response = client.post(
+            "/api/test",
+            content=gzip.compress(body),
+            headers={
+                "Content-Type": "multipart/form-data; boundary=grenze",
+                "Content-Encoding": "gzip",
+            }
+        )
+        
+        assert response.status_code == 413
+        # Entpackt wird in kleinen Stücken und nur bis kurz über die Grenze
+        assert max(received) <= middleware.DECOMPRESS_CHUNK_SIZE
+        assert sum(received) <= 1024 * 1024 + middleware.DECOMPRESS_CHUNK_SIZE
+    
+    def test_test_broken_gzip_file(self, client):
+        """Kaputte gzip-Datei gibt 400"""
+        response = client.post(
+            "/api/test",
+            files={"file": ("test.csv.gz", b"\x1f\x8b kaputt", "application/gzip")}
+        )
+        
+        assert response.status_code == 400
+    
+    @pytest.mark.parametrize("endpoint", ["/api/test", "/api/upload"])
+    def test_corrupt_deflate_data(self, client, endpoint):
+        """Gültiger gzip-Header mit kaputten Deflate-Daten gibt 400 statt 500"""
+        content = b"\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\x03" + b"\xff" * 50
+        response = client.post(endpoint, files={"file": ("test.csv.gz", content, "application/gzip")})
+        
+        assert response.status_code == 400
+        assert "Dekomprimierung fehlgeschlagen" in response.json()["detail"]
+    
+    def test_test_details_limit(self, client):
+        """?details begrenzt die Bereinigungs-Details, Zähler bleiben vollständig"""
+        with open("examples/geodata_example_1.csv", "rb") as f:
+            response = client.post("/api/test?details=1", files={"file": ("test.csv", f, "text/csv")})
+        
+        report = response.json()
+        assert response.status_code == 200
+        assert len(report["cleaning_details"]) == 1
+        assert report["rows_with_cleanings"] > 1
+    
+    def test_test_details_sample(self, client):
+        """?details_mode=sample liefert eine Stichprobe in Zeilenreihenfolge"""
+        with open("examples/geodata_example_1.csv", "rb") as f:
+            response = client.post("/api/test?details=2&details_mode=sample", files={"file": ("test.csv", f, "text/csv")})
+        
+        rows = [detail["row"] for detail in response.json()["cleaning_details"]]
+        assert len(rows) == 2
+        assert rows == sorted(rows)
+    
+    def test_test_invalid_details(self, client):
+        """Negatives Limit oder unbekannter Modus gibt 422"""
+        with open("examples/geodata_example_1.csv", "rb") as f:
+            content = f.read()
+        
+        assert client.post("/api/test?details=-1", files={"file": ("test.csv", content, "text/csv")}).status_code == 422
+        assert client.post("/api/test?details_mode=all", files={"file": ("test.csv", content, "text/csv")}).status_code == 422
+    
     def test_test_no_file(self, client):
         """Fehlende Datei gibt Fehler"""
         response = client.post("/api/test")
         
         assert response.status_code == 422  # Validation error
+    
+    def test_test_endpoint_reject_duplicates(self, client):
+        """?duplicates=reject meldet weitere Zeilen als Fehler"""
+        content = (
+            "ID,Flurstücknummer,longitude,latidude,Gemeinde,Bundesland,Größe in ha\n"
+            "9102,1,8.5,50.1,Alt,Hessen,1\n"
+            "9102,1,8.5,50.1,Neu,Hessen,1\n"
+        ).encode("utf-8")
+        response = client.post("/api/test?duplicates=reject", files={"file": ("test.csv", content, "text/csv")})
+        
+        data = response.json()
+        assert data["error_rows"] == 1
+        assert data["duplicates"]["policy"] == "reject"
+        assert data["error_summary"]["duplicate_id"]["first_row"] == 2
 
 
 class TestUploadEndpoint:
@@ -102,4 +345,115 @@ class TestUploadEndpoint:
             files={"file": ("test.txt", b"some content", "text/plain")}
         )
         
-        assert response.status_code == 400
\ No newline at end of file
+        assert response.status_code == 400
+    
+    def test_upload_invalid_mode(self, client):
+        """Unbekannter Ingest-Modus wird abgelehnt"""
+        with open("examples/geodata_example_1.csv", "rb") as f:
+            response = client.post(
+                "/api/upload?mode=turbo",
+                files={"file": ("test.csv", f, "text/csv")}
+            )
+        
+        assert response.status_code == 422
+    
+    def test_upload_duplicate_ids(self, client):
+        """Doppelte IDs werden nur einmal gespeichert"""
+        content = (
+            "ID,Flurstücknummer,longitude,latidude,Gemeinde,Bundesland,Größe in ha\n"
+            "9101,1,8.5,50.1,Alt,Hessen,1\n"
+            "9101,1,8.5,50.1,Neu,Hessen,1\n"
+        ).encode("utf-8")
+        response = client.post("/api/upload", files={"file": ("test.csv", content, "text/csv")})
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["saved_rows"] == 1
+        assert data["duplicate_rows"] == 1
+        assert client.get("/api/data/9101").json()["gemeinde"] == "Neu"
+    
+    def test_upload_duplicate_ids_across_blocks(self, client):
+        """last gilt über Blockgrenzen: jede ID zählt und wird einmal gespeichert"""
+        header = "ID,Flurstücknummer,longitude,latidude,Gemeinde,Bundesland,Größe in ha"
+        lines = [header] + [f"{i},1,8.5,50.1,Alt,Hessen,1" for i in range(300_001, 310_001)]
+        lines += [f"{i},1,8.5,50.1,Neu,Hessen,1" for i in range(300_001, 300_006)]
+        content = "\n".join(lines).encode("utf-8")
+        
+        first = client.post("/api/test?duplicates=first", files={"file": ("test.csv", content, "text/csv")}).json()
+        last = client.post("/api/test?duplicates=last", files={"file": ("test.csv", content, "text/csv")}).json()
+        assert first["valid_rows"] == last["valid_rows"] == 10_000
+        assert last["duplicates"]["rows"] == 5
+        
+        data = client.post("/api/upload?duplicates=last", files={"file": ("test.csv", content, "text/csv")}).json()
+        assert data["saved_rows"] == 10_000
+        assert client.get("/api/data/300001").json()["gemeinde"] == "Neu"
+        assert client.get("/api/data/300006").json()["gemeinde"] == "Alt"
+
+
+class TestDataEndpoint:
+    """Tests für /api/data (async Session)"""
+    
+    def test_get_and_delete_by_id(self, client):
+        """Datensatz abrufen, löschen, danach 404"""
+        content = (
+            "ID,Flurstücknummer,longitude,latidude,Gemeinde,Bundesland,Größe in ha\n"
+            "9201,1,8.5,50.1,Fulda,Hessen,1\n"
+        ).encode("utf-8")
+        assert client.post("/api/upload", files={"file": ("test.csv", content, "text/csv")}).status_code == 200
+        
+        assert client.get("/api/data/9201").json()["gemeinde"] == "Fulda"
+        assert client.delete("/api/data/9201").json() == {"status": "deleted", "id": 9201}
+        assert client.get("/api/data/9201").status_code == 404
+        assert client.delete("/api/data/9201").status_code == 404
+    
+    def test_get_all_with_pagination(self, client):
+        """Liste enthält total und höchstens limit Zeilen"""
+        response = client.get("/api/data?limit=1")
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["limit"] == 1
+        assert len(data["data"]) <= 1
+        assert data["total"] >= len(data["data"])
+    
+    def test_keyset_pagination(self, client):
+        """next_cursor blättert lückenlos und aufsteigend nach ID"""
+        lines = ["ID,Flurstücknummer,longitude,latidude,Gemeinde,Bundesland,Größe in ha"]
+        lines += [f"{i},1,8.5,50.1,Kassel,Hessen,1" for i in range(9301, 9306)]
+        client.post("/api/upload", files={"file": ("test.csv", "\n".join(lines).encode(), "text/csv")})
+        
+        first = client.get("/api/data?after_id=9300&limit=2&count=none").json()
+        assert [row["id"] for row in first["data"]] == [9301, 9302]
+        assert first["total"] is None
+        
+        # Weiterblättern bis hinter die eigenen IDs (andere Tests speichern größere IDs)
+        ids, cursor = [], first["next_cursor"]
+        while cursor and (not ids or ids[-1] < 9305):
+            page = client.get(f"/api/data?cursor={cursor}&limit=2").json()
+            ids += [row["id"] for row in page["data"]]
+            cursor = page["next_cursor"]
+        
+        assert ids[:3] == [9303, 9304, 9305]
+        assert ids == sorted(ids)
+    
+    def test_invalid_cursor(self, client):
+        """Unlesbarer Cursor ergibt 400"""
+        assert client.get("/api/data?cursor=kaputt").status_code == 400
+    
+    def test_counter_matches_exact_count(self, client):
+        """Zähler folgt Uploads und Löschungen und stimmt mit count(*) überein"""
+        client.get("/api/data?limit=1&count=counter")
+        content = (
+            "ID,Flurstücknummer,longitude,latidude,Gemeinde,Bundesland,Größe in ha\n"
+            "9401,1,8.5,50.1,Marburg,Hessen,1\n"
+            "9402,1,8.5,50.1,Marburg,Hessen,1\n"
+        ).encode("utf-8")
+        client.post("/api/upload", files={"file": ("test.csv", content, "text/csv")})
+        client.delete("/api/data/9401")
+        
+        counter = client.get("/api/data?limit=1&count=counter").json()
+        exact = client.get("/api/data?limit=1&count=exact").json()
+        assert counter["count"] == "counter"
+        assert counter["total"] == exact["total"]
+        # SQLite hat keine Planer-Schätzung, estimate nutzt den Zähler
+        assert client.get("/api/data?limit=1&count=estimate").json()["count"] == "counter"
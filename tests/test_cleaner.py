@@ -1,5 +1,8 @@
 import pytest
-from app.logic.cleaner import DataCleaner
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from app.logic.cleaner import DataCleaner, DateFormatInference, ValueInterner, canonical_bundesland, field_cleaner
 
 
 class TestDataCleanerBasic:
@@ -367,4 +370,333 @@ class TestDataCleanerDateConversion:
         """NULL-Werte werden als None behandelt"""
         for null_val in ["", "null", "N/A", "-"]:
             result = self.cleaner._parse_date(null_val)
-            assert result is None
\ No newline at end of file
+            assert result is None
+
+
+class TestDateFormatInference:
+    """Tests für die Formaterkennung pro Datumsspalte"""
+    
+    def setup_method(self):
+        self.inference = DateFormatInference(DataCleaner.DATE_FORMATS, DataCleaner.NULL_VALUES, sample_size=3)
+    
+    def test_locks_most_common_format(self):
+        """Nach der Stichprobe wird das häufigste Format fest gewählt"""
+        for value in ["15.01.2024", "16.01.2024", "2024/01/17"]:
+            self.inference.parse(value)
+        
+        assert self.inference.locked == "%d.%m.%Y"
+    
+    def test_fallback_after_lock(self):
+        """Werte in anderen Formaten werden weiterhin erkannt"""
+        for value in ["15.01.2024", "16.01.2024", "17.01.2024"]:
+            self.inference.parse(value)
+        
+        assert self.inference.parse("18/01/2024") == datetime(2024, 1, 18)
+        assert self.inference.parse("18.01.2024 10:30") == datetime(2024, 1, 18, 10, 30)
+        assert self.inference.parse("gestern") is None
+    
+    def test_iso_fast_path(self):
+        """ISO-Werte zählen nicht zur Stichprobe und liefern dasselbe Ergebnis"""
+        assert self.inference.parse("2024-01-15") == datetime(2024, 1, 15)
+        assert self.inference.parse("2024-01-15 10:30:00") == datetime(2024, 1, 15, 10, 30)
+        assert self.inference.parse("2024-02-30") is None
+        assert self.inference.parse("2024-01-15T10:30:00") is None  # nicht in DATE_FORMATS
+        assert self.inference.locked is None
+    
+    def test_same_result_as_parse_date(self):
+        """Gleiches Ergebnis wie _parse_date, auch mit festem Format"""
+        cleaner = DataCleaner()
+        values = ["2024-01-15", "2024-1-5", "15.01.2024", "5.1.2024", "15/01/2024", "2024/01/15",
+                  "15-01-2024", "2024-01-15 10:30:00", "15.01.2024 14:30:00", "15.01.2024 14:30",
+                  " 15.01.2024 ", "31.02.2024", "", "null", "-", "abc", None]
+        for locked in [None] + DataCleaner.DATE_FORMATS:
+            inference = DateFormatInference(DataCleaner.DATE_FORMATS, DataCleaner.NULL_VALUES)
+            inference.locked = locked
+            for value in values:
+                assert inference.parse(value) == cleaner._parse_date(value), (locked, value)
+    
+    def test_reset_between_files(self):
+        """clean() erkennt das Format pro Datei neu"""
+        cleaner = DecimalCleaner()
+        inference = cleaner._date_inferences[0]
+        inference.locked = "%d/%m/%Y"
+        inference.parse("15/01/2024")
+        cleaner.clean([])
+        
+        assert inference.locked is None
+        assert inference.parse.cache_info().currsize == 0
+
+
+def decimal_convert(value, original_value, row_cleanings, counters):
+    """Beispiel für einen eigenen Konverter"""
+    try:
+        return Decimal(value.replace(",", "."))
+    except InvalidOperation:
+        raise ValueError(f"'{value}' ist kein gültiger Decimal")
+
+
+class DecimalCleaner(DataCleaner):
+    """Eigener Typ und eigenes Mapping ohne Änderung an der Schleife"""
+    FIELD_MAPPING = {**DataCleaner.FIELD_MAPPING, "Preis": ("preis", Decimal), "Datum": ("datum", datetime)}
+    CONVERTERS = {**DataCleaner.CONVERTERS, Decimal: lambda s, t, c: field_cleaner(s, t, c, decimal_convert)}
+
+
+class TestDataCleanerConverters:
+    """Tests für die kompilierten Feld-Konverter"""
+    
+    def setup_method(self):
+        self.cleaner = DecimalCleaner()
+        self.row = {"ID": "1", "Flurstücknummer": "123", "longitude": "8", "latidude": "50",
+                    "Gemeinde": "Frankfurt", "Bundesland": "Hessen", "Größe in ha": "1"}
+    
+    def test_one_converter_per_field(self):
+        """FIELD_MAPPING wird einmalig in Feld-Funktionen übersetzt"""
+        assert len(self.cleaner._converters) == len(DecimalCleaner.FIELD_MAPPING)
+    
+    def test_custom_type(self):
+        """Eigener Typ bekommt Trim und NULL-Erkennung mit"""
+        cleaned, errors = self.cleaner.clean([
+            {**self.row, "Preis": " 12,50 ", "Datum": "15.01.2024"},
+            {**self.row, "Preis": "N/A", "Datum": "2024-01-15"},
+        ])
+        
+        assert errors == []
+        assert cleaned[0]["preis"] == Decimal("12.50")
+        assert cleaned[0]["datum"] == datetime(2024, 1, 15)
+        assert cleaned[1]["preis"] is None
+        assert self.cleaner.cleanings_performed["whitespace_trimmed"] == 1
+        assert self.cleaner.cleanings_performed["date_converted"] == 2
+    
+    def test_custom_type_error(self):
+        """Fehler des eigenen Konverters landen in der Fehlerliste"""
+        cleaned, errors = self.cleaner.clean([{**self.row, "Preis": "teuer", "Datum": "2024-01-15"}])
+        
+        assert cleaned == []
+        assert errors[0]["error"] == "'teuer' ist kein gültiger Decimal"
+    
+    def test_invalid_date(self):
+        """Ungültiges Datum hat dieselbe Meldung wie bisher"""
+        _, errors = self.cleaner.clean([{**self.row, "Preis": "1", "Datum": "gestern"}])
+        
+        assert errors[0]["error"] == "Feld 'Datum': 'gestern' ist kein gültiger datetime"
+    
+    def test_unknown_type_as_string(self):
+        """Unbekannte Typen ohne Konverter werden wie str behandelt"""
+        class BoolCleaner(DataCleaner):
+            FIELD_MAPPING = {**DataCleaner.FIELD_MAPPING, "Aktiv": ("aktiv", bool)}
+        
+        cleaned, _ = BoolCleaner().clean([{**self.row, "Aktiv": " ja "}])
+        
+        assert cleaned[0]["aktiv"] == "ja"
+
+
+class TestDataCleanerDetails:
+    """Tests für begrenzte Bereinigungs-Details"""
+    
+    def make_rows(self, count):
+        return [{"ID": str(i), "Flurstücknummer": "123", "longitude": "8,5", "latidude": "50",
+                 "Gemeinde": " Frankfurt ", "Bundesland": "Hessen", "Größe in ha": "1"} for i in range(1, count + 1)]
+    
+    def test_first_rows_only(self):
+        """Standard: Details nur für die ersten N Zeilen"""
+        cleaner = DataCleaner(details_limit=5)
+        cleaner.clean(self.make_rows(100))
+        
+        assert [d["row"] for d in cleaner.cleaning_details] == [1, 2, 3, 4, 5]
+        assert cleaner.cleaning_details[0]["cleanings"] == [
+            "'ID': String '1' → Integer 1",
+            "'longitude': Komma zu Punkt '8,5' → '8.5'",
+            "'Gemeinde': Whitespace entfernt",
+        ]
+    
+    def test_counters_stay_exact(self):
+        """Zähler zählen alle Zeilen, unabhängig vom Limit"""
+        limited = DataCleaner(details_limit=0)
+        full = DataCleaner(details_limit=None)
+        limited.clean(self.make_rows(100))
+        full.clean(self.make_rows(100))
+        
+        assert limited.cleaning_details == []
+        assert limited.cleanings_performed == full.cleanings_performed
+        assert limited.rows_with_cleanings == len(full.cleaning_details) == 100
+    
+    def test_sample_mode(self):
+        """Stichprobe hat höchstens N Einträge aus der ganzen Datei"""
+        cleaner = DataCleaner(details_limit=10, details_mode="sample", seed=1)
+        cleaned, errors = cleaner.clean(self.make_rows(1000))
+        report = cleaner.generate_report([], cleaned, errors, 1000, [])
+        rows = [d["row"] for d in report["cleaning_details"]]
+        
+        assert len(rows) == 10
+        assert rows == sorted(rows)
+        assert max(rows) > 10
+        assert report["rows_with_cleanings"] == 1000
+    
+    def test_merge_first(self):
+        """Zusammenführen von Teilergebnissen behält die ersten N Zeilen"""
+        cleaner = DataCleaner(details_limit=3)
+        cleaner.merge_details([{"row": 1, "cleanings": []}, {"row": 2, "cleanings": []}], 5)
+        cleaner.merge_details([{"row": 9, "cleanings": []}, {"row": 10, "cleanings": []}], 7)
+        
+        assert [d["row"] for d in cleaner.cleaning_details] == [1, 2, 9]
+        assert cleaner.rows_with_cleanings == 12
+    
+    def test_merge_sample(self):
+        """Zusammengeführte Stichprobe bleibt auf N begrenzt"""
+        cleaner = DataCleaner(details_limit=3, details_mode="sample", seed=1)
+        cleaner.merge_details([{"row": i, "cleanings": []} for i in range(1, 4)], 50)
+        cleaner.merge_details([{"row": i, "cleanings": []} for i in range(51, 54)], 50)
+        
+        assert len(cleaner.cleaning_details) == 3
+        assert cleaner.rows_with_cleanings == 100
+    
+    def test_invalid_mode(self):
+        """Unbekannter Modus wirft ValueError"""
+        with pytest.raises(ValueError):
+            DataCleaner(details_mode="all")
+
+
+class TestDataCleanerInterning:
+    """Tests für Normalisierung und Interning von Gemeinde/Bundesland"""
+    
+    def setup_method(self):
+        self.cleaner = DataCleaner(details_limit=None)
+    
+    def make_row(self, gemeinde, bundesland):
+        return {"ID": "1", "Flurstücknummer": "123", "longitude": "8", "latidude": "50",
+                "Gemeinde": gemeinde, "Bundesland": bundesland, "Größe in ha": "1"}
+    
+    def test_bundesland_canonical(self):
+        """Bekannte Schreibweisen werden zum offiziellen Namen"""
+        cleaned, errors = self.cleaner.clean([
+            self.make_row("Erfurt", "thueringen"),
+            self.make_row("Erfurt", " THÜRINGEN "),
+            self.make_row("Stuttgart", "baden-wuerttemberg"),
+        ])
+        
+        assert errors == []
+        assert [row["bundesland"] for row in cleaned] == ["Thüringen", "Thüringen", "Baden-Württemberg"]
+    
+    def test_unknown_bundesland_unchanged(self):
+        """Unbekannte Werte bleiben Fehler mit dem Originalwert"""
+        _, errors = self.cleaner.clean([self.make_row("Wien", " Wien ")])
+        
+        assert errors[0]["error"] == "'Wien' ist kein gültiges deutsches Bundesland"
+    
+    def test_same_object_for_equal_values(self):
+        """Gleiche Werte teilen sich ein str-Objekt"""
+        rows = [self.make_row("".join(["Frank", "furt"]), "".join(["hes", "sen"])) for _ in range(3)]
+        cleaned, _ = self.cleaner.clean(rows)
+        
+        assert cleaned[0]["gemeinde"] is cleaned[2]["gemeinde"]
+        assert cleaned[0]["bundesland"] is cleaned[2]["bundesland"]
+    
+    def test_cleanings_per_row(self):
+        """Whitespace- und NULL-Meldungen kommen auch bei Cache-Treffern"""
+        self.cleaner.clean([self.make_row(" Kassel ", "Hessen"), self.make_row(" Kassel ", "Hessen"),
+                            self.make_row("N/A", "Hessen"), self.make_row("N/A", "Hessen")])
+        
+        assert self.cleaner.cleanings_performed["whitespace_trimmed"] == 2
+        assert self.cleaner.cleanings_performed["null_converted"] == 2
+        assert "'Gemeinde': 'N/A' → NULL" in self.cleaner.cleaning_details[3]["cleanings"]
+    
+    def test_cache_size_limit(self):
+        """Der Cache wächst nicht über max_size, Werte werden trotzdem normalisiert"""
+        interner = ValueInterner(canonical_bundesland, max_size=2)
+        
+        assert [interner(v) for v in ["hessen", "bayern", "sachsen"]] == ["Hessen", "Bayern", "Sachsen"]
+        assert len(interner.values) == 2
+
+
+class TestDataCleanerDuplicates:
+    """Tests für doppelte IDs innerhalb einer Datei"""
+    
+    def make_row(self, id, gemeinde):
+        return {"ID": id, "Flurstücknummer": "123", "longitude": "8", "latidude": "50",
+                "Gemeinde": gemeinde, "Bundesland": "Hessen", "Größe in ha": "1"}
+    
+    def make_rows(self):
+        return [self.make_row("1", "A"), self.make_row("2", "B"), self.make_row(" 1 ", "C"), self.make_row("1", "D")]
+    
+    def test_no_check_by_default(self):
+        """Ohne Regel werden alle Zeilen übernommen"""
+        cleaned, _ = DataCleaner().clean(self.make_rows())
+        
+        assert len(cleaned) == 4
+    
+    def test_first_wins(self):
+        """first: weitere Zeilen mit derselben ID werden verworfen"""
+        cleaner = DataCleaner(duplicates="first")
+        cleaned, errors = cleaner.clean(self.make_rows())
+        
+        assert [(row["id"], row["gemeinde"]) for row in cleaned] == [(1, "A"), (2, "B")]
+        assert errors == []
+        assert cleaner.report()["valid_rows"] == 2
+    
+    def test_last_wins(self):
+        """last: die letzte Zeile gilt, an der Position der ersten"""
+        cleaner = DataCleaner(duplicates="last")
+        cleaned, errors = cleaner.clean(self.make_rows())
+        
+        assert [(row["id"], row["gemeinde"]) for row in cleaned] == [(1, "D"), (2, "B")]
+        assert errors == []
+    
+    def test_reject(self):
+        """reject: weitere Zeilen werden Fehler mit Code duplicate_id"""
+        cleaner = DataCleaner(duplicates="reject")
+        cleaned, errors = cleaner.clean(self.make_rows())
+        
+        assert [row["gemeinde"] for row in cleaned] == ["A", "B"]
+        assert [e["row"] for e in errors] == [3, 4]
+        assert errors[0]["error"] == "ID 1 ist doppelt (erstmals in Zeile 1)"
+        assert cleaner.report()["error_summary"]["duplicate_id"]["count"] == 2
+    
+    def test_invalid_rows_do_not_count(self):
+        """Nur gültige Zeilen belegen eine ID"""
+        rows = [{**self.make_row("1", "A"), "latidude": "95"}, self.make_row("1", "B")]
+        cleaned, _ = DataCleaner(duplicates="first").clean(rows)
+        
+        assert [row["gemeinde"] for row in cleaned] == ["B"]
+    
+    def test_report(self):
+        """Der Report nennt Regel, Anzahl und Beispiele"""
+        cleaner = DataCleaner(duplicates="last")
+        cleaner.clean(self.make_rows())
+        
+        assert cleaner.report()["duplicates"] == {
+            "policy": "last",
+            "rows": 2,
+            "examples": [{"id": 1, "row": 3, "first_row": 1}, {"id": 1, "row": 4, "first_row": 1}],
+        }
+    
+    def test_across_clean_iter_batches(self):
+        """IDs werden über Blockgrenzen hinweg erkannt"""
+        cleaner = DataCleaner(duplicates="first")
+        batches = list(cleaner.clean_iter(self.make_rows(), batch_size=1))
+        
+        assert [len(batch) for batch in batches] == [1, 1, 0, 0]
+        assert cleaner.stats.duplicate_rows == 2
+    
+    def test_last_across_clean_iter_batches(self):
+        """last: die letzte Zeile gilt auch über Blockgrenzen, jede ID kommt einmal"""
+        cleaner = DataCleaner(duplicates="last")
+        batches = list(cleaner.clean_iter(self.make_rows(), batch_size=3))
+        expected, _ = DataCleaner(duplicates="last").clean(self.make_rows())
+        
+        assert [(row["id"], row["gemeinde"]) for batch in batches for row in batch] == [(1, "D"), (2, "B")]
+        assert [row for batch in batches for row in batch] == expected
+        assert cleaner.report()["valid_rows"] == 2
+        assert cleaner.report()["total_rows"] == 4
+    
+    def test_reset_between_runs(self):
+        """Jede Datei beginnt ohne bekannte IDs"""
+        cleaner = DataCleaner(duplicates="first")
+        cleaner.clean(self.make_rows())
+        cleaned, _ = cleaner.clean(self.make_rows())
+        
+        assert len(cleaned) == 2
+    
+    def test_unknown_policy(self):
+        """Unbekannte Regel wirft ValueError"""
+        with pytest.raises(ValueError):
+            DataCleaner(duplicates="merge")
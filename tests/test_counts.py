@@ -0,0 +1,73 @@
+"""
+Tests für die Zählweisen der geodata-Tabelle (app/logic/counts.py).
+Läuft gegen eine In-Memory SQLite-DB (aiosqlite).
+"""
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.database import Base
+from app.logic.counts import adjust_counter, count_rows, delete_all_rows
+from app.models.geodata import Geodata
+
+
+@pytest.fixture
+def anyio_backend():
+    # aiosqlite braucht asyncio
+    return "asyncio"
+
+
+@pytest.fixture
+async def db():
+    """Frische SQLite-DB mit drei Zeilen"""
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    async with async_sessionmaker(engine)() as session:
+        session.add_all([Geodata(id=i, gemeinde="Hamburg") for i in range(1, 4)])
+        await session.commit()
+        yield session
+    await engine.dispose()
+
+
+@pytest.mark.anyio
+class TestCountRows:
+    """Tests für count_rows und den Zähler"""
+    
+    async def test_strategies(self, db):
+        """exact zählt, none zählt nicht, estimate fällt ohne PostgreSQL auf den Zähler zurück"""
+        assert await count_rows(db, "exact") == (3, "exact")
+        assert await count_rows(db, "none") == (None, "none")
+        assert await count_rows(db, "estimate") == (3, "counter")
+    
+    async def test_default_is_estimate(self, db):
+        """Ohne COUNT_STRATEGY wird geschätzt (ohne PostgreSQL über den Zähler)"""
+        assert await count_rows(db) == (3, "counter")
+    
+    async def test_counter_created_once_and_adjusted(self, db):
+        """Zähler wird mit count(*) angelegt und danach nur noch angepasst"""
+        assert await count_rows(db, "counter") == (3, "counter")
+        
+        db.add(Geodata(id=4))
+        await adjust_counter(db, 1)
+        await db.commit()
+        
+        assert await count_rows(db, "counter") == (4, "counter")
+    
+    async def test_unknown_strategy(self, db):
+        """Unbekannte Strategie wird abgelehnt"""
+        with pytest.raises(ValueError):
+            await count_rows(db, "raten")
+
+
+@pytest.mark.anyio
+class TestDeleteAllRows:
+    """Tests für das Löschen aller Zeilen"""
+    
+    async def test_returns_deleted_and_resets_counter(self, db):
+        """Anzahl gelöschter Zeilen, danach steht der Zähler auf 0"""
+        assert await delete_all_rows(db) == 3
+        await db.commit()
+        
+        assert await count_rows(db, "counter") == (0, "counter")
+        assert await count_rows(db, "exact") == (0, "exact")
@@ -0,0 +1,90 @@
+"""
+Tests für die begrenzte Fehlersammlung (app/logic/errors.py).
+"""
+
+import logging
+
+from app.logic.cleaner import DataCleaner
+from app.logic.errors import CleaningError, ErrorCollector, error_codes
+
+
+def make_row(id="1", lat="50", land="Hessen"):
+    return {"ID": id, "Flurstücknummer": "123", "longitude": "8", "latidude": lat,
+            "Gemeinde": "Frankfurt", "Bundesland": land, "Größe in ha": "1"}
+
+
+class TestErrorCollector:
+    """Tests für ErrorCollector"""
+    
+    def test_examples_are_limited(self):
+        """Nur die ersten N Zeilen werden gespeichert, gezählt werden alle"""
+        collector = ErrorCollector(limit=2)
+        for row_num in range(1, 6):
+            collector.add(row_num, {"ID": "x"}, CleaningError("kaputt", "invalid_int:ID"))
+        
+        assert collector.total == 5
+        assert collector.counts == {"invalid_int:ID": 5}
+        assert [e["row"] for e in collector.examples] == [1, 2]
+    
+    def test_unexpected_exception_code(self):
+        """Exceptions ohne Code werden nach Typ gruppiert"""
+        assert error_codes(OverflowError("zu groß")) == ("exception:OverflowError",)
+    
+    def test_merge_shifts_rows(self):
+        """Zusammenführen verschiebt Zeilennummern und summiert Zählungen"""
+        first, second = ErrorCollector(limit=3), ErrorCollector(limit=3)
+        first.add(2, {}, CleaningError("a", "missing_id"))
+        second.add(1, {}, CleaningError("b", "missing_id", "unknown_bundesland"))
+        second.add(4, {}, CleaningError("c", "unknown_bundesland"))
+        
+        first.merge(second, row_offset=10)
+        
+        assert first.total == 3
+        assert first.counts == {"missing_id": 2, "unknown_bundesland": 2}
+        assert first.first["unknown_bundesland"] == (11, "b")
+        assert [e["row"] for e in first.examples] == [2, 11, 14]
+
+
+class TestCleanerErrors:
+    """Fehler-Codes und Zusammenfassung im DataCleaner"""
+    
+    def test_codes_per_error_class(self):
+        """Jede Fehlerart hat einen eigenen Code"""
+        cleaner = DataCleaner()
+        cleaner.clean([
+            make_row(id="abc"),
+            make_row(id=""),
+            make_row(lat="95"),
+            make_row(land="Bavaria"),
+            make_row(id="", lat="95"),
+        ])
+        
+        assert cleaner.error_collector.counts == {
+            "invalid_int:ID": 1,
+            "missing_id": 2,
+            "latitude_out_of_range": 2,
+            "unknown_bundesland": 1,
+        }
+    
+    def test_report_counts_all_rows(self):
+        """error_rows und error_summary zählen auch Zeilen ohne gespeichertes Beispiel"""
+        cleaner = DataCleaner(errors_limit=3)
+        raw_data = [make_row(id="abc") for _ in range(50)] + [make_row()]
+        cleaned, errors = cleaner.clean(raw_data)
+        report = cleaner.generate_report(raw_data, cleaned, errors)
+        
+        assert len(errors) == 3
+        assert report["status"] == "FIXABLE"
+        assert report["error_rows"] == 50
+        assert report["error_summary"]["invalid_int:ID"]["count"] == 50
+        assert report["error_summary"]["invalid_int:ID"]["first_row"] == 1
+    
+    def test_one_log_line_per_class(self, caplog):
+        """Eine Warnung pro Fehler-Code statt einer pro Zeile"""
+        cleaner = DataCleaner()
+        with caplog.at_level(logging.WARNING):
+            cleaner.clean([make_row(id="abc") for _ in range(100)] + [make_row(land="Bavaria")])
+        
+        warnings = [r for r in caplog.records if r.levelno == logging.WARNING]
+        assert len(warnings) == 2
+        assert "100 Zeile(n) fehlerhaft [invalid_int:ID]" in warnings[0].getMessage()
@@ -0,0 +1,96 @@
+"""
+Tests für den Export (app/routers/export.py).
+"""
+
+import csv
+import io
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.routers.export import COLUMNS, build_export_query, csv_block, ndjson_block, stream_export
+
+CONTENT = (
+    "ID,Flurstücknummer,longitude,latidude,Gemeinde,Bundesland,Größe in ha\n"
+    "9501,1,8.5,50.1,Gießen,Hessen,\n"
+    "9502,2,8.6,50.2,\"Frankfurt, Main\",Hessen,\"1,5\"\n"
+    "9503,3,9.9,53.5,Hamburg,Hamburg,2\n"
+).encode("utf-8")
+
+
+@pytest.fixture
+def client():
+    """Test-Client mit drei gespeicherten Zeilen (IDs 9501-9503)"""
+    client = TestClient(app)
+    assert client.post("/api/upload", files={"file": ("test.csv", CONTENT, "text/csv")}).status_code == 200
+    return client
+
+
+class TestExportEndpoint:
+    """Tests für GET /api/export"""
+    
+    def test_ndjson(self, client):
+        """Eine JSON-Zeile pro Datensatz, nach ID sortiert, NULL als null"""
+        response = client.get("/api/export?min_id=9501&max_id=9503")
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert [row["id"] for row in rows] == [9501, 9502, 9503]
+        assert rows[0]["gemeinde"] == "Gießen"
+        assert rows[0]["groesse_ha"] is None
+    
+    def test_csv_with_filter(self, client):
+        """CSV mit Kopfzeile, Filter nach Bundesland"""
+        response = client.get("/api/export?format=csv&bundesland=Hessen&min_id=9501&max_id=9503")
+        
+        assert response.status_code == 200
+        assert response.headers["content-disposition"] == 'attachment; filename="geodata.csv"'
+        rows = list(csv.reader(io.StringIO(response.text)))
+        assert rows[0] == COLUMNS
+        assert [row[0] for row in rows[1:]] == ["9501", "9502"]
+        assert rows[2][4] == "Frankfurt, Main"
+    
+    def test_invalid_format(self, client):
+        """Unbekanntes Format wird abgelehnt"""
+        assert client.get("/api/export?format=xlsx").status_code == 422
+
+
+class TestExportBlocks:
+    """Tests für die Formatierung der Blöcke"""
+    
+    def test_non_finite_floats_as_null(self):
+        """NaN/Infinity werden zu null bzw. leerem Feld, das NDJSON bleibt gültig"""
+        row = (1, "1", float("nan"), float("inf"), "Gießen", "Hessen", float("-inf"))
+        
+        def strict(constant):
+            raise ValueError(constant)
+        
+        line = json.loads(ndjson_block([row]), parse_constant=strict)
+        assert [line["longitude"], line["latitude"], line["groesse_ha"]] == [None, None, None]
+        assert line["gemeinde"] == "Gießen"
+        assert csv_block([row]) == "1,1,,,Gießen,Hessen,\n".encode("utf-8")
+
+
+@pytest.mark.anyio
+class TestStreamExport:
+    """Tests für das blockweise Lesen"""
+    
+    @pytest.fixture
+    def anyio_backend(self):
+        # aiosqlite braucht asyncio
+        return "asyncio"
+    
+    async def test_one_block_per_batch(self, client):
+        """Jeder Block enthält höchstens batch_size Zeilen"""
+        query = build_export_query(min_id=9501, max_id=9503)
+        blocks = [block async for block in stream_export(query, "ndjson", batch_size=2)]
+        
+        assert [block.count(b"\n") for block in blocks] == [2, 1]
+        assert b"".join(blocks) == ndjson_block([
+            (9501, "1", 8.5, 50.1, "Gießen", "Hessen", None),
+            (9502, "2", 8.6, 50.2, "Frankfurt, Main", "Hessen", 1.5),
+            (9503, "3", 9.9, 53.5, "Hamburg", "Hamburg", 2.0),
+        ])
@@ -23,7 +23,11 @@ Tests für den NAS-Parser mit Content-Detection.
 ENDE DATENEXPORTGroesse: 0.87 haBundesland: HamburgGemeinde: HamburgKoordinaten: 53.55 9.99Flurstuecknummer: 789-012-0002ID: 5002EINHEIT: FlurstueckGroesse: 1.25 haBundesland: BerlinGemeinde: BerlinKoordinaten: 52.52 13.405Flurstuecknummer: 123-456-0001ID: 5001EINHEIT: FlurstueckVERSION: 1.0Prüft ob XML-basierte und Text-basierte NAS-Dateien korrekt geparst werden.
 """
 
+import io
+import tracemalloc
+
 import pytest
+from app.logic.cleaner import DataCleaner
 from app.parsers.nas_parser import NASParser
 
 
@@ -269,4 +273,278 @@ class TestNASParserEdgeCases:
         result = self.parser.parse(xml_content)
         
         assert result[0]['ID'] == '1001'
-        assert result[0]['Gemeinde'] == 'Hamburg'
\ No newline at end of file
+        assert result[0]['Gemeinde'] == 'Hamburg'
+
+class TestNASParserStreamingXML:
+    """Tests für das inkrementelle XML-Parsing (iterparse)"""
+    
+    def setup_method(self):
+        self.parser = NASParser()
+    
+    def test_parse_namespaced_alkis_export(self):
+        """Namespaces und AX_Flurstueck werden erkannt"""
+        xml_content = b'''<?xml version="1.0" encoding="UTF-8"?>
+        <AX_Bestandsdatenauszug xmlns="http://www.adv-online.de/namespaces/adv/gid/6.0"
+                                xmlns:gml="http://www.opengis.net/gml/3.2">
+            <enthaelt>
+                <AX_Flurstueck gml:id="DEBE001">
+                    <ID>1001</ID>
+                    <Gemeinde>Berlin</Gemeinde>
+                    <gml:pos>52.52 13.405</gml:pos>
+                </AX_Flurstueck>
+                <AX_Gebaeude gml:id="DEBE002"><ID>9</ID></AX_Gebaeude>
+                <AX_Flurstueck gml:id="DEBE003"><ID>1002</ID></AX_Flurstueck>
+            </enthaelt>
+        </AX_Bestandsdatenauszug>'''
+        
+        result = self.parser.parse(xml_content)
+        
+        assert len(result) == 2
+        assert result[0]['ID'] == '1001'
+        assert result[0]['Gemeinde'] == 'Berlin'
+        assert result[0]['pos'] == '52.52 13.405'
+        assert result[1]['ID'] == '1002'
+    
+    def test_parse_cdata_attributes_and_self_closing(self):
+        """CDATA, Attribute und selbstschließende Tags brechen den Parser nicht"""
+        xml_content = b'''<?xml version="1.0"?>
+        <NasExport>
+            <Flurstueck typ="a">
+                <ID>1001</ID>
+                <Gemeinde><![CDATA[Frankfurt <Main>]]></Gemeinde>
+                <Bundesland quelle="x">Hessen</Bundesland>
+                <Flurstuecknummer/>
+            </Flurstueck>
+        </NasExport>'''
+        
+        result = self.parser.parse(xml_content)
+        
+        assert result[0]['Gemeinde'] == 'Frankfurt <Main>'
+        assert result[0]['Bundesland'] == 'Hessen'
+        assert result[0]['Flurstuecknummer'] is None
+    
+    def test_iter_rows_is_lazy(self):
+        """Große Dateien werden gestreamt statt komplett gelesen"""
+        block = b"<Flurstueck><ID>%d</ID><Gemeinde>Hamburg</Gemeinde></Flurstueck>"
+        body = b"".join(block % i for i in range(50_000))
+        content = b'<?xml version="1.0"?><NasExport>' + body + b"</NasExport>"
+        stream = io.BytesIO(content)
+        
+        rows = self.parser.iter_rows(stream)
+        first = next(rows)
+        
+        assert first['ID'] == '0'
+        assert stream.tell() < len(content)
+        assert sum(1 for _ in rows) == 49_999
+    
+    def test_malformed_sample_format_streamed(self):
+        """Format der Beispieldateien (<Größe in ha>): Regex-Fallback liest zeilenweise mit begrenztem Speicher"""
+        block = (
+            "  <Flurstueck>\n    <ID>%d</ID>\n    <Flurstücknummer>123-001-0007</Flurstücknummer>\n"
+            "    <Gemeinde>Hamburg</Gemeinde>\n    <Größe in ha>0.63</Größe in ha>\n  </Flurstueck>\n"
+        )
+        body = "".join(block % i for i in range(20_000))
+        content = ('<?xml version="1.0" encoding="UTF-8"?>\n<NasExport>\n' + body + "</NasExport>\n").encode("utf-8")
+        stream = io.BytesIO(content)
+        
+        tracemalloc.start()
+        try:
+            rows = self.parser.iter_rows(stream)
+            first = next(rows)
+            count = 1 + sum(1 for _ in rows)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        
+        assert first == {"ID": "0", "Flurstücknummer": "123-001-0007", "Gemeinde": "Hamburg", "Größe in ha": "0.63"}
+        assert count == 20_000
+        # Datei ca. 3,5 MB, ein Komplett-Read bräuchte mindestens die Dateigröße
+        assert peak < len(content) // 4
+    
+    def test_malformed_example_file(self):
+        """Beispieldatei mit <Größe in ha> liefert alle Flurstücke"""
+        with open("examples/geodata_example_1.nas", "rb") as f:
+            result = list(self.parser.iter_rows(f))
+        
+        assert [row["ID"] for row in result] == ["2001", "2002"]
+        assert result[0]["Größe in ha"] == "0.63"
+    
+    def test_broken_xml_after_rows_raises_error(self):
+        """Kaputtes XML nach gültigen Flurstücken wirft ValueError"""
+        xml_content = b'''<NasExport>
+            <Flurstueck><ID>1</ID></Flurstueck>
+            <Flurstueck><ID>2</ID></Flurstueck
+        </NasExport>'''
+        
+        with pytest.raises(ValueError) as exc_info:
+            self.parser.parse(xml_content)
+        
+        assert "Ungültiges XML" in str(exc_info.value)
+
+
+
+# Ausschnitt eines ALKIS-Bestandsdatenauszugs (GeoInfoDok 6.0)
+ALKIS_FLURSTUECK = """
+    <enthaelt>
+      <wfs:FeatureCollection gml:id="FC1">
+        <wfs:member>
+          <AX_Flurstueck gml:id="DEHE%(nr)sFS">
+            <gml:identifier codeSpace="http://www.adv-online.de/">urn:adv:oid:DEHE%(nr)sFS</gml:identifier>
+            <lebenszeitintervall>
+              <AA_Lebenszeitintervall><beginnt>2019-04-01T08:00:00Z</beginnt></AA_Lebenszeitintervall>
+            </lebenszeitintervall>
+            <modellart><AA_Modellart><advStandardModell>DLKM</advStandardModell></AA_Modellart></modellart>
+            <position>
+              <gml:MultiSurface gml:id="MS%(nr)s" srsName="urn:ogc:def:crs:EPSG::4258">
+                <gml:surfaceMember>
+                  <gml:Polygon gml:id="P%(nr)s">
+                    <gml:exterior><gml:LinearRing>
+                      <gml:posList srsDimension="2">50.1100 8.6800 50.1100 8.6810 50.1110 8.6810 50.1110 8.6800 50.1100 8.6800</gml:posList>
+                    </gml:LinearRing></gml:exterior>
+                  </gml:Polygon>
+                </gml:surfaceMember>
+              </gml:MultiSurface>
+            </position>
+            <gemarkung>
+              <AX_Gemarkung_Schluessel><land>06</land><gemarkungsnummer>0815</gemarkungsnummer></AX_Gemarkung_Schluessel>
+            </gemarkung>
+            <flurstuecksnummer>
+              <AX_Flurstuecksnummer><zaehler>%(zaehler)s</zaehler><nenner>4</nenner></AX_Flurstuecksnummer>
+            </flurstuecksnummer>
+            <flurstueckskennzeichen>060815003%(zaehler)05d0004__</flurstueckskennzeichen>
+            <amtlicheFlaeche uom="m2">1234.00</amtlicheFlaeche>
+            <flurnummer>3</flurnummer>
+            <gemeindezugehoerigkeit>
+              <AX_Gemeindekennzeichen>
+                <land>06</land><regierungsbezirk>4</regierungsbezirk><kreis>12</kreis><gemeinde>000</gemeinde>
+              </AX_Gemeindekennzeichen>
+            </gemeindezugehoerigkeit>
+            <zeitpunktDerEntstehung>2019-04-01</zeitpunktDerEntstehung>
+          </AX_Flurstueck>
+        </wfs:member>
+      </wfs:FeatureCollection>
+    </enthaelt>"""
+
+
+def alkis_export(*zaehler):
+    """Bestandsdatenauszug mit einem AX_Flurstueck pro Zähler"""
+    members = "".join(ALKIS_FLURSTUECK % {"nr": f"{z:012d}", "zaehler": z} for z in zaehler)
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<AX_Bestandsdatenauszug xmlns="http://www.adv-online.de/namespaces/adv/gid/6.0"\n'
+        '    xmlns:gml="http://www.opengis.net/gml/3.2" xmlns:wfs="http://www.opengis.net/wfs/2.0">'
+        + members + "\n</AX_Bestandsdatenauszug>\n"
+    ).encode("utf-8")
+
+
+class TestNASParserALKIS:
+    """Tests für die Zuordnung der ALKIS-Elemente (AX_Flurstueck) zu den Spalten"""
+    
+    def setup_method(self):
+        self.parser = NASParser()
+    
+    def test_alkis_columns(self):
+        """Kennzeichen, Nummer, Gemeindeschlüssel, Fläche und Lage werden den Spalten zugeordnet"""
+        row = self.parser.parse(alkis_export(123))[0]
+        
+        assert row["ID"] == "060815003001230004"
+        assert row["Flurstücknummer"] == "123/4"
+        assert row["Gemeinde"] == "06412000"
+        assert row["Bundesland"] == "Hessen"
+        assert row["Größe in ha"] == "0.1234"
+        # Mittel der vier Eckpunkte (der schließende Punkt zählt nicht doppelt)
+        assert row["latidude"] == "50.1105"
+        assert row["longitude"] == "8.6805"
+    
+    def test_nested_leaves_keep_their_path(self):
+        """Gleichnamige Blätter (land in gemarkung und gemeindezugehoerigkeit) überschreiben sich nicht"""
+        row = self.parser.parse(alkis_export(123))[0]
+        
+        assert row["gemarkung/AX_Gemarkung_Schluessel/land"] == "06"
+        assert row["gemeindezugehoerigkeit/AX_Gemeindekennzeichen/gemeinde"] == "000"
+        assert row["flurnummer"] == "3"
+    
+    def test_utm_position_leaves_coordinates_empty(self):
+        """Projizierte Koordinaten (UTM) werden nicht als lat/lon übernommen"""
+        content = alkis_export(123).replace(b"urn:ogc:def:crs:EPSG::4258", b"urn:adv:crs:ETRS89_UTM32")
+        
+        row = self.parser.parse(content)[0]
+        
+        assert "latidude" not in row and "longitude" not in row
+        assert row["ID"] == "060815003001230004"
+    
+    def test_alkis_rows_are_valid(self):
+        """Der Cleaner übernimmt ALKIS-Flurstücke ohne Fehler"""
+        cleaned, errors = DataCleaner().clean(self.parser.parse(alkis_export(123, 124)), log_summary=False)
+        
+        assert errors == []
+        assert [row["id"] for row in cleaned] == [60815003001230004, 60815003001240004]
+        assert cleaned[0] == {
+            "id": 60815003001230004,
+            "flurstuecknummer": "123/4",
+            "longitude": 8.6805,
+            "latitude": 50.1105,
+            "gemeinde": "06412000",
+            "bundesland": "Hessen",
+            "groesse_ha": 0.1234,
+        }
+
+
+class TestNASParserTextTokenizer:
+    """Tests für den zeilenbasierten Tokenizer des Text-Formats"""
+    
+    def setup_method(self):
+        self.parser = NASParser()
+    
+    def test_swapped_coordinates_are_corrected(self):
+        """Koordinaten in der Reihenfolge lon/lat werden getauscht"""
+        text_content = b'''BEGINN
+EINHEIT: Flurstueck
+ID: 1
+Koordinaten: 133.4 52.52
+ENDE'''
+        
+        result = self.parser.parse(text_content)
+        
+        assert result[0]['latidude'] == '52.52'
+        assert result[0]['longitude'] == '133.4'
+    
+    def test_key_order_does_not_matter(self):
+        """Reihenfolge der Schlüssel im Block ist egal, Spaltenreihenfolge bleibt gleich"""
+        text_content = b'''EINHEIT: Flurstueck
+Groesse: 0,87 ha
+Bundesland: Hamburg
+ID: 5002
+ENDE'''
+        
+        result = self.parser.parse(text_content)
+        
+        assert list(result[0].keys()) == ['ID', 'Bundesland', 'Größe in ha']
+        assert result[0]['Größe in ha'] == '0,87'
+    
+    def test_other_einheit_types_are_skipped(self):
+        """EINHEIT-Blöcke anderer Typen beenden den Block und werden ignoriert"""
+        text_content = b'''EINHEIT: Flurstueck
+ID: 1
+EINHEIT: Gebaeude
+ID: 99
+Gemeinde: Irgendwo
+EINHEIT: Flurstueck
+ID: 2
+ENDE'''
+        
+        result = self.parser.parse(text_content)
+        
+        assert [row['ID'] for row in result] == ['1', '2']
+        assert 'Gemeinde' not in result[0]
+    
+    def test_text_rows_are_streamed(self):
+        """Blöcke werden geliefert sobald sie enden"""
+        block = b"EINHEIT: Flurstueck\nID: %d\nGemeinde: Berlin\n"
+        content = b"BEGINN\n" + b"".join(block % i for i in range(50_000)) + b"ENDE\n"
+        stream = io.BytesIO(content)
+        
+        rows = self.parser.iter_rows(stream)
+        
+        assert next(rows)['ID'] == '0'
+        assert stream.tell() < len(content)
@@ -0,0 +1,183 @@
+"""
+Tests für das parallele Parsen und Bereinigen von CSV-Dateien.
+"""
+
+import io
+import random
+
+import pytest
+from app.logic.cleaner import DataCleaner
+from app.logic.parallel import iter_clean_parallel, parse_and_clean_parallel, split_ranges, shutdown_executor
+from app.parsers.csv_parser import CSVParser
+
+
+HEADER = "ID,Flurstücknummer,longitude,latidude,Gemeinde,Bundesland,Größe in ha\n"
+
+
+def make_csv(rows=3000, seed=42):
+    """Synthetische CSV mit gültigen und fehlerhaften Zeilen"""
+    rng = random.Random(seed)
+    lines = [HEADER]
+    for i in range(rows):
+        lon = rng.choice(["8.6821", "8,6821", " 13.4 ", "not_a_number", "200"])
+        lat = rng.choice(["50.1109", "50,1", "95.0", ""])
+        land = rng.choice(["Hessen", "Bayern", "Limo", "N/A"])
+        size = rng.choice(["0.87", "1,25", "-0.1", "-"])
+        lines.append(f'{1000 + i},045-{i},"{lon}","{lat}", Frankfurt ,{land},"{size}"\n')
+    return "".join(lines).encode("utf-8")
+
+
+def make_quoted_csv(rows=2000):
+    """CSV mit mehrzeiligen Werten in Anführungszeichen"""
+    lines = [HEADER]
+    for i in range(rows):
+        gemeinde = f'"Frankfurt\nam Main {i}"' if i % 3 else "Frankfurt"
+        lines.append(f'{1000 + i},"045-{i}",8.5,50.1,{gemeinde},Hessen,"1,5"\n')
+    return "".join(lines).encode("utf-8")
+
+
+@pytest.fixture(scope="module", autouse=True)
+def executor():
+    yield
+    shutdown_executor()
+
+
+class TestSplitRanges:
+    """Tests für die Aufteilung in Byte-Bereiche"""
+    
+    def test_ranges_are_line_aligned(self, tmp_path):
+        """Bereiche beginnen immer direkt nach einem Zeilenumbruch"""
+        path = tmp_path / "data.csv"
+        content = make_csv(500)
+        path.write_bytes(content)
+        
+        header, ranges = split_ranges(str(path), 4, min_range_bytes=1)
+        
+        assert header == HEADER.encode("utf-8")
+        assert len(ranges) == 4
+        assert ranges[0][0] == len(header)
+        assert ranges[-1][1] == len(content)
+        for (_, end), (start, _) in zip(ranges, ranges[1:]):
+            assert end == start
+            assert content[start - 1:start] == b"\n"
+    
+    def test_no_boundary_inside_quotes(self, tmp_path):
+        """Zeilenumbrüche in Werten mit Anführungszeichen werden keine Bereichsgrenze"""
+        path = tmp_path / "data.csv"
+        content = make_quoted_csv()
+        path.write_bytes(content)
+        
+        _, ranges = split_ranges(str(path), 8, min_range_bytes=1)
+        
+        assert len(ranges) > 1
+        for _, end in ranges[:-1]:
+            assert content[:end].count(b'"') % 2 == 0
+    
+    def test_small_file_single_range(self, tmp_path):
+        """Kleine Dateien werden nicht aufgeteilt"""
+        path = tmp_path / "data.csv"
+        path.write_bytes(make_csv(10))
+        
+        _, ranges = split_ranges(str(path), 8)
+        
+        assert len(ranges) == 1
+
+
+class TestParseAndCleanParallel:
+    """Parallel muss exakt dasselbe liefern wie seriell"""
+    
+    def test_matches_serial_result(self):
+        """Bereinigte Daten, Fehler-Zeilennummern und Zähler sind identisch"""
+        content = make_csv()
+        
+        serial = DataCleaner()
+        raw_data = CSVParser().parse(content)
+        expected_cleaned, expected_errors = serial.clean(raw_data)
+        
+        cleaner = DataCleaner()
+        cleaned, errors, total_rows, columns = parse_and_clean_parallel(
+            io.BytesIO(content), cleaner, workers=4, min_range_bytes=1
+        )
+        
+        assert total_rows == len(raw_data)
+        assert columns == list(raw_data[0].keys())
+        assert cleaned == expected_cleaned
+        assert errors == expected_errors
+        assert cleaner.error_collector.counts == serial.error_collector.counts
+        assert cleaner.error_collector.first == serial.error_collector.first
+        assert cleaner.cleanings_performed == serial.cleanings_performed
+        assert cleaner.cleaning_details == serial.cleaning_details
+        assert cleaner.report()["column_profiles"] == serial.report()["column_profiles"]
+    
+    def test_sample_details_merged(self):
+        """Stichproben der Worker werden auf details_limit zusammengeführt"""
+        content = make_csv()
+        serial = DataCleaner(details_limit=None)
+        serial.clean(CSVParser().parse(content))
+        
+        cleaner = DataCleaner(details_limit=20, details_mode="sample", seed=7)
+        parse_and_clean_parallel(io.BytesIO(content), cleaner, workers=4, min_range_bytes=1)
+        
+        assert len(cleaner.cleaning_details) == 20
+        assert cleaner.rows_with_cleanings == serial.rows_with_cleanings
+        assert all(detail in serial.cleaning_details for detail in cleaner.cleaning_details)
+    
+    def test_duplicates_across_ranges(self):
+        """Doppelte IDs in verschiedenen Bereichen werden wie seriell aufgelöst"""
+        lines = [HEADER] + [f"{i % 700},045-{i},8.5,50.1,Frankfurt,Hessen,{i}\n" for i in range(3000)]
+        content = "".join(lines).encode("utf-8")
+        
+        for policy in ("first", "last", "reject"):
+            serial = DataCleaner(duplicates=policy)
+            expected_cleaned, _ = serial.clean(CSVParser().parse(content))
+            
+            cleaner = DataCleaner(duplicates=policy)
+            cleaned, *_ = parse_and_clean_parallel(io.BytesIO(content), cleaner, workers=4, min_range_bytes=1)
+            
+            assert cleaned == expected_cleaned
+            assert len(cleaned) == 700
+            assert cleaner.report()["duplicates"] == serial.report()["duplicates"]
+            assert cleaner.stats.valid_rows == serial.stats.valid_rows
+            assert cleaner.error_collector.counts == serial.error_collector.counts
+    
+    def test_quoted_newlines_match_serial(self):
+        """Mehrzeilige Werte landen vollständig in einem Bereich"""
+        content = make_quoted_csv()
+        serial = DataCleaner()
+        expected_cleaned, expected_errors = serial.clean(CSVParser().parse(content))
+        
+        cleaner = DataCleaner()
+        cleaned, errors, total_rows, _ = parse_and_clean_parallel(
+            io.BytesIO(content), cleaner, workers=4, min_range_bytes=1
+        )
+        
+        assert total_rows == 2000
+        assert cleaned == expected_cleaned
+        assert errors == expected_errors == []
+        assert cleaned[1]["gemeinde"] == "Frankfurt\nam Main 1"
+    
+    def test_blocks_streamed_per_range(self):
+        """Die Zeilen kommen in Blöcken von höchstens batch_size, nicht als eine Liste"""
+        content = make_csv()
+        expected_cleaned, _ = DataCleaner(duplicates="first").clean(CSVParser().parse(content))
+        
+        cleaner = DataCleaner(duplicates="first")
+        blocks = list(iter_clean_parallel(io.BytesIO(content), cleaner, workers=4, min_range_bytes=1,
+                                          batch_size=100))
+        
+        assert len(blocks) > 4
+        assert max(len(block) for block in blocks) <= 100
+        assert [row for block in blocks for row in block] == expected_cleaned
+        assert cleaner.stats.valid_rows == len(expected_cleaned)
+    
+    def test_report_from_parallel_result(self):
+        """Report funktioniert mit total_rows/columns_found statt Rohdaten"""
+        cleaner = DataCleaner()
+        with open("examples/geodata_example_2.csv", "rb") as f:
+            cleaned, errors, total_rows, columns = parse_and_clean_parallel(f, cleaner, workers=2)
+        
+        report = cleaner.generate_report([], cleaned, errors, total_rows, columns)
+        
+        assert report["total_rows"] == 4
+        assert report["valid_rows"] == len(cleaned)
+        assert report["columns_found"][0] == "ID"
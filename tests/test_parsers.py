@@ -1,5 +1,5 @@
 import pytest
-from app.parsers import get_parser, CSVParser, NASParser
+from app.parsers import get_parser, CSVParser, NASParser, ParserRegistry, FileParser
 
 
 class TestGetParser:
@@ -31,6 +31,95 @@ class TestGetParser:
         assert "Nicht unterstütztes Dateiformat" in str(exc_info.value)
 
 
+class TestParserRegistry:
+    """Tests für Registry, Singletons und Sniffing"""
+    
+    def test_parsers_are_reused(self):
+        """Parser werden nicht pro Request neu erstellt"""
+        assert get_parser("a.csv") is get_parser("b.csv")
+        assert get_parser("a.nas") is get_parser("b.NAS")
+    
+    def test_compound_extensions(self):
+        """Komprimierte Dateien werden über die innere Endung erkannt"""
+        assert isinstance(get_parser("test.csv.gz"), CSVParser)
+        assert isinstance(get_parser("test.NAS.bz2"), NASParser)
+        assert isinstance(get_parser("test.csv.zst"), CSVParser)
+    
+    def test_extension_wins_over_content(self):
+        """Bekannte Endung entscheidet, auch wenn der Inhalt anders aussieht"""
+        assert isinstance(get_parser("test.csv", b"<?xml version='1.0'?>"), CSVParser)
+    
+    def test_sniff_xml_nas(self):
+        """Unbekannte Endung: XML mit Flurstueck wird als NAS erkannt"""
+        prefix = b'<?xml version="1.0"?>\n<NasExport><Flurstueck>'
+        assert isinstance(get_parser("export.xml", prefix), NASParser)
+    
+    def test_sniff_text_nas(self):
+        """Unbekannte Endung: EINHEIT-Blöcke werden als NAS erkannt"""
+        prefix = b"BEGINN DATENEXPORT\nEINHEIT: Flurstueck\nID: 1\n"
+        assert isinstance(get_parser("export.dat", prefix), NASParser)
+    
+    def test_sniff_csv_header(self):
+        """Unbekannte Endung: Header mit Kommas wird als CSV erkannt"""
+        prefix = b"ID,Gemeinde\n1,Hamburg\n"
+        assert isinstance(get_parser("export.txt", prefix), CSVParser)
+    
+    def test_sniff_unknown_content_raises_error(self):
+        """Weder Endung noch Inhalt passen → ValueError"""
+        for prefix in [b"some content", b"", bytes([0x00, 0x01, 0x2C, 0xFF])]:
+            with pytest.raises(ValueError) as exc_info:
+                get_parser("test.txt", prefix)
+            assert "Nicht unterstütztes Dateiformat" in str(exc_info.value)
+    
+    def test_register_new_format(self):
+        """Neue Formate lassen sich registrieren"""
+        class TSVParser(FileParser):
+            format_name = "tsv"
+            
+            def parse(self, file_content):
+                return []
+            
+            def sniff(self, prefix):
+                return b"\t" in prefix
+            
+            def get_supported_extension(self):
+                return ".tsv"
+        
+        registry = ParserRegistry()
+        registry.register(TSVParser(), [".tsv", ".tab"])
+        
+        assert registry.get_parser("a.tab").format_name == "tsv"
+        assert registry.get_parser("a.dat", b"ID\tName\n").format_name == "tsv"
+        with pytest.raises(ValueError):
+            registry.get_parser("a.csv")
+
+    
+    def test_registered_format_sniffed_before_csv(self):
+        """Später registrierte Formate gewinnen beim Sniffing gegen den CSV-Fallback"""
+        class GeoJSONParser(FileParser):
+            format_name = "geojson"
+            
+            def parse(self, file_content):
+                return []
+            
+            def sniff(self, prefix):
+                return prefix.lstrip().startswith(b"{")
+            
+            def get_supported_extension(self):
+                return ".geojson"
+        
+        # Aufbau wie die Standard-Registry
+        registry = ParserRegistry()
+        registry.register(NASParser())
+        registry.register(CSVParser(), fallback=True)
+        registry.register(GeoJSONParser())
+        prefix = b'{"type": "FeatureCollection", "features": []}\n'
+        
+        assert registry.get_parser("export.json", prefix).format_name == "geojson"
+        assert registry.get_parser("export.txt", b"ID,Gemeinde\n1,Hamburg\n").format_name == "csv"
+        assert registry.get_parser("export.xml", b"<NasExport><Flurstueck>").format_name == "nas"
+
+
 class TestCSVParser:
     """Tests für den CSV Parser"""
     
@@ -0,0 +1,63 @@
+"""
+Tests für den Verbindungspool mit Kennzahlen (app/pool.py, app/database.py).
+"""
+
+import pytest
+from sqlalchemy import create_engine, exc
+
+from app.database import pool_options
+from app.pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool, pool_stats
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """SQLite-Datei mit einem Pool aus genau einer Verbindung"""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.05,
+    )
+    yield engine
+    engine.dispose()
+
+
+class TestInstrumentedPool:
+    """Tests für die Kennzahlen"""
+    
+    def test_checkout_counted(self, engine):
+        """Checkouts und belegte Verbindungen werden gezählt"""
+        with engine.connect():
+            stats = pool_stats(engine.pool)
+            assert stats["checked_out"] == 1
+            assert stats["checkouts"] == 1
+        
+        stats = pool_stats(engine.pool)
+        assert stats["checked_out"] == 0
+        assert stats["checked_in"] == 1
+        assert stats["timeouts"] == 0
+    
+    def test_timeout_counted(self, engine):
+        """Volles Pool: Wartezeit und Timeout erscheinen in den Kennzahlen"""
+        with engine.connect():
+            with pytest.raises(exc.TimeoutError):
+                engine.connect()
+        
+        stats = pool_stats(engine.pool)
+        assert stats["timeouts"] == 1
+        assert stats["checkouts"] == 2
+        assert stats["wait_ms_max"] >= 50
+
+
+class TestPoolOptions:
+    """Tests für die Pool-Einstellungen aus der Umgebung"""
+    
+    def test_postgres_uses_instrumented_pool(self):
+        """PostgreSQL: Größe, Timeout, Recycle und Pre-Ping werden gesetzt"""
+        options = pool_options("postgresql+psycopg://u:p@localhost/db")
+        
+        assert options["poolclass"] is InstrumentedQueuePool
+        assert {"pool_size", "max_overflow", "pool_timeout", "pool_recycle", "pool_pre_ping"} <= options.keys()
+        assert pool_options("postgresql+psycopg://u:p@localhost/db", asynchronous=True)["poolclass"] is InstrumentedAsyncQueuePool
+    
+    def test_sqlite_memory_keeps_default_pool(self):
+        """In-Memory-SQLite behält den Standard-Pool"""
+        assert pool_options("sqlite://") == {}
@@ -0,0 +1,154 @@
+"""
+Tests für die Spaltenprofile (app/logic/profiling.py).
+"""
+
+import random
+import tracemalloc
+
+from app.logic import profiling
+from app.logic.cleaner import DataCleaner
+from app.logic.profiling import ColumnProfile, HyperLogLog, ReservoirSample, hash64, hash64_many
+
+
+def make_row(id, gemeinde="Frankfurt", groesse="1,5"):
+    return {"ID": str(id), "Flurstücknummer": f"045-{id}", "longitude": "8,5", "latidude": "50",
+            "Gemeinde": gemeinde, "Bundesland": "Hessen", "Größe in ha": groesse}
+
+
+class TestHyperLogLog:
+    """Tests für die ungefähre Anzahl verschiedener Werte"""
+    
+    def test_estimate_within_error(self):
+        """Schätzung liegt für 50.000 Werte innerhalb von 5%"""
+        hll = HyperLogLog()
+        for start in range(0, 100_000, 10_000):
+            hll.add_many([f"045-{i % 50_000}" for i in range(start, start + 10_000)])
+        
+        assert abs(hll.estimate() - 50_000) < 2_500
+    
+    def test_small_counts_exact(self):
+        """Wenige Werte werden (fast) exakt gezählt"""
+        hll = HyperLogLog()
+        hll.add_many(["a", "b", "c", "a"])
+        
+        assert hll.estimate() == 3
+    
+    def test_merge_equals_union(self):
+        """Zusammengeführte Register entsprechen einem gemeinsamen Durchlauf"""
+        first, second, both = HyperLogLog(), HyperLogLog(), HyperLogLog()
+        first.add_many([str(i) for i in range(0, 6000)])
+        second.add_many([str(i) for i in range(4000, 9000)])
+        both.add_many([str(i) for i in range(0, 9000)])
+        first.merge(second)
+        
+        assert first.registers == both.registers
+    
+    def test_hash_without_numpy(self, monkeypatch):
+        """Der Hash ist mit und ohne NumPy identisch (Register aus Workern bleiben kompatibel)"""
+        values = ["", "Köln", "045-1", "a b", "€uro"]
+        with_numpy = [int(h) for h in hash64_many(values)]
+        monkeypatch.setattr(profiling, "np", None)
+        
+        assert with_numpy == hash64_many(values) == [hash64(v) for v in values]
+
+    
+    def test_long_value_bounded_memory(self):
+        """Ein sehr langer Wert füllt nicht jede Zeile des Blocks auf seine Länge auf"""
+        values = [f"045-{i}" for i in range(10_000)]
+        values[123] = "x" * 100_000
+        tracemalloc.start()
+        try:
+            hashes = hash64_many(values)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        
+        # Aufgefüllt wären es 10.000 × 100.000 × 4 Byte = 4 GB
+        assert peak < 20 * 1024 * 1024
+        assert int(hashes[123]) == hash64(values[123])
+        assert [int(h) for h in hashes[:5]] == [hash64(v) for v in values[:5]]
+        
+        hll = HyperLogLog()
+        hll.add_many(values)
+        assert abs(hll.estimate() - 10_000) < 500
+
+
+class TestReservoirSample:
+    """Tests für die Stichprobe fester Größe"""
+    
+    def test_exact_below_size(self):
+        """Bis zur Stichprobengröße sind alle Werte enthalten"""
+        sample = ReservoirSample(size=100)
+        sample.add_many([float(i) for i in range(50)])
+        sample.add_many([float(i) for i in range(50, 100)])
+        
+        assert sorted(sample.values) == [float(i) for i in range(100)]
+        assert sample.quantiles()["p50"] == 50.0
+    
+    def test_size_bounded(self):
+        """Die Stichprobe wächst nicht über ihre Größe"""
+        sample = ReservoirSample(size=64, rng=random.Random(1))
+        for start in range(0, 10_000, 1000):
+            sample.add_many([float(i) for i in range(start, start + 1000)])
+        
+        assert len(sample.values) == 64
+        assert sample.seen == 10_000
+        assert 2_500 < sample.quantiles()["p50"] < 7_500
+    
+    def test_merge_weighted(self):
+        """Zusammenführung berücksichtigt die Anzahl gesehener Werte"""
+        small, large = ReservoirSample(size=100, rng=random.Random(2)), ReservoirSample(size=100)
+        small.add_many([0.0] * 100)
+        large.add_many([1.0] * 9_900)
+        small.merge(large)
+        
+        assert len(small.values) == 100
+        assert small.seen == 10_000
+        assert small.values.count(0.0) < 10
+
+
+class TestColumnProfile:
+    """Tests für das Profil einer Spalte"""
+    
+    def test_numeric_profile(self):
+        """NULL-Anteil, min/max/mean ohne inf/nan"""
+        column = ColumnProfile(numeric=True, quantiles=True)
+        column.add_many([1.0, None, 3.0, float("inf")])
+        column.add_many([float("nan"), 2.0, None, None])
+        report = column.report()
+        
+        assert report["count"] == 8
+        assert report["null_ratio"] == 0.375
+        assert (report["min"], report["max"], report["mean"]) == (1.0, 3.0, 2.0)
+        assert report["quantiles_approx"]["p50"] == 2.0
+    
+    def test_empty_column(self):
+        """Leere Spalte hat keine Kennzahlen"""
+        report = ColumnProfile(numeric=True).report()
+        
+        assert report == {"count": 0, "nulls": 0, "null_ratio": 0.0, "min": None, "max": None, "mean": None}
+
+
+class TestReportProfiles:
+    """Profile im Report des DataCleaners"""
+    
+    def test_profiles_in_report(self):
+        """Report enthält Profile der gültigen Zeilen"""
+        cleaner = DataCleaner()
+        rows = [make_row(i, gemeinde=f"G{i % 3}", groesse="-" if i % 4 == 0 else str(i)) for i in range(1, 101)]
+        cleaned, errors = cleaner.clean(rows)
+        profiles = cleaner.generate_report(rows, cleaned, errors)["column_profiles"]
+        
+        assert profiles["id"]["min"] == 1
+        assert profiles["id"]["max"] == 100
+        assert profiles["groesse_ha"]["null_ratio"] == 0.25
+        assert profiles["gemeinde"]["distinct_approx"] == 3
+        assert profiles["flurstuecknummer"]["distinct_approx"] == 100
+        assert "quantiles_approx" in profiles["groesse_ha"]
+    
+    def test_profiles_disabled(self):
+        """profile=False lässt die Profile weg"""
+        cleaner = DataCleaner(profile=False)
+        cleaner.clean([make_row(1)])
+        
+        assert cleaner.report()["column_profiles"] == {}
@@ -0,0 +1,135 @@
+"""
+Tests für die zusammenführbare Statistik (app/logic/stats.py)
+und die Streaming-Bereinigung (DataCleaner.clean_iter).
+"""
+
+import random
+
+from app.logic.cleaner import DataCleaner
+from app.logic.stats import CleaningStats
+
+
+# Werte pro Spalte, inkl. Sonderfälle die der skalare Pfad übernehmen muss
+VALUES = {
+    "ID": ["1001", " 7 ", "1e3", "12.9", "-3", "", "null", "abc", "inf", "nan", "1e30", "1,5", None, 42],
+    "Flurstücknummer": ["045-1", " x ", "", "-", "N/A", None, "a\x00"],
+    "longitude": ["8,5", "8.5", " 181", "-180", "nan", "inf", "1,2,3", "", "abc", "1e400", None, " 9,99 "],
+    "latidude": ["50.1", "91", "-90,0", "", "n/a", "x", None, "45"],
+    "Gemeinde": ["Hamburg", " Köln", "", "None"],
+    "Bundesland": ["Hessen", "hessen ", "THÜRINGEN", "Bavaria", "", "-", None],
+    "Größe in ha": ["0,87", "-1", "0", "", "abc", "inf", None],
+}
+
+
+def make_rows(count=3000, seed=42):
+    """Zufällige Rohzeilen, fehlende Spalten inklusive"""
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(count):
+        row = {}
+        for field, values in VALUES.items():
+            value = rng.choice(values)
+            if value is not None or rng.random() < 0.5:
+                row[field] = value
+        rows.append(row)
+    return rows
+
+
+def report_without_details(report):
+    """Stichproben hängen vom Zufall ab, der Rest muss übereinstimmen"""
+    return {key: value for key, value in report.items() if key != "cleaning_details"}
+
+
+class TestCleanIter:
+    """Tests für die blockweise Bereinigung"""
+    
+    def test_same_rows_as_clean(self):
+        """Blöcke ergeben dieselben Zeilen und denselben Report wie clean()"""
+        rows = make_rows(500)
+        whole = DataCleaner()
+        cleaned, errors = whole.clean(rows)
+        
+        streaming = DataCleaner()
+        batches = list(streaming.clean_iter(iter(rows), batch_size=64))
+        
+        assert repr([row for batch in batches for row in batch]) == repr(cleaned)  # repr: nan != nan
+        assert repr(streaming.report()) == repr(whole.generate_report(rows, cleaned, errors))
+    
+    def test_row_numbers_continue(self):
+        """Zeilennummern von Fehlern und Details laufen über die Blöcke weiter"""
+        rows = make_rows(200)
+        whole = DataCleaner(details_limit=None, errors_limit=None)
+        whole.clean(rows)
+        
+        streaming = DataCleaner(details_limit=None, errors_limit=None)
+        for _ in streaming.clean_iter(rows, batch_size=50):
+            pass
+        
+        assert streaming.error_collector.examples == whole.error_collector.examples
+        assert streaming.cleaning_details == whole.cleaning_details
+    
+    def test_lazy(self):
+        """Es wird nur so weit gelesen wie Blöcke abgefragt werden"""
+        consumed = []
+        
+        def rows():
+            for row in make_rows(100):
+                consumed.append(row)
+                yield row
+        
+        next(DataCleaner().clean_iter(rows(), batch_size=10))
+        
+        assert len(consumed) == 10
+    
+    def test_empty_input(self):
+        """Leerer Iterator ergibt keine Blöcke und einen leeren Report"""
+        cleaner = DataCleaner()
+        
+        assert list(cleaner.clean_iter(iter([]))) == []
+        assert cleaner.report()["total_rows"] == 0
+        assert cleaner.report()["status"] == "OK"
+
+
+class TestCleaningStats:
+    """Tests für das Zusammenführen von Teilergebnissen"""
+    
+    def clean_parts(self, rows, size, **kwargs):
+        merged = DataCleaner(**kwargs).stats
+        for start in range(0, len(rows), size):
+            cleaner = DataCleaner(**kwargs)
+            cleaner.clean(rows[start:start + size], log_summary=False)
+            merged.merge(cleaner.stats)
+        return merged
+    
+    def test_merged_report_equals_whole(self):
+        """Zusammengeführte Teile ergeben denselben Report wie ein Durchlauf"""
+        rows = make_rows(300)
+        whole = DataCleaner(details_limit=10)
+        whole.clean(rows)
+        
+        merged = self.clean_parts(rows, 70, details_limit=10)
+        
+        assert repr(merged.report(list(DataCleaner.FIELD_MAPPING))) == repr(whole.report())
+    
+    def test_merged_sample(self):
+        """Stichproben bleiben begrenzt, Zählungen exakt"""
+        rows = make_rows(300)
+        whole = DataCleaner(details_limit=5, details_mode="sample", seed=1)
+        whole.clean(rows)
+        
+        merged = self.clean_parts(rows, 70, details_limit=5, details_mode="sample")
+        columns = list(DataCleaner.FIELD_MAPPING)
+        
+        assert len(merged.cleaning_details) == 5
+        assert repr(report_without_details(merged.report(columns))) == repr(report_without_details(whole.report()))
+    
+    def test_preview_and_columns(self):
+        """Vorschau und Spalten kommen aus den ersten Teilen"""
+        first, second = CleaningStats(), CleaningStats()
+        first.add_batch([{"a": 1}], [{"id": 1}, {"id": 2}])
+        second.add_batch([{"b": 1}], [{"id": i} for i in range(3, 10)])
+        first.merge(second)
+        
+        assert first.columns_found == ["a"]
+        assert first.preview == [{"id": i} for i in range(1, 6)]
+        assert (first.total_rows, first.valid_rows) == (2, 9)
@@ -0,0 +1,156 @@
+"""
+Tests für das stückweise Lesen von Streams und den Streaming-CSV-Parser.
+"""
+
+import bz2
+import gzip
+import io
+import mmap
+from tempfile import SpooledTemporaryFile
+
+import pytest
+from app.parsers.csv_parser import CSVParser
+from app.parsers.nas_parser import NASParser
+from app.parsers.streams import (
+    detect_compression,
+    iter_text_lines,
+    open_decompressed,
+    open_upload_stream,
+    read_prefix,
+    split_compression_suffix,
+)
+
+
+class TestIterTextLines:
+    """Tests für iter_text_lines"""
+    
+    def test_lines_keep_line_endings(self):
+        """Zeilen behalten ihr Zeilenende, letzte Zeile ohne"""
+        stream = io.BytesIO(b"a,b\r\n1,2\nlast")
+        assert list(iter_text_lines(stream)) == ["a,b\r\n", "1,2\n", "last"]
+    
+    def test_multibyte_char_split_across_chunks(self):
+        """Umlaute über Chunk-Grenzen werden korrekt dekodiert"""
+        content = "Größe,München\n".encode("utf-8") * 50
+        for chunk_size in (1, 2, 3, 7):
+            lines = list(iter_text_lines(io.BytesIO(content), chunk_size=chunk_size))
+            assert lines == ["Größe,München\n"] * 50
+    
+    def test_invalid_utf8_raises_error(self):
+        """Ungültige Bytes werfen UnicodeDecodeError"""
+        with pytest.raises(UnicodeDecodeError):
+            list(iter_text_lines(io.BytesIO(b"ok\n\xff\xfe")))
+
+
+class TestCSVParserIterRows:
+    """Tests für CSVParser.iter_rows"""
+    
+    def setup_method(self):
+        self.parser = CSVParser()
+    
+    def test_iter_rows_is_lazy(self):
+        """iter_rows liest nur so viel wie nötig"""
+        header = b"ID,Name\n"
+        body = b"".join(b"%d,Stadt %d\n" % (i, i) for i in range(100_000))
+        stream = io.BytesIO(header + body)
+        
+        rows = self.parser.iter_rows(stream)
+        first = next(rows)
+        
+        assert first == {"ID": "0", "Name": "Stadt 0"}
+        assert stream.tell() < len(header + body)
+    
+    def test_iter_rows_matches_parse(self):
+        """iter_rows liefert dieselben Zeilen wie parse"""
+        with open("examples/geodata_example_2.csv", "rb") as f:
+            content = f.read()
+        
+        with open("examples/geodata_example_2.csv", "rb") as f:
+            streamed = list(self.parser.iter_rows(f))
+        
+        assert streamed == self.parser.parse(content)
+    
+    def test_quoted_newline_across_chunks(self):
+        """Zeilenumbruch in Anführungszeichen bleibt ein Wert"""
+        content = b'ID,Beschreibung\n1,"Zeile 1\nZeile 2"\n2,x\n'
+        rows = list(self.parser.iter_rows(io.BytesIO(content)))
+        
+        assert len(rows) == 2
+        assert rows[0]["Beschreibung"] == "Zeile 1\nZeile 2"
+
+
+class TestOpenUploadStream:
+    """Tests für mmap-basiertes Lesen gespoolter Uploads"""
+    
+    def test_in_memory_spool_is_returned_unchanged(self):
+        """Kleiner Upload im Speicher wird direkt genutzt"""
+        spool = SpooledTemporaryFile(max_size=1024)
+        spool.write(b"ID,Name\n1,Hamburg\n")
+        spool.seek(0)
+        
+        with open_upload_stream(spool) as stream:
+            assert stream is spool
+        assert not spool._rolled
+    
+    def test_rolled_spool_is_memory_mapped(self):
+        """Auf die Platte gespoolter Upload wird per mmap gelesen"""
+        spool = SpooledTemporaryFile(max_size=16)
+        spool.write(b"ID,Name\n1,Hamburg\n2,Berlin\n")
+        spool.seek(0)
+        
+        with open_upload_stream(spool) as stream:
+            assert isinstance(stream, mmap.mmap)
+            rows = list(CSVParser().iter_rows(stream))
+        
+        assert [row["Name"] for row in rows] == ["Hamburg", "Berlin"]
+    
+    def test_parsers_accept_mmap(self, tmp_path):
+        """parse() nimmt auch mmap-Objekte statt Bytes"""
+        for name, parser in [("geodata_example_1.csv", CSVParser()), ("geodata_example_1.nas", NASParser())]:
+            with open(f"examples/{name}", "rb") as f:
+                expected = parser.parse(f.read())
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    assert parser.parse(mapped) == expected
+
+
+class TestCompression:
+    """Tests für komprimierte Uploads"""
+    
+    CSV = b"ID,Name\n" + b"".join(b"%d,Hamburg\n" % i for i in range(10_000))
+    
+    def compressed(self, codec):
+        if codec == "gzip":
+            return gzip.compress(self.CSV)
+        if codec == "bz2":
+            return bz2.compress(self.CSV)
+        zstandard = pytest.importorskip("zstandard")
+        return zstandard.ZstdCompressor().compress(self.CSV)
+    
+    def test_split_compression_suffix(self):
+        """Kompressions-Endungen werden abgetrennt"""
+        assert split_compression_suffix("daten.csv.gz") == ("daten.csv", "gzip")
+        assert split_compression_suffix("DATEN.NAS.BZ2") == ("DATEN.NAS", "bz2")
+        assert split_compression_suffix("daten.zst") == ("daten", "zstd")
+        assert split_compression_suffix("daten.csv") == ("daten.csv", None)
+    
+    def test_detect_compression_by_magic_bytes(self):
+        """Magic Bytes werden erkannt"""
+        for codec in ["gzip", "bz2", "zstd"]:
+            assert detect_compression(self.compressed(codec)[:8]) == codec
+        assert detect_compression(self.CSV[:8]) is None
+    
+    @pytest.mark.parametrize("codec", ["gzip", "bz2", "zstd"])
+    def test_streaming_decompression(self, codec):
+        """Parser liest direkt aus dem entpackenden Stream, Prefix-Erkennung springt zurück"""
+        with open_decompressed(io.BytesIO(self.compressed(codec)), codec) as stream:
+            assert read_prefix(stream, 8) == b"ID,Name\n"
+            rows = list(CSVParser().iter_rows(stream))
+        
+        assert len(rows) == 10_000
+        assert rows[-1] == {"ID": "9999", "Name": "Hamburg"}
+    
+    def test_uncompressed_stream_is_unchanged(self):
+        """Ohne Kompression wird der Stream direkt genutzt"""
+        stream = io.BytesIO(self.CSV)
+        with open_decompressed(stream, None) as result:
+            assert result is stream
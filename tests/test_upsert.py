@@ -0,0 +1,237 @@
+"""
+Tests für den batchweisen Upsert (app/logic/upsert.py).
+Läuft gegen eine In-Memory SQLite-DB (portabler Pfad).
+"""
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.logic.upsert import (
+    MAX_BIND_PARAMETERS, MAX_UPSERT_BATCH_SIZE, _clamp_batch_size, bulk_upsert, build_pg_upsert, build_copy_merge_sql,
+    choose_ingest_mode, ingest_batches, ingest_batches_async, ingest_rows,
+)
+from app.models.geodata import Geodata
+
+
+def make_row(id, gemeinde="Hamburg"):
+    return {
+        "id": id,
+        "flurstuecknummer": f"123-{id}",
+        "longitude": 9.99,
+        "latitude": 53.55,
+        "gemeinde": gemeinde,
+        "bundesland": "Hamburg",
+        "groesse_ha": 1.0,
+    }
+
+
+@pytest.fixture
+def db():
+    """Frische SQLite-DB pro Test"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+class TestBulkUpsertPortable:
+    """Tests für den SQLite-Fallback"""
+
+    def test_insert_new_rows(self, db):
+        """Neue IDs werden eingefügt"""
+        inserted, updated = bulk_upsert(db, [make_row(1), make_row(2), make_row(3)])
+        db.commit()
+
+        assert (inserted, updated) == (3, 0)
+        assert db.query(Geodata).count() == 3
+
+    def test_update_existing_rows(self, db):
+        """Vorhandene IDs werden aktualisiert statt doppelt eingefügt"""
+        bulk_upsert(db, [make_row(1), make_row(2)])
+        db.commit()
+
+        inserted, updated = bulk_upsert(db, [make_row(2, "Berlin"), make_row(3)])
+        db.commit()
+
+        assert (inserted, updated) == (1, 1)
+        assert db.query(Geodata).count() == 3
+        assert db.get(Geodata, 2).gemeinde == "Berlin"
+
+    def test_small_batch_size(self, db):
+        """Zählung stimmt auch über mehrere Batches"""
+        bulk_upsert(db, [make_row(i) for i in range(5)])
+        db.commit()
+
+        rows = [make_row(i) for i in range(3, 10)]
+        inserted, updated = bulk_upsert(db, rows, batch_size=2)
+        db.commit()
+
+        assert (inserted, updated) == (5, 2)
+        assert db.query(Geodata).count() == 10
+
+    def test_duplicate_ids_in_batch(self, db):
+        """Doppelte IDs in einem Batch werden nur einmal geschrieben (letzte gilt)"""
+        inserted, updated = bulk_upsert(db, [make_row(1, "A"), make_row(2), make_row(1, "B")])
+        db.commit()
+        
+        assert (inserted, updated) == (2, 0)
+        assert db.get(Geodata, 1).gemeinde == "B"
+    
+    def test_duplicate_ids_across_batches(self, db):
+        """Eine ID in mehreren Batches wird einmal gezählt, die letzte Zeile gilt"""
+        bulk_upsert(db, [make_row(1)])
+        db.commit()
+        
+        rows = [make_row(2, "A"), make_row(1, "A"), make_row(2, "B"), make_row(1, "B")]
+        inserted, updated = bulk_upsert(db, rows, batch_size=2)
+        db.commit()
+        
+        assert (inserted, updated) == (1, 1)
+        assert db.get(Geodata, 2).gemeinde == "B"
+        assert db.get(Geodata, 1).gemeinde == "B"
+    
+    def test_empty_input(self, db):
+        """Keine Zeilen → keine Statements"""
+        assert bulk_upsert(db, []) == (0, 0)
+
+
+class TestPostgresStatement:
+    """Prüft das generierte PostgreSQL-Statement"""
+
+    def test_on_conflict_with_xmax(self):
+        """Statement nutzt ON CONFLICT und RETURNING (xmax = 0)"""
+        stmt = build_pg_upsert([make_row(1), make_row(2)])
+        sql = str(stmt.compile(dialect=postgresql.dialect()))
+
+        assert "ON CONFLICT (id) DO UPDATE" in sql
+        assert "RETURNING (xmax = 0)" in sql
+        assert "gemeinde = excluded.gemeinde" in sql
+
+    
+    def test_batch_size_within_bind_parameter_limit(self):
+        """Zu große Batches werden begrenzt, der größte Batch passt ins Bind-Parameter-Limit"""
+        assert _clamp_batch_size(10000) == MAX_UPSERT_BATCH_SIZE
+        assert _clamp_batch_size(0) == 1
+        
+        stmt = build_pg_upsert([make_row(i) for i in range(MAX_UPSERT_BATCH_SIZE)])
+        params = stmt.compile(dialect=postgresql.dialect()).params
+        assert len(params) <= MAX_BIND_PARAMETERS
+
+
+class TestIngestMode:
+    """Tests für die Auswahl zwischen Batch- und COPY-Modus"""
+
+    def test_auto_uses_batch_on_sqlite(self, db):
+        """auto wählt auf SQLite immer Batch"""
+        assert choose_ingest_mode(db, "auto", 10_000_000) == "batch"
+
+    def test_copy_falls_back_on_sqlite(self, db):
+        """copy fällt ohne PostgreSQL auf Batch zurück"""
+        assert choose_ingest_mode(db, "copy", 10) == "batch"
+
+    def test_unknown_mode_raises_error(self, db):
+        """Unbekannter Modus wirft ValueError"""
+        with pytest.raises(ValueError):
+            choose_ingest_mode(db, "turbo", 10)
+
+    def test_ingest_rows_reports_mode(self, db):
+        """ingest_rows gibt genutzten Modus und Zählungen zurück"""
+        mode, inserted, updated = ingest_rows(db, [make_row(1), make_row(2)], "copy", 2)
+
+        assert mode == "batch"
+        assert (inserted, updated) == (2, 0)
+
+    def test_copy_merge_sql(self):
+        """Merge aus der Staging-Tabelle zählt Inserts und Updates"""
+        sql = build_copy_merge_sql()
+
+        assert "SELECT id, flurstuecknummer" in sql
+        assert "FROM geodata_staging" in sql
+        assert "ON CONFLICT (id) DO UPDATE" in sql
+        assert "RETURNING (xmax = 0) AS inserted" in sql
+        assert "count(*) FILTER (WHERE NOT inserted)" in sql
+        assert "DISTINCT ON (id)" in sql
+        assert "ORDER BY id, seq DESC" in sql
+
+
+class TestIngestBatches:
+    """Tests für das Speichern blockweise gelieferter Zeilen"""
+    
+    def test_batches_stored(self, db):
+        """Alle Blöcke werden gespeichert"""
+        batches = [[make_row(1), make_row(2)], [], [make_row(3)]]
+        mode, inserted, updated = ingest_batches(db, iter(batches))
+        db.commit()
+        
+        assert (mode, inserted, updated) == ("batch", 3, 0)
+        assert db.query(Geodata).count() == 3
+    
+    def test_auto_buffers_until_threshold(self, db, monkeypatch):
+        """auto liest höchstens bis zur COPY-Schwelle vor"""
+        monkeypatch.setattr("app.logic.upsert.COPY_THRESHOLD_ROWS", 2)
+        consumed = []
+        
+        def batches():
+            for i in range(5):
+                consumed.append(i)
+                yield [make_row(i)]
+        
+        seen = []
+        monkeypatch.setattr("app.logic.upsert.choose_ingest_mode",
+                            lambda db, mode, row_count: seen.append((row_count, len(consumed))) or "batch")
+        ingest_batches(db, batches())
+        
+        assert seen == [(2, 2)]
+        assert len(consumed) == 5
+
+
+async def _async_blocks(batches):
+    for batch in batches:
+        yield batch
+
+
+@pytest.mark.anyio
+class TestIngestBatchesAsync:
+    """Tests für das Speichern über eine AsyncSession (aiosqlite)"""
+    
+    @pytest.fixture
+    def anyio_backend(self):
+        # aiosqlite braucht asyncio
+        return "asyncio"
+    
+    @pytest.fixture
+    async def async_db(self):
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        async with async_sessionmaker(engine)() as session:
+            yield session
+        await engine.dispose()
+    
+    async def test_batches_stored(self, async_db):
+        """Alle Blöcke werden gespeichert, vorhandene IDs aktualisiert"""
+        await ingest_batches_async(async_db, _async_blocks([[make_row(1), make_row(2)]]))
+        await async_db.commit()
+        
+        batches = [[make_row(2, "Berlin"), make_row(3)], [], [make_row(3, "Bremen")]]
+        mode, inserted, updated = await ingest_batches_async(async_db, _async_blocks(batches))
+        await async_db.commit()
+        
+        # ID 3 steht in zwei Blöcken, wird aber nur einmal (als eingefügt) gezählt
+        assert (mode, inserted, updated) == ("batch", 1, 1)
+        assert (await async_db.get(Geodata, 2)).gemeinde == "Berlin"
+        assert (await async_db.get(Geodata, 3)).gemeinde == "Bremen"
+    
+    async def test_auto_buffers_until_threshold(self, async_db, monkeypatch):
+        """auto liest höchstens bis zur COPY-Schwelle vor, danach werden alle Blöcke gespeichert"""
+        monkeypatch.setattr("app.logic.upsert.COPY_THRESHOLD_ROWS", 2)
+        batches = [[make_row(i)] for i in range(5)]
+        
+        mode, inserted, updated = await ingest_batches_async(async_db, _async_blocks(batches))
+        
+        assert (mode, inserted, updated) == ("batch", 5, 0)